@@ -0,0 +1,54 @@
+"""A minimal in-process stand-in for the MongoDB calls the benchmarked stages make.
+
+mongomock re-evaluates its cursor on every document, which makes loads
+quadratic past a few tens of thousands of swaps. This serves the
+empty-filter and `blockNumber >= n` finds a swap load issues in linear
+time, handing out a fresh dict per document like the driver does.
+"""
+
+
+class MemoryCollection:
+    def __init__(self):
+        self.docs = []
+        self._next_id = 0
+
+    def drop(self):
+        self.docs = []
+
+    def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            if "_id" not in doc:
+                doc["_id"] = self._next_id
+                self._next_id += 1
+            self.docs.append(dict(doc))
+
+    def replace_one(self, filter, doc, upsert=False):
+        for i, existing in enumerate(self.docs):
+            if all(existing.get(key) == value for key, value in filter.items()):
+                self.docs[i] = {"_id": existing["_id"], **doc}
+                return
+        if upsert:
+            self.insert_many([doc])
+
+    def find(self, filter=None, projection=None):
+        filter = filter or {}
+        unsupported = set(filter) - {"blockNumber"}
+        if unsupported:
+            raise NotImplementedError(f"MemoryCollection.find does not filter on {sorted(unsupported)}")
+        low = filter.get("blockNumber", {}).get("$gte")
+        fields = None if projection is None else {key for key, keep in projection.items() if keep} | {"_id"}
+        for doc in self.docs:
+            if low is not None and not (doc.get("blockNumber") is not None and doc["blockNumber"] >= low):
+                continue
+            yield dict(doc) if fields is None else {key: doc[key] for key in fields if key in doc}
+
+
+class MemoryDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, MemoryCollection())
+
+    def list_collection_names(self):
+        return sorted(self._collections)
@@ -0,0 +1,168 @@
+"""Time and memory-profile the swap pipeline on synthetic data.
+
+    python -m bench.run [--rows 10000 100000 1000000] [--uri mongodb://localhost:27017 | --backend mongomock]
+                        [--output FILE]
+    python -m bench.run --compare old.json new.json
+
+Without --uri the swaps are served from memory by bench.memory, or by
+mongomock with --backend mongomock (slow past ~50k swaps).
+
+Each stage is timed on its own (best of --repeat runs) and profiled once
+more under tracemalloc for its peak allocation. Results are written as
+JSON keyed by the current commit, so runs can be compared across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from bench.memory import MemoryDatabase
+from bench.synthetic import LAUNCH_BLOCK, insert_swaps
+from core.parallel import WORKERS, parallel_fifo_pnl, parallel_snipers
+from core.pnl import PAIR_KEYS, latest_prices
+from core.results import decode_swaps
+from core.sync import load_collection
+
+BENCH_DB = "sniperapp_bench"
+TOKEN = "BENCH"
+
+
+def stages(db, token):
+    """(name, run(state) -> output) for the page pipeline, in order; later stages read earlier outputs"""
+    col_name = f"{token.lower()}_swap"
+    launch_blocks = {token: LAUNCH_BLOCK}
+
+    def load_swap_data(state):
+        return load_collection(db, col_name, lambda name: None, decode_swaps)
+
+    def process_sniper_data(state):
+        return parallel_snipers(state["load_swap_data"], launch_blocks)
+
+    def calculate_pnl(state):
+        swaps = state["load_swap_data"]
+        return parallel_fifo_pnl(swaps, state["process_sniper_data"][PAIR_KEYS], prices=latest_prices(swaps))
+
+    def calculate_pnl_all(state):
+        swaps = state["load_swap_data"]
+        return parallel_fifo_pnl(swaps, prices=latest_prices(swaps))
+
+    return [(fn.__name__, fn) for fn in (load_swap_data, process_sniper_data, calculate_pnl, calculate_pnl_all)]
+
+
+def measure(fn, state, repeat):
+    """(output, best seconds, peak MB under tracemalloc)"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(state)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return output, min(times), peak / 1e6
+
+
+def bench(db, rows, repeat=1, seed=0):
+    """Result rows for one data size"""
+    start = time.perf_counter()
+    insert_swaps(db, TOKEN, rows, seed=seed)
+    inserted = time.perf_counter() - start
+    results, state = [], {}
+    for name, fn in stages(db, TOKEN):
+        output, seconds, peak_mb = measure(fn, state, repeat)
+        state[name] = output
+        results.append({
+            "rows": rows, "stage": name, "seconds": round(seconds, 6), "peak_mb": round(peak_mb, 3),
+            "output_rows": 0 if output is None else len(output), "insert_seconds": round(inserted, 3),
+        })
+        print(f"{rows:>9,}  {name:<20} {seconds:9.3f}s  {peak_mb:9.1f} MB  {results[-1]['output_rows']:>9,} rows")
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _database(uri, backend):
+    if uri:
+        from pymongo import MongoClient
+        return MongoClient(uri)[BENCH_DB], "mongod"
+    if backend == "memory":
+        return MemoryDatabase(), "memory"
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("mongomock is not installed; pip install mongomock or use --backend memory")
+    return mongomock.MongoClient()[BENCH_DB], "mongomock"
+
+
+def compare(old_path, new_path):
+    """Print seconds and peak memory of two result files side by side"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(r["rows"], r["stage"]): r for r in old["results"]}
+    print(f"{old.get('commit') or old_path} -> {new.get('commit') or new_path}")
+    for row in new["results"]:
+        prev = before.get((row["rows"], row["stage"]))
+        if prev is None:
+            continue
+        ratio = row["seconds"] / prev["seconds"] if prev["seconds"] else np.nan
+        print(f"{row['rows']:>9,}  {row['stage']:<20} {prev['seconds']:9.3f}s -> {row['seconds']:9.3f}s "
+              f"(x{ratio:.2f})  {prev['peak_mb']:8.1f} -> {row['peak_mb']:8.1f} MB")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", nargs="+", type=int, default=[10_000, 100_000], help="swap counts to benchmark")
+    parser.add_argument("--uri", help="MongoDB URI of a local mongod")
+    parser.add_argument("--backend", choices=["memory", "mongomock"], default="memory",
+                        help="in-process stand-in used without --uri")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench-results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+    if args.compare:
+        return compare(*args.compare)
+
+    db, backend = _database(args.uri, args.backend)
+    results = []
+    for rows in args.rows:
+        results += bench(db, rows, args.repeat, args.seed)
+    report = {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "backend": backend,
+        "workers": WORKERS,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""Synthetic `{token}_swap` documents for benchmarks and local runs.
+
+Swaps follow the stored schema, token-prefixed amount fields included.
+A handful of sniper wallets buy in large bursts within the first blocks
+after launch and sell again within minutes; everyone else trades smaller
+amounts spread over the rest of the range.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+LAUNCH_BLOCK = 25_000_000
+LAUNCH_TIME = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+BLOCK_SECONDS = 2
+SWAPS_PER_BLOCK = 3
+TAX_RATE = 0.01
+
+
+def _hex(rng, n, digits):
+    """n random 0x-prefixed hex strings of `digits` digits"""
+    raw = rng.bytes(n * digits // 2).hex()
+    return ["0x" + raw[i:i + digits] for i in range(0, n * digits, digits)]
+
+
+def _sniper_rows(rng, makers, launch_block):
+    """Burst buys right after launch and a quick exit a few minutes later, per sniper"""
+    rows = []
+    for maker in makers:
+        first = launch_block + int(rng.integers(0, 20))
+        buys = int(rng.integers(2, 5))
+        blocks = first + np.sort(rng.integers(0, 30, buys))
+        amounts = rng.uniform(60_000, 400_000, buys)
+        rows += [(maker, "buy", block, amount, rng.uniform(5e-6, 5e-5)) for block, amount in zip(blocks, amounts)]
+        exit_block = int(blocks[-1]) + int(rng.integers(60, 480))
+        held = amounts.sum() * (1 - TAX_RATE)
+        for share in rng.dirichlet(np.ones(int(rng.integers(1, 3)))):
+            rows.append((maker, "sell", exit_block, held * share, rng.uniform(2e-6, 2e-5)))
+            exit_block += int(rng.integers(1, 30))
+    return rows
+
+
+def swap_frame(token="BENCH", rows=10_000, wallets=None, snipers=None, seed=0,
+               launch_block=LAUNCH_BLOCK, launch_time=LAUNCH_TIME):
+    """`rows` synthetic swaps of one token as a frame in the stored document layout"""
+    rng = np.random.default_rng(seed)
+    token = token.upper()
+    wallets = wallets or max(50, rows // 20)
+    snipers = snipers if snipers is not None else max(5, wallets // 100)
+    makers = np.array(_hex(rng, wallets, 40), dtype=object)
+
+    sniper = _sniper_rows(rng, makers[:snipers], launch_block)[:rows]
+    n = rows - len(sniper)
+    span = max(1, rows // SWAPS_PER_BLOCK)
+    side = np.where(rng.random(n) < 0.55, "buy", "sell")
+    frame = pd.DataFrame({
+        "maker": np.concatenate([[r[0] for r in sniper], makers[snipers:][rng.integers(0, wallets - snipers, n)]]),
+        "swapType": np.concatenate([[r[1] for r in sniper], side]),
+        "blockNumber": np.concatenate([[r[2] for r in sniper], launch_block + rng.integers(0, span, n)]).astype("int64"),
+        "amount": np.concatenate([[r[3] for r in sniper], rng.lognormal(8.5, 1.2, n)]),
+        "transactionFee": np.concatenate([[r[4] for r in sniper], rng.lognormal(-13.5, 1.0, n)]),
+    })
+    frame = frame.sort_values("blockNumber", kind="stable").reset_index(drop=True)
+
+    # Genesis price as a random walk over blocks, VIRTUAL around $1.5
+    offset = (frame["blockNumber"] - launch_block).to_numpy()
+    walk = np.exp(np.cumsum(rng.normal(0, 0.002, offset.max() + 1)))
+    usdc_price = 0.0004 * walk[offset]
+    virtual_usdc = 1.5 * (1 + rng.normal(0, 0.01, len(frame)))
+    virtual_price = usdc_price / virtual_usdc
+    timestamp = launch_time + offset * BLOCK_SECONDS
+
+    is_buy = (frame["swapType"] == "buy").to_numpy()
+    amount = frame["amount"].to_numpy()
+    after_tax = amount * (1 - TAX_RATE)
+    virtual = amount * virtual_price
+    zero = np.zeros(len(frame))
+    return pd.DataFrame({
+        "txHash": _hex(rng, len(frame), 64),
+        "maker": frame["maker"],
+        "swapType": frame["swapType"],
+        "label": np.where(offset <= 100, "launch", "trade"),
+        "blockNumber": frame["blockNumber"],
+        "timestamp": timestamp,
+        "timestampReadable": pd.to_datetime(timestamp, unit="s").strftime("%Y-%m-%d %H:%M:%S"),
+        "genesis_token_symbol": token,
+        "genesis_usdc_price": usdc_price,
+        "genesis_virtual_price": virtual_price,
+        "virtual_usdc_price": virtual_usdc,
+        f"{token}_OUT_BeforeTax": np.where(is_buy, amount, zero),
+        f"{token}_OUT_AfterTax": np.where(is_buy, after_tax, zero),
+        f"{token}_IN_BeforeTax": np.where(is_buy, zero, amount),
+        f"{token}_IN_AfterTax": np.where(is_buy, zero, after_tax),
+        f"{token}_OUT": np.where(is_buy, after_tax, zero),
+        f"{token}_IN": np.where(is_buy, zero, amount),
+        "Virtual_IN": np.where(is_buy, virtual, zero),
+        "Virtual_OUT": np.where(is_buy, zero, virtual * (1 - TAX_RATE)),
+        "Tax_1pct": virtual * TAX_RATE,
+        "transactionFee": frame["transactionFee"],
+    })
+
+
+def swap_documents(frame, chunk=50_000):
+    """Insertable documents of a swap_frame, `chunk` at a time"""
+    for start in range(0, len(frame), chunk):
+        yield frame.iloc[start:start + chunk].to_dict("records")
+
+
+def insert_swaps(db, token="BENCH", rows=10_000, chunk=50_000, **kwargs):
+    """Replace `{token}_swap` with synthetic swaps and register the token; returns the frame"""
+    token = token.upper()
+    frame = swap_frame(token, rows, **kwargs)
+    collection = db[f"{token.lower()}_swap"]
+    collection.drop()
+    for docs in swap_documents(frame, chunk):
+        collection.insert_many(docs, ordered=False)
+    launch_block = kwargs.get("launch_block", LAUNCH_BLOCK)
+    launch_time = kwargs.get("launch_time", LAUNCH_TIME)
+    db["swap_progress"].replace_one({"token_symbol": token}, {
+        "token_symbol": token,
+        "token_address": _hex(np.random.default_rng(len(token)), 1, 40)[0],
+        "genesis_block": launch_block,
+        "updated_at": datetime.fromtimestamp(launch_time, tz=timezone.utc),
+    }, upsert=True)
+    return frame
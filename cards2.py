@@ -1,9 +1,13 @@
 #--IMPORTING AND GENERAL SETUP
 import os
 from dotenv import load_dotenv
+import pandas as pd
 import streamlit as st
-from pymongo import MongoClient
 from datetime import datetime, timezone, date
+from core.catalog import load_catalog
+from core.db import get_db, health
+from core.metrics import cache_miss, debug_panel, serve, stage, start_render
+from core.registry import get_registry
 
 
 #--STREAMLIT CONFIGURATION
@@ -14,9 +18,17 @@ st.set_page_config(layout="wide")
 #--ENVIRONMENT LOADING AND DB CONNECTION
 load_dotenv()
 
-dbconn = os.getenv("MongoLink")
-client = MongoClient(dbconn)
-db = client['genesis_tokens_swap_info']
+# Stage timings in the sidebar, also with ?debug=1 in the URL
+DEBUG_METRICS = os.getenv("DEBUG_METRICS", "0") == "1" or st.query_params.get("debug") == "1"
+
+start_render("cards")
+serve()
+
+db = get_db()
+db_status = health()
+if not db_status["ok"]:
+    st.error(f"Database unavailable: {db_status['error']}")
+    st.stop()
 
 # UI elements
 # --GLOBAL CSS
@@ -210,53 +222,35 @@ def shorten(addr):
         return addr[:6] + "..." + addr[-4:]
     return addr
 
-# Fetch all docs once
-all_docs = list(db["swap_progress"].find({}))
-# Correct filtering from swap_progress using token_collection
-token_collection = ['jarvis_swap', 'tian_swap', 'badai_swap', 'aispace_swap', 'wint_swap']
-# Normalize to lowercase for matching
-allowed_symbols = {col.replace("_swap", "").lower() for col in token_collection}
+# Cached token catalog: projected swap_progress fields with sort keys and
+# prefix indexes, rebuilt every 5 minutes instead of on each rerun
+@st.cache_resource(ttl=300)
+def get_catalog():
+    cache_miss()
+    return load_catalog(db)
 
-filtered_tokens = [doc["token_symbol"]
-                   for doc in all_docs
-                   if doc.get("token_symbol", "").lower() in allowed_symbols]
+with stage("catalog", cached=True) as record:
+    catalog = get_catalog()
+    record["rows"] = len(catalog)
+# Only tokens with a swap collection get a card (lowercase names from the registry)
+allowed_symbols = set(get_registry().tokens())
 
-# Sorting logic
-reverse_order = sort_order == "Descending"
-if sort_option == "Launch Time":
-    filtered_tokens = sorted(filtered_tokens, key=lambda t: next(
-        (d.get("updated_at") for d in all_docs if d.get("token_symbol") == t), datetime.min
-    ), reverse=reverse_order)
-else:
-    filtered_tokens = sorted(filtered_tokens, key=lambda t: t.lower(), reverse=reverse_order)
+CARDS_PER_PAGE = 20
 
-def render_token_cards_from_docs(token_list, all_docs, num_cols=5):
-    doc_map = {d["token_symbol"]: d for d in all_docs}
-
-    for i in range(0, len(token_list), num_cols):
-        chunk = token_list[i:i + num_cols]
+def render_token_cards(tokens, num_cols=5):
+    rows = tokens.to_dict("records")
+    for i in range(0, len(rows), num_cols):
+        chunk = rows[i:i + num_cols]
         with st.container():
             cols = st.columns(num_cols, vertical_alignment="center")
-            for j, token in enumerate(chunk):
+            for j, doc in enumerate(chunk):
                 with cols[j]:
-                    doc = doc_map.get(token)
-                    if not doc:
-                        continue
-
+                    token = doc["token_symbol"]
                     name = token
-                    token_address = shorten(doc.get("token_address", "N/A"))
-                    full_token_address = doc.get("token_address", "")
-                    updated_at = doc.get("updated_at")
-
-                    try:
-                        ts = (
-                            datetime.fromisoformat(updated_at["$date"].replace("Z", "+00:00"))
-                            if isinstance(updated_at, dict) and "$date" in updated_at
-                            else updated_at
-                        )
-                        launch_time = ts.strftime('%d-%m-%Y %H:%M')
-                    except:
-                        launch_time = "N/A"
+                    token_address = shorten(doc["token_address"] or "N/A")
+                    full_token_address = doc["token_address"]
+                    ts = doc["launch_time"]
+                    launch_time = ts.strftime('%d-%m-%Y %H:%M') if pd.notna(ts) else "N/A"
 
                     card_html = f"""
                     <div class="card">
@@ -276,5 +270,31 @@ today = datetime.now().date()
 default_start = date(2024, 1, 1)
 start_date = start_date or default_start
 end_date = end_date or today
-# Use predefined list of 21 tokens
-render_token_cards_from_docs(filtered_tokens, all_docs)
\ No newline at end of file
+with stage("catalog_query") as record:
+    filtered_tokens = catalog.query(
+        search_query, start_date, end_date,
+        sort="launch" if sort_option == "Launch Date" else "name",
+        descending=sort_order == "Descending",
+        symbols=allowed_symbols
+    )
+    record["rows"] = len(filtered_tokens)
+
+# 2. Pagination
+num_pages = max(1, -(-len(filtered_tokens) // CARDS_PER_PAGE))
+if st.session_state.get("catalog_page", 1) > num_pages:
+    st.session_state["catalog_page"] = num_pages
+page_no = st.session_state.get("catalog_page", 1)
+page_tokens = filtered_tokens.iloc[(page_no - 1) * CARDS_PER_PAGE:page_no * CARDS_PER_PAGE]
+with stage("cards", rows=len(page_tokens)):
+    render_token_cards(page_tokens)
+if num_pages > 1:
+    p1, p2 = st.columns([1, 5])
+    with p1:
+        st.number_input("Page", min_value=1, max_value=num_pages, step=1, key="catalog_page")
+    with p2:
+        st.markdown(f"<div style='color: white; padding-top: 2rem;'>{len(filtered_tokens):,} tokens · page {page_no} of {num_pages}</div>", unsafe_allow_html=True)
+elif filtered_tokens.empty:
+    st.info("No tokens match the current filters.")
+
+if DEBUG_METRICS:
+    debug_panel()
@@ -0,0 +1 @@
+"""Shared data access and analysis helpers for the Streamlit pages."""
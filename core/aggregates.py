@@ -0,0 +1,95 @@
+import pandas as pd
+
+from core.pnl import PAIR_KEYS
+
+# Per-wallet summary columns computed server-side, named as in fifo_pnl
+STAT_COLUMNS = [
+    "buy_count", "sell_count", "first_buy_time", "last_sell_time",
+    "avg_buy_price", "avg_sell_price", "total_tax", "total_fee",
+    "buy_usd", "sell_usd",
+]
+
+
+def _when(condition, value, otherwise=None):
+    return {"$cond": [condition, value, otherwise]}
+
+
+def wallet_stats_pipeline(token, makers=None, require_fields=()):
+    """$group pipeline for per-maker trade stats of one `{token}_swap` collection.
+
+    Missing values are left out of $min/$max/$avg the same way pandas skips
+    NaN. `require_fields` drops documents where any of those fields is null
+    or missing, matching a dropna() on the loaded frame.
+    """
+    prefix = f"${token.upper()}_"
+    is_buy = {"$eq": ["$swapType", "buy"]}
+    is_sell = {"$eq": ["$swapType", "sell"]}
+
+    match = {field: {"$ne": None} for field in require_fields}
+    if makers is not None:
+        match["maker"] = {"$in": list(makers)}
+
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [
+        {"$group": {
+            "_id": "$maker",
+            "buy_count": {"$sum": _when(is_buy, 1, 0)},
+            "sell_count": {"$sum": _when(is_sell, 1, 0)},
+            "first_buy_time": {"$min": _when(is_buy, "$timestamp")},
+            "last_sell_time": {"$max": _when(is_sell, "$timestamp")},
+            "avg_buy_price": {"$avg": _when(is_buy, "$genesis_usdc_price")},
+            "avg_sell_price": {"$avg": _when(is_sell, "$genesis_usdc_price")},
+            "total_tax": {"$sum": "$Tax_1pct"},
+            "total_fee": {"$sum": "$transactionFee"},
+            "buy_usd": {"$sum": _when(is_buy, {"$multiply": ["$genesis_usdc_price", f"{prefix}OUT_AfterTax"]}, 0)},
+            "sell_usd": {"$sum": _when(is_sell, {"$multiply": ["$genesis_usdc_price", f"{prefix}IN_AfterTax"]}, 0)},
+        }},
+        {"$project": {"_id": 0, "maker": "$_id", **{col: 1 for col in STAT_COLUMNS}}},
+    ]
+    return pipeline
+
+
+def wallet_stats(db, tokens, makers=None, require_fields=()):
+    """Per-(maker, token_name) trade stats aggregated inside MongoDB.
+
+    Only one summary row per wallet comes back instead of every swap.
+    `makers` optionally maps token -> makers to limit the groups. Times are
+    epoch `timestamp` values converted to naive UTC datetimes.
+    """
+    frames = []
+    for token in tokens:
+        token_makers = None if makers is None else makers.get(token.upper(), [])
+        if token_makers is not None and len(token_makers) == 0:
+            continue
+        pipeline = wallet_stats_pipeline(token, token_makers, require_fields)
+        rows = list(db[f"{token.lower()}_swap"].aggregate(pipeline, allowDiskUse=True))
+        if rows:
+            frame = pd.DataFrame(rows)
+            frame["token_name"] = token.upper()
+            frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=PAIR_KEYS + STAT_COLUMNS)
+
+    stats = pd.concat(frames, ignore_index=True).reindex(columns=PAIR_KEYS + STAT_COLUMNS)
+    for col in ("first_buy_time", "last_sell_time"):
+        stats[col] = pd.to_datetime(stats[col], unit="s")
+    return stats
+
+
+# Above this many makers per token, aggregate the whole collection and
+# filter locally instead of shipping a huge $in list
+MAX_MAKER_FILTER = 10000
+
+
+def with_wallet_stats(db, ledger, require_fields=()):
+    """Join server-side trade stats onto a fifo_pnl(stats=False) ledger"""
+    makers = {
+        token: (group.unique() if group.nunique() <= MAX_MAKER_FILTER else None)
+        for token, group in ledger.groupby("token_name")["maker"]
+    }
+    stats = pd.concat(
+        [wallet_stats(db, [token], None if m is None else {token: m}, require_fields)
+         for token, m in makers.items()] or [wallet_stats(db, [])],
+        ignore_index=True,
+    )
+    return ledger.merge(stats, on=PAIR_KEYS, how="left")
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from core.segments import group_codes, segment_bounds, segment_order
+
+BURST_WINDOW = pd.Timedelta(minutes=10)
+BURST_MIN_TOTAL = 100000
+
+
+def burst_mask(df, keys, amount_col, time_col="timestampReadable",
+               window=BURST_WINDOW, min_total=BURST_MIN_TOTAL):
+    """Boolean mask over `df` marking rows that belong to a large burst.
+
+    Rows are grouped by `keys` and walked in time order. A window opens at
+    the first row of a group and takes every row within `window` of its
+    opening time; the next row after that opens a new window. Rows of
+    windows whose summed `amount_col` exceeds `min_total` are marked.
+    Missing amounts count as 0 and rows without a time are never marked.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    times = pd.to_datetime(df[time_col], errors="coerce")
+    rows = np.flatnonzero(times.notna().to_numpy())
+    if rows.size == 0:
+        return mask
+
+    t = times.to_numpy("datetime64[ns]").astype("int64")[rows]
+    if amount_col in df.columns:
+        amount = pd.to_numeric(df[amount_col], errors="coerce").fillna(0).to_numpy(dtype="float64")[rows]
+    else:
+        amount = np.zeros(rows.size)
+    codes = group_codes(df.iloc[rows], keys)
+    # Rank times so (group, time) packs into one sortable int64 key without
+    # overflow, then find where each row's window would end in its group
+    uniq = np.unique(t)
+    rank = np.searchsorted(uniq, t)
+    order = segment_order(codes, rank)
+    rows, t, rank, amount, codes = rows[order], t[order], rank[order], amount[order], codes[order]
+    first, last = segment_bounds(codes)
+
+    reach = np.searchsorted(uniq, t + pd.Timedelta(window).value, side="right") - 1
+    key = codes * len(uniq) + rank
+    window_end = np.searchsorted(key, codes * len(uniq) + reach, side="right")
+
+    # Window openers: each group's first row, then the row each opener's
+    # window ends at, for as long as that stays inside the group
+    group_end = np.repeat(last + 1, last - first + 1)
+    opens = np.zeros(rows.size, dtype=bool)
+    frontier = first
+    while frontier.size:
+        opens[frontier] = True
+        following = window_end[frontier]
+        frontier = following[following < group_end[frontier]]
+
+    starts = np.flatnonzero(opens)
+    totals = np.add.reduceat(amount, starts)
+    window_id = np.cumsum(opens) - 1
+    mask[rows[totals[window_id] > min_total]] = True
+    return mask
@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.metrics import cache_miss
+
+# Memory budget of the shared analysis result cache
+RESULT_CACHE_MB = float(os.getenv("RESULT_CACHE_MB", "512"))
+
+
+def nbytes(value):
+    """Approximate memory held by a cached value; other objects may report it as `nbytes`"""
+    if value is None:
+        return 0
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    size = getattr(value, "nbytes", None)
+    if isinstance(size, (int, np.integer)):
+        return int(size)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Analysis results keyed by a small fingerprint, evicted LRU under a byte budget.
+
+    Keys are cheap tuples such as (name, token, block watermark, params),
+    so a lookup never hashes a swap frame; new swaps move the watermark
+    and with it the key. Each value's size is measured once on insert
+    with `nbytes`. A value larger than the whole budget is returned but
+    not kept. One instance is shared by all sessions.
+    """
+
+    def __init__(self, max_bytes=int(RESULT_CACHE_MB * 1e6)):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """Value of `key` or None, without counting a lookup or refreshing its recency"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry[0]
+
+    def put(self, key, value):
+        size = nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value of `key`, computed and stored on a miss.
+
+        Concurrent misses on the same key may both compute; the last one stored wins.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        cache_miss()
+        return self.put(key, compute())
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,76 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+
+# swap_progress fields the home page cards use
+CATALOG_PROJECTION = {"_id": 0, "token_symbol": 1, "token_address": 1, "updated_at": 1}
+
+
+def _launch_time(value):
+    """updated_at as a naive UTC datetime; accepts datetimes and extended-JSON {"$date": ...}"""
+    if isinstance(value, dict) and "$date" in value:
+        value = value["$date"]
+    ts = pd.to_datetime(value, errors="coerce", utc=True)
+    return pd.NaT if pd.isna(ts) else ts.tz_localize(None)
+
+
+def _prefix_range(keys, prefix):
+    return np.searchsorted(keys, prefix, "left"), np.searchsorted(keys, prefix + "\uffff", "left")
+
+
+class TokenCatalog:
+    """Launched tokens with precomputed sort keys and prefix indexes on symbol and address.
+
+    Built once from a projected swap_progress read and shared between
+    reruns; searching is two binary searches per index instead of a scan.
+    """
+
+    def __init__(self, docs):
+        frame = pd.DataFrame(list(docs), columns=["token_symbol", "token_address", "updated_at"])
+        frame = frame[frame["token_symbol"].notna()].reset_index(drop=True)
+        frame["token_address"] = frame["token_address"].fillna("")
+        frame["launch_time"] = pd.to_datetime(frame["updated_at"].map(_launch_time))
+        frame["name_key"] = frame["token_symbol"].str.lower()
+        self.frame = frame.drop(columns=["updated_at"])
+
+        self._symbol_order = np.argsort(frame["name_key"].to_numpy(str), kind="stable")
+        self._symbol_keys = frame["name_key"].to_numpy(str)[self._symbol_order]
+        address_keys = frame["token_address"].str.lower().to_numpy(str)
+        self._address_order = np.argsort(address_keys, kind="stable")
+        self._address_keys = address_keys[self._address_order]
+
+    def __len__(self):
+        return len(self.frame)
+
+    def search(self, prefix):
+        """Row positions whose symbol or address starts with `prefix` (case-insensitive)"""
+        prefix = prefix.strip().lower()
+        lo, hi = _prefix_range(self._symbol_keys, prefix)
+        rows = self._symbol_order[lo:hi]
+        lo, hi = _prefix_range(self._address_keys, prefix)
+        return np.union1d(rows, self._address_order[lo:hi])
+
+    def query(self, search="", start_date=None, end_date=None, sort="launch", descending=True, symbols=None):
+        """Matching tokens, sorted by launch time or name.
+
+        Dates bound the launch day inclusively; tokens without a launch time
+        are kept. `symbols` optionally limits the result to those symbols.
+        """
+        frame = self.frame
+        if search and search.strip():
+            frame = frame.iloc[self.search(search)]
+        if symbols is not None:
+            frame = frame[frame["name_key"].isin({s.lower() for s in symbols})]
+        launch = frame["launch_time"]
+        if start_date is not None:
+            frame = frame[launch.isna() | (launch >= datetime.combine(start_date, time()))]
+            launch = frame["launch_time"]
+        if end_date is not None:
+            frame = frame[launch.isna() | (launch < datetime.combine(end_date, time()) + timedelta(days=1))]
+        key = "launch_time" if sort == "launch" else "name_key"
+        return frame.sort_values(key, ascending=not descending, kind="stable", na_position="last")
+
+
+def load_catalog(db):
+    return TokenCatalog(db["swap_progress"].find({}, CATALOG_PROJECTION))
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+DB_NAME = "genesis_tokens_swap_info"
+
+# Pool and timeout settings, overridable through the environment
+POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "120000"))
+READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+HEALTH_TTL = 30
+
+_client = None
+_health = None
+_lock = threading.Lock()
+
+
+def mongo_uri():
+    """Connection string from MongoLink / MONGO_URI, falling back to Streamlit secrets"""
+    load_dotenv()
+    uri = os.getenv("MongoLink") or os.getenv("MONGO_URI")
+    if uri:
+        return uri
+    import streamlit as st
+    return st.secrets["MONGO_URI"]
+
+
+def get_client():
+    """The process-wide MongoClient; every page and session shares its pool"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = MongoClient(
+                    mongo_uri(),
+                    maxPoolSize=POOL_SIZE,
+                    serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                    readPreference=READ_PREFERENCE,
+                    retryReads=True,
+                    appname="sniperapp",
+                )
+    return _client
+
+
+def get_db(name=DB_NAME):
+    """Database handle on the shared client"""
+    return get_client()[name]
+
+
+def health():
+    """{"ok", "latency_ms", "error"} from a ping, reused for HEALTH_TTL seconds"""
+    global _health
+    now = time.monotonic()
+    if _health is not None and now - _health[0] < HEALTH_TTL:
+        return _health[1]
+    start = time.perf_counter()
+    try:
+        get_client().admin.command("ping")
+        status = {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000, "error": None}
+    except Exception as e:
+        status = {"ok": False, "latency_ms": None, "error": str(e)}
+    _health = (now, status)
+    return status
@@ -0,0 +1,207 @@
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.cache import result_cache
+from core.live import LiveLedger
+from core.metrics import cache_miss
+from core.pnl import PAIR_KEYS, PNL_COLUMNS
+from core.prices import PriceIndex
+
+# Swaps replayed between two stored checkpoints; an as-of query replays at most this many
+CHECKPOINT_SWAPS = int(os.getenv("CHECKPOINT_SWAPS", "20000"))
+
+
+# Approximate size of one PairState with its containers
+_STATE_BYTES = 600
+_COLUMNS = ["maker", "token_name", "swapType", "price", "out_before", "out_after",
+            "in_before", "in_after", "fee", "tax", "time", "block"]
+
+
+def _floats(swaps, col):
+    if col not in swaps.columns:
+        return np.full(len(swaps), np.nan)
+    return pd.to_numeric(swaps[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _sorted_columns(swaps):
+    """(blocks, times, ledger swap fields as lists) of the swaps with a blockNumber, in (block, time) order"""
+    swaps = swaps[swaps["blockNumber"].notna()]
+    blocks = _floats(swaps, "blockNumber")
+    times = _floats(swaps, "timestamp")
+    order = np.lexsort((times, blocks))
+    blocks, times = blocks[order], times[order]
+    columns = {
+        "maker": swaps["maker"].astype(object).to_numpy()[order],
+        "token_name": swaps["token_name"].astype(object).to_numpy()[order],
+        "swapType": swaps["swapType"].astype(object).to_numpy()[order],
+        "price": _floats(swaps, "genesis_usdc_price")[order],
+        "out_before": np.nan_to_num(_floats(swaps, "OUT_BeforeTax")[order]),
+        "out_after": np.nan_to_num(_floats(swaps, "OUT_AfterTax")[order]),
+        "in_before": np.nan_to_num(_floats(swaps, "IN_BeforeTax")[order]),
+        "in_after": np.nan_to_num(_floats(swaps, "IN_AfterTax")[order]),
+        "fee": _floats(swaps, "transactionFee")[order],
+        "tax": np.nan_to_num(_floats(swaps, "Tax_1pct")[order]),
+    }
+    columns = {name: values.tolist() for name, values in columns.items()}
+    columns["time"] = [None if math.isnan(t) else t for t in times.tolist()]
+    columns["block"] = blocks.tolist()
+    return blocks, times, columns
+
+
+class LedgerHistory:
+    """Point-in-time FIFO PnL of one swap frame, from checkpointed ledger state.
+
+    The swaps (unprefixed amount columns) are replayed once through a
+    LiveLedger in block order. Every CHECKPOINT_SWAPS swaps the pairs that
+    changed since the previous checkpoint are copied; unchanged pairs are
+    shared with it. `as_of(block)` starts from the nearest checkpoint at or
+    before the block and replays only the swaps after it, then values the
+    remaining tokens at the PriceIndex price as of that block. Swaps
+    without a blockNumber are left out.
+
+    `extend` replays swaps appended later from the running ledger, so a
+    new tail costs only its own swaps. Readers may query while another
+    thread extends: arrays are replaced and lists only grow.
+    """
+
+    def __init__(self, swaps, launch_blocks=None, every=CHECKPOINT_SWAPS, price_index=None):
+        self.launch_blocks = launch_blocks
+        self.every = every
+        self.rows = 0
+        self.blocks = np.empty(0)
+        self.times = np.empty(0)
+        self._columns = {name: [] for name in _COLUMNS}
+        self._ledger = LiveLedger(launch_blocks)
+        self._dirty = set()
+        self._positions = [0]
+        self._checkpoints = [({}, {})]
+        self.price_index = price_index if price_index is not None else PriceIndex(swaps)
+        self._append(swaps)
+
+    def extend(self, swaps, price_index):
+        """Replay swaps appended to the frame since the history was built or last extended.
+
+        `price_index` is the PriceIndex of the whole frame. Returns False,
+        leaving the history as it was, when the swaps reach back before
+        its last block; that needs a new history.
+        """
+        blocks = _floats(swaps, "blockNumber")
+        if len(self.blocks) and (blocks < self.blocks[-1]).any():
+            return False
+        self._append(swaps)
+        self.price_index = price_index
+        return True
+
+    def _append(self, swaps):
+        blocks, times, columns = _sorted_columns(swaps)
+        start = len(self.blocks)
+        for name, values in columns.items():
+            self._columns[name].extend(values)
+        # Times before blocks: readers index times by a position found in blocks
+        self.times = np.concatenate([self.times, times])
+        self.blocks = np.concatenate([self.blocks, blocks])
+        self.rows += len(swaps)
+
+        # ── Replay the new swaps, copying changed pairs at each checkpoint ──
+        for i in range(start, len(self.blocks)):
+            swap = self._swap(i)
+            self._ledger.apply(swap)
+            self._dirty.add((swap["maker"], swap["token_name"]))
+            if (i + 1) % self.every == 0:
+                self._store_checkpoint(self._ledger, self._dirty, i + 1)
+                self._dirty = set()
+
+    @property
+    def nbytes(self):
+        """Approximate memory held, for the result cache budget"""
+        states = {id(state): state for pairs, _ in self._checkpoints for state in pairs.values()}
+        states.update((id(state), state) for state in self._ledger.pairs.values())
+        lot_bytes = sum(len(state.lots) + len(state.sells) for state in states.values())
+        return int(self.blocks.nbytes + self.times.nbytes + len(self.blocks) * len(self._columns) * 32
+                   + len(states) * _STATE_BYTES + lot_bytes * 80)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    @property
+    def first_block(self):
+        return int(self.blocks[0]) if len(self.blocks) else None
+
+    @property
+    def last_block(self):
+        return int(self.blocks[-1]) if len(self.blocks) else None
+
+    def time_at(self, block):
+        """Time of the last swap at or before `block`, or NaT"""
+        i = np.searchsorted(self.blocks, block, side="right")
+        return pd.to_datetime(self.times[i - 1], unit="s") if i else pd.NaT
+
+    def _swap(self, i):
+        return {name: values[i] for name, values in self._columns.items()}
+
+    def _store_checkpoint(self, ledger, dirty, position):
+        pairs = dict(self._checkpoints[-1][0])
+        for key in dirty:
+            if key in ledger.pairs:
+                pairs[key] = ledger.pairs[key].copy()
+        # Checkpoint before position, so a reader never finds a position without one
+        self._checkpoints.append((pairs, dict(ledger._first_blocks)))
+        self._positions.append(position)
+
+    def ledger_at(self, block, pairs=None):
+        """LiveLedger holding every swap up to and including `block`, optionally only for `pairs`"""
+        stop = int(np.searchsorted(self.blocks, block, side="right"))
+        k = int(np.searchsorted(self._positions, stop, side="right")) - 1
+        stored, first_blocks = self._checkpoints[k]
+        wanted = None if pairs is None else set(map(tuple, pairs[PAIR_KEYS].astype(object).to_numpy()))
+
+        ledger = LiveLedger(self.launch_blocks)
+        ledger._first_blocks = dict(first_blocks)
+        ledger.pairs = {key: state.copy() for key, state in stored.items() if wanted is None or key in wanted}
+        makers, tokens = self._columns["maker"], self._columns["token_name"]
+        for i in range(self._positions[k], stop):
+            if wanted is None or (makers[i], tokens[i]) in wanted:
+                ledger.apply(self._swap(i))
+        return ledger
+
+    def as_of(self, block, pairs=None):
+        """fifo_pnl-shaped table as it stood at `block`, in `pairs` order when given"""
+        ledger = self.ledger_at(block, pairs)
+        table = ledger.table(prices=self.price_index.prices_as_of(block=block)).drop(columns=["sniper"])
+        if pairs is None:
+            return table
+        return pairs[PAIR_KEYS].astype(object).drop_duplicates().merge(table, on=PAIR_KEYS, how="inner")[PNL_COLUMNS]
+
+
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def synced_history(sync, launch_blocks=None, prepare=None):
+    """LedgerHistory of a SwapSync's frame, kept in the shared result cache.
+
+    A cached history only replays the rows appended to the frame since it
+    was last brought up to date; it is rebuilt when it was evicted, the
+    launch blocks changed or the new rows reach back before its last
+    block. `prepare` turns frame rows into the unprefixed layout.
+    """
+    key = ("ledger_history", sync.cache_id)
+    with _build_locks_guard:
+        lock = _build_locks.setdefault(key, threading.Lock())
+    with lock:
+        frame = sync.frame
+        history = result_cache.get(key)
+        if history is not None and history.launch_blocks != launch_blocks:
+            history = None
+        if history is not None and history.rows == len(frame):
+            return history
+        cache_miss()
+        prepare = prepare or (lambda rows: rows)
+        if history is None or not history.extend(prepare(frame.iloc[history.rows:]), sync.price_index):
+            history = LedgerHistory(prepare(frame), launch_blocks, price_index=sync.price_index)
+        # Stored again after every extend so its grown size counts
+        return result_cache.put(key, history)
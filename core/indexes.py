@@ -0,0 +1,191 @@
+"""Create the indexes the pages rely on and audit their query plans.
+
+    python -m core.indexes create [--collections jarvis_swap ...]
+    python -m core.indexes audit  [--collections jarvis_swap ...]
+
+`audit` runs explain() on each query the pages issue and exits non-zero
+when one of them falls back to a full collection scan or to a blocking
+in-memory sort that no index provides.
+"""
+import argparse
+import sys
+
+from core.aggregates import wallet_stats_pipeline
+from core.db import get_db
+from core.registry import swap_collection_names
+from core.results import WALLET_PNL_COLLECTION, WALLET_PNL_INDEXES
+from core.transactions import TRANSACTION_INDEXES, page_pipeline, transaction_filter
+
+# Compound indexes on every `{token}_swap` collection
+SWAP_INDEXES = TRANSACTION_INDEXES + [
+    [("genesis_token_symbol", 1), ("timestamp", 1)],
+]
+
+PROGRESS_COLLECTION = "swap_progress"
+PROGRESS_INDEXES = [
+    [("token_symbol", 1)],
+]
+
+# Upper bound for epoch-second ranges in audited queries
+_MAX_TS = 2 ** 31
+
+
+def _index_name(keys):
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def create_indexes(db, collections):
+    """Create any missing indexes; returns [(collection, index name)] in creation order"""
+    created = []
+    targets = [(name, SWAP_INDEXES) for name in collections] + [
+        (PROGRESS_COLLECTION, PROGRESS_INDEXES),
+        (WALLET_PNL_COLLECTION, WALLET_PNL_INDEXES),
+    ]
+    for col_name, specs in targets:
+        existing = {tuple(info["key"].items()) for info in db[col_name].list_indexes()}
+        for keys in specs:
+            if tuple(keys) in existing:
+                continue
+            db[col_name].create_index(keys, name=_index_name(keys))
+            created.append((col_name, _index_name(keys)))
+    return created
+
+
+def _find(filter, sort=None, limit=0):
+    def explain(collection):
+        cursor = collection.find(filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor.limit(limit).explain()
+    return explain
+
+
+def _aggregate(pipeline):
+    def explain(collection):
+        return collection.database.command("aggregate", collection.name, pipeline=pipeline, explain=True)
+    return explain
+
+
+def swap_queries(token):
+    """(label, explain callable, full scan expected) for the queries run on a swap collection"""
+    return [
+        ("header first swap", _find({"genesis_token_symbol": token}, [("timestamp", 1)], 1), False),
+        ("sync tail", _find({"blockNumber": {"$gte": 0}}), False),
+        ("swap type by time", _find({"swapType": "buy", "timestamp": {"$gte": 0, "$lt": _MAX_TS}},
+                                    [("timestamp", -1)], 50), False),
+        ("label by time", _find({"label": "", "timestamp": {"$gte": 0, "$lt": _MAX_TS}}), False),
+        ("tx page by block", _aggregate(page_pipeline(token, {}, "blockNumber", limit=50)), False),
+        ("tx page by time", _aggregate(page_pipeline(token, transaction_filter("sell"), "timestamp", limit=50)), False),
+        ("maker history", _find({"maker": ""}, [("timestamp", 1)]), False),
+        ("wallet stats", _aggregate(wallet_stats_pipeline(token, makers=[""])), False),
+        ("full swap load", _find({}), True),
+    ]
+
+
+def progress_queries(token):
+    return [
+        ("token lookup", _find({"token_symbol": token}, limit=1), False),
+        ("token list", _find({}, [("token_symbol", 1)]), False),
+    ]
+
+
+def winning_plans(node):
+    """Every winning plan in an explain() document"""
+    if isinstance(node, list):
+        for item in node:
+            yield from winning_plans(item)
+    elif isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                yield value
+            elif key != "rejectedPlans":
+                yield from winning_plans(value)
+
+
+def _nodes(plan):
+    """Every stage node of a plan tree"""
+    if isinstance(plan, list):
+        for item in plan:
+            yield from _nodes(item)
+    elif isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan
+        for value in plan.values():
+            if isinstance(value, (dict, list)):
+                yield from _nodes(value)
+
+
+def plan_stages(node):
+    """Every stage name in the winning plans of an explain() document"""
+    for plan in winning_plans(node):
+        for stage in _nodes(plan):
+            yield stage["stage"]
+
+
+def blocking_sorts(node):
+    """SORT stages of the winning plans that an index should have provided.
+
+    A SORT over an index scan whose keys are only filter fields sorts an
+    already narrowed set and is allowed. A SORT without an index scan
+    below it, or over a scan of an index on the sort fields that cannot
+    give the full sort order, is not.
+    """
+    for plan in winning_plans(node):
+        for stage in _nodes(plan):
+            if stage["stage"] != "SORT":
+                continue
+            sort_keys = set(stage.get("sortPattern") or {})
+            scans = [s for s in _nodes([v for k, v in stage.items() if k != "stage"]) if s["stage"] == "IXSCAN"]
+            if not scans or any(sort_keys & set(s.get("keyPattern") or {}) for s in scans):
+                yield stage
+
+
+def audit(db, collections):
+    """[(collection, label, stages, status)] where status is ok, expected scan, COLLSCAN, SORT or error"""
+    targets = [(name, swap_queries(name[: -len("_swap")].upper())) for name in collections]
+    targets.append((PROGRESS_COLLECTION, progress_queries("")))
+    report = []
+    for col_name, queries in targets:
+        for label, explain, scan_ok in queries:
+            try:
+                plan = explain(db[col_name])
+            except Exception as e:
+                report.append((col_name, label, [], f"error: {e}"))
+                continue
+            stages = list(dict.fromkeys(plan_stages(plan)))
+            if "COLLSCAN" in stages:
+                status = "expected scan" if scan_ok else "COLLSCAN"
+            elif any(blocking_sorts(plan)):
+                status = "SORT"
+            else:
+                status = "ok"
+            report.append((col_name, label, stages, status))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.indexes", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["create", "audit"])
+    parser.add_argument("--collections", nargs="+", help="swap collections (default: every *_swap collection)")
+    args = parser.parse_args(argv)
+
+    db = get_db()
+    collections = args.collections or swap_collection_names(db)
+    if args.command == "create":
+        created = create_indexes(db, collections)
+        for col_name, name in created:
+            print(f"created {col_name}.{name}")
+        print(f"{len(created)} indexes created")
+        return 0
+
+    report = audit(db, collections)
+    width = max((len(col) for col, *_ in report), default=0)
+    for col_name, label, stages, status in report:
+        print(f"{col_name:<{width}}  {label:<18}  {status:<13}  {' > '.join(stages)}")
+    problems = [row for row in report if row[3] != "ok" and row[3] != "expected scan"]
+    print(f"{len(report)} queries audited, {len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+"""Swap state kept current from MongoDB change streams.
+
+A LiveFeed loads each watched `{token}_swap` collection once, then follows
+its inserts on a change stream and hands every swap to a LiveLedger, which
+keeps FIFO lot queues, running trade totals and sniper state per
+(maker, token_name). Change streams need a replica set; a single-node
+`mongod --replSet rs0` (after `rs.initiate()`) stands in for Atlas locally.
+"""
+import logging
+import math
+import threading
+import time
+import weakref
+from collections import deque
+
+import pandas as pd
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.bursts import BURST_MIN_TOTAL, BURST_WINDOW
+from core.pnl import PNL_COLUMNS
+from core.snipers import LAUNCH_WINDOW_BLOCKS, MIN_SNIPER_FEE, QUICK_SELL
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reconnect attempts after a change stream error
+RETRY_SECONDS = 5
+# Documents applied per lock hold while loading a collection
+BOOTSTRAP_BATCH = 5000
+
+_BURST = BURST_WINDOW.total_seconds()
+_QUICK_SELL = QUICK_SELL.total_seconds()
+# A sniper buy found later lies at most one burst window back, so older
+# sells can no longer be its quick sell
+_SELL_HORIZON = max(_BURST, _QUICK_SELL)
+
+
+def _number(value):
+    """float of a stored value; None and unparseable values -> NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _zero(value):
+    return 0.0 if math.isnan(value) else value
+
+
+def _epoch(doc):
+    """Swap time in epoch seconds from `timestamp`, else parsed `timestampReadable`, else None"""
+    ts = _number(doc.get("timestamp"))
+    if not math.isnan(ts):
+        return ts
+    parsed = pd.to_datetime(doc.get("timestampReadable"), errors="coerce")
+    return None if pd.isna(parsed) else parsed.timestamp()
+
+
+def swap_from_doc(col_name, doc):
+    """The fields the ledger uses from a raw `{token}_swap` document"""
+    token = col_name[: -len("_swap")].upper()
+    prefix = f"{token}_"
+    return {
+        "maker": doc.get("maker"),
+        "token_name": token,
+        "swapType": doc.get("swapType"),
+        "time": _epoch(doc),
+        "block": _number(doc.get("blockNumber")),
+        "price": _number(doc.get("genesis_usdc_price")),
+        "out_before": _zero(_number(doc.get(f"{prefix}OUT_BeforeTax"))),
+        "out_after": _zero(_number(doc.get(f"{prefix}OUT_AfterTax"))),
+        "in_before": _zero(_number(doc.get(f"{prefix}IN_BeforeTax"))),
+        "in_after": _zero(_number(doc.get(f"{prefix}IN_AfterTax"))),
+        "fee": _number(doc.get("transactionFee")),
+        "tax": _zero(_number(doc.get("Tax_1pct"))),
+    }
+
+
+class PairState:
+    """FIFO lots, running totals and burst/sniper state of one (maker, token_name)"""
+
+    __slots__ = (
+        "lots", "realized", "remaining", "buy_count", "sell_count", "first_buy", "last_sell",
+        "buy_price_sum", "buy_price_n", "sell_price_sum", "sell_price_n",
+        "tax", "fee", "buy_usd", "sell_usd",
+        "window_open", "window_total", "window_large", "window_candidates",
+        "last_sniper_buy", "sells", "candidate", "sniper",
+    )
+
+    def __init__(self):
+        self.lots = deque()
+        self.realized = self.remaining = 0.0
+        self.buy_count = self.sell_count = 0
+        self.first_buy = self.last_sell = None
+        self.buy_price_sum = self.sell_price_sum = 0.0
+        self.buy_price_n = self.sell_price_n = 0
+        self.tax = self.fee = self.buy_usd = self.sell_usd = 0.0
+        self.window_open = None
+        self.window_total = 0.0
+        self.window_large = False
+        self.window_candidates = []
+        self.last_sniper_buy = None
+        self.sells = deque()
+        self.candidate = False
+        self.sniper = False
+
+    def copy(self):
+        """Independent copy; lots are copied since sells shrink them in place"""
+        other = PairState.__new__(PairState)
+        for name in PairState.__slots__:
+            setattr(other, name, getattr(self, name))
+        other.lots = deque([lot[:] for lot in self.lots])
+        other.window_candidates = list(self.window_candidates)
+        other.sells = deque(self.sells)
+        return other
+
+
+class LiveLedger:
+    """fifo_pnl and detect_snipers, maintained one swap at a time.
+
+    Swaps of a pair must arrive in time order. A buy adds a lot and a sell
+    consumes lots from the front, so each swap costs O(1) amortized.
+    Bursts and quick sells are tracked per pair the way core.bursts and
+    core.snipers define them. Only the latest sniper buy matters for a
+    later sell, and sell times are kept in order and dropped once no
+    sniper buy can still reach them, so each check is O(1) amortized.
+    `launch_blocks` maps token -> launch block; with None a token's first
+    swap block is used.
+    """
+
+    def __init__(self, launch_blocks=None):
+        self.launch_blocks = launch_blocks
+        self.pairs = {}
+        self.prices = {}
+        self._first_blocks = {}
+
+    def _launch_block(self, token, block):
+        if self.launch_blocks is None:
+            if token not in self._first_blocks and not math.isnan(block):
+                self._first_blocks[token] = block
+            return self._first_blocks.get(token, math.nan)
+        return _number(self.launch_blocks.get(token))
+
+    def apply(self, swap):
+        maker, token = swap["maker"], swap["token_name"]
+        if maker is None:
+            return
+        state = self.pairs.get((maker, token))
+        if state is None:
+            state = self.pairs[(maker, token)] = PairState()
+        t, price = swap["time"], swap["price"]
+        if t is not None:
+            latest = self.prices.get(token)
+            if latest is None or t >= latest[0]:
+                self.prices[token] = (t, price)
+
+        if swap["swapType"] == "buy":
+            self._buy(state, swap, t, price)
+        elif swap["swapType"] == "sell":
+            self._sell(state, swap, t, price)
+        state.tax += swap["tax"]
+        state.fee += _zero(swap["fee"])
+
+    def _buy(self, state, swap, t, price):
+        state.buy_count += 1
+        if t is not None and (state.first_buy is None or t < state.first_buy):
+            state.first_buy = t
+        if not math.isnan(price):
+            state.buy_price_sum += price
+            state.buy_price_n += 1
+        state.buy_usd += _zero(price) * swap["out_after"]
+        if price > 0 and swap["out_before"] > 0 and swap["out_after"] > 0:
+            state.lots.append([swap["out_after"], swap["out_before"] * price / swap["out_after"]])
+            state.remaining += swap["out_after"]
+        if t is None:
+            return
+
+        # ── Burst windows ──
+        if state.window_open is None or t > state.window_open + _BURST:
+            state.window_open, state.window_total = t, 0.0
+            state.window_large, state.window_candidates = False, []
+        state.window_total += swap["out_before"]
+        launch = self._launch_block(swap["token_name"], swap["block"])
+        qualifies = swap["fee"] > MIN_SNIPER_FEE and swap["block"] <= launch + LAUNCH_WINDOW_BLOCKS
+        if qualifies:
+            state.candidate = True
+        if state.window_large:
+            if qualifies:
+                self._sniper_buy(state, t)
+        else:
+            if qualifies:
+                state.window_candidates.append(t)
+            if state.window_total > BURST_MIN_TOTAL:
+                state.window_large = True
+                for buy_time in state.window_candidates:
+                    self._sniper_buy(state, buy_time)
+                state.window_candidates = []
+
+    def _sell(self, state, swap, t, price):
+        state.sell_count += 1
+        if t is not None and (state.last_sell is None or t > state.last_sell):
+            state.last_sell = t
+        if not math.isnan(price):
+            state.sell_price_sum += price
+            state.sell_price_n += 1
+        state.sell_usd += _zero(price) * swap["in_after"]
+        if price > 0 and swap["in_after"] > 0 and swap["in_before"] > 0:
+            rate = swap["in_after"] * price / swap["in_before"]
+            wanted = swap["in_before"]
+            lots = state.lots
+            while wanted > 0 and lots:
+                lot = lots[0]
+                take = min(wanted, lot[0])
+                state.realized += take * (rate - lot[1])
+                state.remaining -= take
+                wanted -= take
+                lot[0] -= take
+                if lot[0] <= 0:
+                    lots.popleft()
+            if not lots:
+                state.remaining = 0.0
+
+        # ── Quick sells after a sniper buy ──
+        if t is None or state.sniper:
+            return
+        # Sniper buys all lie at or before this sell, the latest one closest
+        if state.last_sniper_buy is not None and t - state.last_sniper_buy <= _QUICK_SELL:
+            state.sniper = True
+            state.sells.clear()
+        elif state.candidate or swap["block"] <= self._launch_block(swap["token_name"], swap["block"]) + LAUNCH_WINDOW_BLOCKS:
+            # A buy can still turn out to be a sniper buy when its burst grows
+            sells = state.sells
+            while sells and sells[0] < t - _SELL_HORIZON:
+                sells.popleft()
+            sells.append(t)
+
+    def _sniper_buy(self, state, t):
+        # Sniper buys come in time order, so sells before this one are done with
+        state.last_sniper_buy = t
+        sells = state.sells
+        while sells and sells[0] < t:
+            sells.popleft()
+        if not state.sniper and sells and sells[0] - t <= _QUICK_SELL:
+            state.sniper = True
+            sells.clear()
+
+    def table(self, snipers_only=False, prices=None):
+        """fifo_pnl-shaped table with a `sniper` flag.
+
+        Unrealized PnL is at the latest prices seen, or at `prices`
+        (token -> price) when given.
+        """
+        rows = []
+        for (maker, token), s in self.pairs.items():
+            if snipers_only and not s.sniper:
+                continue
+            if prices is None:
+                price = _zero(_number(self.prices.get(token, (None, math.nan))[1]))
+            else:
+                price = _zero(_number(prices.get(token)))
+            rows.append((
+                maker, token, s.realized, s.remaining * price, s.remaining,
+                s.buy_count, s.sell_count, s.first_buy, s.last_sell,
+                s.buy_price_sum / s.buy_price_n if s.buy_price_n else math.nan,
+                s.sell_price_sum / s.sell_price_n if s.sell_price_n else math.nan,
+                s.tax, s.fee, s.buy_usd, s.sell_usd, s.sniper,
+            ))
+        table = pd.DataFrame(rows, columns=PNL_COLUMNS + ["sniper"])
+        for col in ("first_buy_time", "last_sell_time"):
+            table[col] = pd.to_datetime(table[col], unit="s")
+        return table
+
+
+class _Follower:
+    """State and thread of a LiveFeed; holds no reference back to the feed"""
+
+    def __init__(self, db, collections, launch_blocks, require):
+        self.db = db
+        self.launch_blocks = launch_blocks
+        self.require = tuple(require)
+        self.ledger = LiveLedger(launch_blocks)
+        self.error = None
+        self.streaming = False
+        self.version = 0
+        self.updated_at = None
+        self.watermarks = {}
+        self._pending = list(collections)
+        self._ready = {}
+        self._resume_token = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+
+    @property
+    def ready(self):
+        with self._lock:
+            return not self._pending
+
+    def track(self, collections):
+        with self._lock:
+            self._pending += [name for name in collections if name not in self._ready and name not in self._pending]
+
+    def table(self, snipers_only=False):
+        with self._lock:
+            return self.ledger.table(snipers_only)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Loads happen outside the change stream, so the ledger is
+                # ready even where change streams are unavailable
+                self._load_pending()
+                with self._lock:
+                    tracked = sorted(self._ready)
+                pipeline = [{"$match": {"operationType": "insert", "ns.coll": {"$in": tracked}}}]
+                resumed = self._resume_token is not None
+                with self.db.watch(pipeline, resume_after=self._resume_token, max_await_time_ms=1000) as stream:
+                    if not resumed:
+                        # Inserts between the loads and the stream opening
+                        for col_name in tracked:
+                            self._load(col_name, tail=True)
+                    self.error = None
+                    self.streaming = True
+                    # Newly tracked collections reopen the stream with a wider $in
+                    while not self._stop.is_set() and self.ready:
+                        change = stream.try_next()
+                        if change is not None:
+                            self._apply_change(change)
+                        if stream.resume_token is not None:
+                            self._resume_token = stream.resume_token
+                self.streaming = False
+            except Exception as e:
+                self.streaming = False
+                self.error = str(e)
+                logger.warning("Live feed failed: %s", e, exc_info=not isinstance(e, PyMongoError))
+                if isinstance(e, OperationFailure) and self._resume_token is not None:
+                    # Most likely the resume point left the oplog; start over
+                    self._reset()
+                self._stop.wait(RETRY_SECONDS)
+
+    def _reset(self):
+        with self._lock:
+            self._pending = list(self._ready) + [name for name in self._pending if name not in self._ready]
+            self._ready = {}
+            self.watermarks = {}
+            self._resume_token = None
+            self.ledger = LiveLedger(self.launch_blocks)
+
+    def _load_pending(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                col_name = self._pending[0]
+            self._load(col_name)
+            with self._lock:
+                self._pending.remove(col_name)
+
+    def _load(self, col_name, tail=False):
+        """Apply a collection's swaps and record its watermark block and the ids at it.
+
+        With `tail` only swaps past the recorded watermark are applied. A
+        load that fails half way leaves the ledger unusable, so everything
+        is loaded again.
+        """
+        query = {}
+        with self._lock:
+            top, top_ids = self._ready.get(col_name, (None, set())) if tail else (None, set())
+        if top is not None:
+            query = {"blockNumber": {"$gte": top}}
+        seen, top_ids, batch = set(top_ids), set(top_ids), []
+        try:
+            cursor = self.db[col_name].find(query).sort([("timestamp", 1), ("_id", 1)])
+            for doc in cursor:
+                block = doc.get("blockNumber")
+                if block is not None and block == top and str(doc["_id"]) in seen:
+                    continue
+                if block is not None and (top is None or block >= top):
+                    if block != top:
+                        top, top_ids = block, set()
+                    top_ids.add(str(doc["_id"]))
+                batch.append(doc)
+                if len(batch) >= BOOTSTRAP_BATCH:
+                    self._apply_docs(col_name, batch)
+                    batch = []
+            self._apply_docs(col_name, batch)
+        except Exception:
+            self._reset()
+            raise
+        with self._lock:
+            self._ready[col_name] = (top, top_ids)
+            if top is not None:
+                self.watermarks[col_name] = top
+
+    def _apply_docs(self, col_name, docs):
+        with self._lock:
+            for doc in docs:
+                if all(not pd.isna(doc.get(field)) for field in self.require):
+                    self.ledger.apply(swap_from_doc(col_name, doc))
+            if docs:
+                self.version += 1
+                self.updated_at = time.time()
+
+    def _apply_change(self, change):
+        col_name = change["ns"]["coll"]
+        doc = change["fullDocument"]
+        with self._lock:
+            edge = self._ready.get(col_name)
+            if edge is None:
+                return
+            watermark, edge_ids = edge
+            block = doc.get("blockNumber")
+            if watermark is not None and block is not None:
+                if block < watermark or (block == watermark and str(doc["_id"]) in edge_ids):
+                    return
+            if block is not None and block > self.watermarks.get(col_name, block - 1):
+                self.watermarks[col_name] = block
+            self._apply_docs(col_name, [doc])
+
+
+class LiveFeed:
+    """A LiveLedger over some swap collections, kept current on a background thread.
+
+    Collections are loaded first, then followed on a change stream limited
+    to them; inserts the loads already saw are dropped by blockNumber
+    watermark, and swaps that arrived before the stream opened are fetched
+    from the watermark on, so nothing is missed or counted twice. On errors
+    the stream resumes after the last event; when that is no longer
+    possible everything is loaded again. Without change streams the ledger
+    still loads, `error` stays set and nothing new is applied.
+    `require` drops swaps missing any of those fields, like a dropna().
+
+    The thread stops when `stop()` is called or the feed is garbage
+    collected, e.g. once a cache drops it.
+    """
+
+    def __init__(self, db, collections, launch_blocks=None, require=()):
+        self._follower = _Follower(db, collections, launch_blocks, require)
+        weakref.finalize(self, self._follower._stop.set)
+
+    def __getattr__(self, name):
+        # ledger, error, streaming, version, updated_at, watermarks
+        if name == "_follower":
+            raise AttributeError(name)
+        return getattr(self._follower, name)
+
+    def start(self):
+        self._follower._thread.start()
+        return self
+
+    def stop(self):
+        self._follower._stop.set()
+
+    @property
+    def ready(self):
+        """True once every tracked collection has been loaded"""
+        return self._follower.ready
+
+    def wait_live(self, timeout):
+        """Wait up to `timeout` seconds for the loads and the change stream.
+
+        True once the ledger is loaded and following inserts; False on
+        timeout or as soon as the feed reports an error.
+        """
+        deadline = time.monotonic() + timeout
+        while not (self.ready and self.streaming):
+            if self.error is not None or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.5)
+        return True
+
+    def track(self, collections):
+        """Also follow these collections; new ones are loaded on the feed thread"""
+        self._follower.track(collections)
+
+    def table(self, snipers_only=False):
+        return self._follower.table(snipers_only)
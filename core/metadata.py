@@ -0,0 +1,139 @@
+import logging
+
+from pymongo.errors import PyMongoError
+
+from core.registry import swap_collection_names
+
+logger = logging.getLogger(__name__)
+
+METADATA_COLLECTION = "token_metadata"
+PROGRESS_COLLECTION = "swap_progress"
+PERSONAS_COLLECTION = "Personas"
+
+
+def progress_launch_blocks(db):
+    """token symbol -> genesis_block from swap_progress (the token page's launch blocks)"""
+    docs = db[PROGRESS_COLLECTION].find({}, {"token_symbol": 1, "genesis_block": 1})
+    return {doc["token_symbol"]: doc.get("genesis_block") for doc in docs if doc.get("token_symbol")}
+
+
+def persona_launch_blocks(db):
+    """symbol -> blockNumber from the Personas collection (the global page's), or None without any"""
+    try:
+        docs = db[PERSONAS_COLLECTION].find({}, {"symbol": 1, "blockNumber": 1})
+        blocks = {doc["symbol"]: doc["blockNumber"] for doc in docs if "symbol" in doc and "blockNumber" in doc}
+    except PyMongoError as e:
+        logger.warning("Could not read Personas launch blocks: %s", e)
+        return None
+    return blocks or None
+
+
+def _first_swap(db, token):
+    """Earliest swap tagged with the token, looking in its own collection first"""
+    own = f"{token.lower()}_swap"
+    others = [name for name in swap_collection_names(db) if name != own]
+    for col_name in [own] + others:
+        doc = db[col_name].find_one({"genesis_token_symbol": token}, sort=[("timestamp", 1)])
+        if doc:
+            return doc
+    return None
+
+
+def block_edge(collection):
+    """(highest blockNumber, swaps at it), or (None, 0) for an empty collection"""
+    top = collection.find_one({"blockNumber": {"$ne": None}}, {"blockNumber": 1}, sort=[("blockNumber", -1)])
+    if top is None:
+        return None, 0
+    return top["blockNumber"], collection.count_documents({"blockNumber": top["blockNumber"]})
+
+
+def build_token_metadata(db, token):
+    """Full metadata document for one token, or None when swap_progress does not know it"""
+    token = token.upper()
+    progress = db[PROGRESS_COLLECTION].find_one({"token_symbol": token})
+    if not progress:
+        return None
+    swap = _first_swap(db, token) or {}
+    swaps = db[f"{token.lower()}_swap"]
+    watermark, edge_count = block_edge(swaps)
+    return {
+        "_id": token,
+        "token_address": progress.get("token_address"),
+        "lp": progress.get("lp"),
+        "genesis_block": progress.get("genesis_block"),
+        "persona_name": swap.get("persona_name"),
+        "persona_dao": swap.get("persona_dao"),
+        "launch_timestamp": swap.get("timestamp"),
+        "swap_count": swaps.count_documents({}),
+        "watermark": watermark,
+        "edge_count": edge_count,
+    }
+
+
+def _catch_up(db, doc):
+    """Changes that bring a stored document up to its swap collection's edge.
+
+    {} when it is current, None when it was stored before the token had
+    swaps and must be rebuilt.
+    """
+    swaps = db[f"{doc['_id'].lower()}_swap"]
+    watermark, edge_count = block_edge(swaps)
+    if watermark is None or (watermark == doc.get("watermark") and edge_count == doc.get("edge_count")):
+        return {}
+    if doc.get("watermark") is None:
+        return None
+    # Swaps at the old watermark block were already counted up to edge_count
+    since = swaps.count_documents({"blockNumber": {"$gte": doc["watermark"]}})
+    return {"added": since - doc["edge_count"], "watermark": watermark, "edge_count": edge_count}
+
+
+def _caught_up(doc, change):
+    return {**doc, "swap_count": doc["swap_count"] + change["added"],
+            "watermark": change["watermark"], "edge_count": change["edge_count"]}
+
+
+def token_metadata(db, token):
+    """Metadata for a token with its swap count brought up to date, without writing.
+
+    Reads the document refresh_token_metadata stores and counts only the
+    swaps from its blockNumber watermark on, so the header needs one keyed
+    lookup plus a few indexed counts. A token without a stored document
+    is built from its collections.
+    """
+    token = token.upper()
+    doc = db[METADATA_COLLECTION].find_one({"_id": token})
+    change = None if doc is None else _catch_up(db, doc)
+    if change is None:
+        return build_token_metadata(db, token)
+    return _caught_up(doc, change) if change else doc
+
+
+def refresh_token_metadata(db, token):
+    """Build or bring up to date the stored metadata of one token; returns the document.
+
+    Run by the core.results job. The swap count is advanced with $inc,
+    filtered on the watermark it was counted from, so when two refreshes
+    race only the first one counts the new swaps.
+    """
+    token = token.upper()
+    store = db[METADATA_COLLECTION]
+    doc = store.find_one({"_id": token})
+    change = None if doc is None else _catch_up(db, doc)
+    if change is None:
+        fresh = build_token_metadata(db, token)
+        if fresh is None:
+            return doc
+        fields = {key: value for key, value in fresh.items() if key != "_id"}
+        if doc is None:
+            store.update_one({"_id": token}, {"$setOnInsert": fields}, upsert=True)
+        else:
+            store.update_one({"_id": token, "watermark": None}, {"$set": fields})
+        return fresh
+    if not change:
+        return doc
+    store.update_one(
+        {"_id": token, "watermark": doc["watermark"], "edge_count": doc["edge_count"]},
+        {"$inc": {"swap_count": change["added"]},
+         "$set": {"watermark": change["watermark"], "edge_count": change["edge_count"]}},
+    )
+    return _caught_up(doc, change)
@@ -0,0 +1,253 @@
+"""Per-stage timing, row counts, peak memory and cache hits for page renders.
+
+    with stage("snipers") as record:
+        snipers = detect(...)
+        record["rows"] = len(snipers)
+
+Every finished stage is logged as one JSON line on this module's logger
+(written to stderr with METRICS_LOG=1) and added to a process-wide
+registry that keeps the latest SAMPLE_SIZE durations per (page, stage)
+for p50/p95. With METRICS_PORT set, `serve()` exposes the registry and
+the result cache stats at /metrics (Prometheus text) and /metrics.json.
+Peak memory is traced with tracemalloc only when METRICS_MEMORY=1, since
+tracing slows Python-heavy stages down. Tracing is process-wide and stages
+run on several session threads, so an outermost stage reports its peak
+only when no other stage ran alongside it; overlapping ones report None.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SIZE = 1000
+TRACE_MEMORY = os.getenv("METRICS_MEMORY", "0") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Streamlit leaves application loggers unconfigured
+if os.getenv("METRICS_LOG", "0") == "1" and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Started once: starting and stopping per stage would cut across other threads' stages
+if TRACE_MEMORY:
+    tracemalloc.start()
+
+_page = contextvars.ContextVar("metrics_page", default=None)
+_render = contextvars.ContextVar("metrics_render", default=None)
+_current = contextvars.ContextVar("metrics_stage", default=None)
+
+
+class Registry:
+    """Recent durations and running totals per (page, stage)"""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.size = size
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record):
+        key = (record["page"] or "", record["stage"])
+        with self._lock:
+            entry = self._stages.get(key)
+            if entry is None:
+                entry = self._stages[key] = {
+                    "ms": deque(maxlen=self.size), "count": 0, "rows": 0, "hit": 0, "miss": 0, "peak_mb": None,
+                }
+            entry["ms"].append(record["ms"])
+            entry["count"] += 1
+            entry["rows"] += record["rows"] or 0
+            if record["cache"] in ("hit", "miss"):
+                entry[record["cache"]] += 1
+            if record["peak_mb"] is not None:
+                entry["peak_mb"] = record["peak_mb"]
+
+    def summary(self):
+        """One dict per (page, stage): count, p50/p95/max ms over the recent samples, rows, cache hits/misses"""
+        with self._lock:
+            items = [(key, dict(entry, ms=list(entry["ms"]))) for key, entry in self._stages.items()]
+        rows = []
+        for (page, name), entry in sorted(items):
+            ms = np.array(entry["ms"])
+            rows.append({
+                "page": page, "stage": name, "count": entry["count"],
+                "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(ms, 95)), 3),
+                "max_ms": round(float(ms.max()), 3),
+                "rows": entry["rows"], "cache_hit": entry["hit"], "cache_miss": entry["miss"],
+                "last_peak_mb": entry["peak_mb"],
+            })
+        return rows
+
+
+registry = Registry()
+
+_memory_lock = threading.Lock()
+_memory_slots = []
+
+
+def _trace_begin():
+    """Open a memory slot for an outermost stage, resetting the peak when it is the only one"""
+    with _memory_lock:
+        if _memory_slots:
+            for other in _memory_slots:
+                other[1] = True
+        else:
+            tracemalloc.reset_peak()
+        slot = [tracemalloc.get_traced_memory()[0], bool(_memory_slots)]
+        _memory_slots.append(slot)
+        return slot
+
+
+def _trace_end(slot):
+    """Peak MB allocated above the slot's start, or None when another stage overlapped it"""
+    with _memory_lock:
+        _memory_slots[:] = [other for other in _memory_slots if other is not slot]
+        start, shared = slot
+        return None if shared else round((tracemalloc.get_traced_memory()[1] - start) / 1e6, 3)
+
+
+def start_render(page):
+    """Begin a page run; stages recorded on this thread from now on belong to it"""
+    _page.set(page)
+    _render.set([])
+
+
+def render_records():
+    """Stage records of the current page run, in completion order"""
+    return list(_render.get() or [])
+
+
+@contextmanager
+def stage(name, rows=None, cached=False):
+    """Time a named stage; yields its record so `rows` can be filled in.
+
+    `cached=True` marks a call into a cached function: it counts as a hit
+    unless `cache_miss()` runs inside it.
+    """
+    record = {"page": _page.get(), "stage": name, "ms": None, "rows": rows,
+              "peak_mb": None, "cache": "hit" if cached else None}
+    # Only the outermost stage traces memory; nested ones would share its peak
+    slot = _trace_begin() if TRACE_MEMORY and _current.get() is None else None
+    token = _current.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        if slot is not None:
+            record["peak_mb"] = _trace_end(slot)
+        _current.reset(token)
+        registry.observe(record)
+        records = _render.get()
+        if records is not None:
+            records.append(record)
+        logger.info(json.dumps(record, default=str))
+
+
+def cache_miss():
+    """Call inside a cached function body: its stage was computed, not served from cache"""
+    record = _current.get()
+    if record is not None:
+        record["cache"] = "miss"
+
+
+def prometheus_text(summary=None):
+    """The registry in Prometheus text format"""
+    lines = [
+        "# TYPE sniperapp_stage_ms summary",
+        "# TYPE sniperapp_stage_rows_total counter",
+        "# TYPE sniperapp_stage_cache_total counter",
+    ]
+    for row in summary if summary is not None else registry.summary():
+        labels = f'page="{row["page"]}",stage="{row["stage"]}"'
+        lines.append(f'sniperapp_stage_ms{{{labels},quantile="0.5"}} {row["p50_ms"]}')
+        lines.append(f'sniperapp_stage_ms{{{labels},quantile="0.95"}} {row["p95_ms"]}')
+        lines.append(f"sniperapp_stage_ms_count{{{labels}}} {row['count']}")
+        lines.append(f"sniperapp_stage_rows_total{{{labels}}} {row['rows']}")
+        lines.append(f'sniperapp_stage_cache_total{{{labels},result="hit"}} {row["cache_hit"]}')
+        lines.append(f'sniperapp_stage_cache_total{{{labels},result="miss"}} {row["cache_miss"]}')
+    from core.cache import result_cache
+    cache = result_cache.stats()
+    lines.append("# TYPE sniperapp_result_cache_bytes gauge")
+    lines.append(f"sniperapp_result_cache_bytes {cache['bytes']}")
+    lines.append(f"sniperapp_result_cache_max_bytes {cache['max_bytes']}")
+    lines.append(f"sniperapp_result_cache_entries {cache['entries']}")
+    lines.append("# TYPE sniperapp_result_cache_total counter")
+    for result in ("hits", "misses", "evictions"):
+        lines.append(f'sniperapp_result_cache_total{{result="{result}"}} {cache[result]}')
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, kind = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            from core.cache import result_cache
+            body = json.dumps({"stages": registry.summary(), "result_cache": result_cache.stats()}).encode()
+            kind = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=METRICS_PORT):
+    """Start the metrics endpoint once per process; a no-op when `port` is 0"""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+def debug_panel():
+    """Sidebar table of this run's stages and the process-wide p50/p95 of the page"""
+    import pandas as pd
+    import streamlit as st
+
+    from core.cache import result_cache
+
+    page = _page.get()
+    with st.sidebar.expander("⏱ Stage timings", expanded=False):
+        records = render_records()
+        if records:
+            st.dataframe(pd.DataFrame(records).drop(columns=["page"]), hide_index=True)
+        summary = [row for row in registry.summary() if row["page"] == (page or "")]
+        if summary:
+            st.caption("Across runs in this process")
+            st.dataframe(pd.DataFrame(summary).drop(columns=["page"]), hide_index=True)
+        cache = result_cache.stats()
+        st.caption(f"Result cache: {cache['entries']} entries, {cache['bytes'] / 1e6:,.1f} of "
+                   f"{cache['max_bytes'] / 1e6:,.0f} MB, {cache['hits']} hits, {cache['misses']} misses, "
+                   f"{cache['evictions']} evictions")
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.pnl import PAIR_KEYS, fifo_pnl, latest_prices
+from core.snipers import detect_snipers
+
+# Worker processes for sharded analysis; 1 keeps everything in-process
+WORKERS = max(1, int(os.getenv("ANALYSIS_WORKERS", "1")))
+
+_pool = None
+_pool_size = 0
+_lock = threading.Lock()
+
+
+def get_pool(workers=WORKERS):
+    """Shared process pool, recreated only when a different size is asked for.
+
+    Workers are spawned rather than forked so they never inherit the
+    Streamlit server's threads and locks.
+    """
+    global _pool, _pool_size
+    with _lock:
+        if _pool is None or _pool_size != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = workers
+        return _pool
+
+
+def shard_ids(df, shards, by="maker"):
+    """Shard number per row from a stable hash of the maker (or token_name) column"""
+    column = "token_name" if by == "token" else "maker"
+    hashed = pd.util.hash_array(df[column].astype(str).to_numpy())
+    return (hashed % np.uint64(shards)).astype("int64")
+
+
+def split(df, shards, by="maker"):
+    ids = shard_ids(df, shards, by)
+    return [df[ids == i] for i in range(shards)]
+
+
+def run_sharded(func, shard_args, workers=WORKERS):
+    """func(*args) for every entry of `shard_args`, results in input order"""
+    if workers <= 1 or len(shard_args) <= 1:
+        return [func(*args) for args in shard_args]
+    return list(get_pool(workers).map(func, *zip(*shard_args)))
+
+
+def parallel_snipers(swaps, launch_blocks, amount_col="OUT_BeforeTax", workers=WORKERS, by="maker"):
+    """detect_snipers across worker processes; identical rows and order to the serial call"""
+    if workers <= 1:
+        return detect_snipers(swaps, launch_blocks, amount_col)
+    shard_args = [(part, launch_blocks, amount_col) for part in split(swaps, workers, by) if not part.empty]
+    parts = run_sharded(detect_snipers, shard_args, workers)
+    if not parts:
+        return detect_snipers(swaps, launch_blocks, amount_col)
+    return pd.concat(parts).sort_index(kind="stable")
+
+
+def parallel_fifo_pnl(swaps, pairs=None, prices=None, stats=True, workers=WORKERS, by="maker"):
+    """fifo_pnl across worker processes.
+
+    Pairs never straddle shards, prices come from the whole frame, and
+    the merged table is put back in the serial row order (the order of
+    `pairs`, or first appearance in `swaps`), so the output does not
+    depend on the worker count.
+    """
+    if prices is None:
+        prices = latest_prices(swaps)
+    if workers <= 1:
+        return fifo_pnl(swaps, pairs, prices, stats)
+
+    swap_parts = split(swaps, workers, by)
+    if pairs is None:
+        shard_args = [(part, None, prices, stats) for part in swap_parts if not part.empty]
+        order = swaps[PAIR_KEYS].astype(object).drop_duplicates()
+    else:
+        pairs = pairs[PAIR_KEYS].astype(object).drop_duplicates()
+        pair_parts = split(pairs, workers, by)
+        shard_args = [(part, pair_part, prices, stats)
+                      for part, pair_part in zip(swap_parts, pair_parts) if not pair_part.empty]
+        order = pairs
+    if not shard_args:
+        return fifo_pnl(swaps.iloc[:0], pairs, prices, stats)
+
+    merged = pd.concat(run_sharded(fifo_pnl, shard_args, workers), ignore_index=True)
+    return order.reset_index(drop=True).merge(merged, on=PAIR_KEYS, how="inner")
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+from core.prices import PriceIndex
+from core.segments import group_codes, segment_bounds, segment_order
+
+PAIR_KEYS = ["maker", "token_name"]
+
+# Columns returned by fifo_pnl, one row per (maker, token_name) pair
+LEDGER_COLUMNS = PAIR_KEYS + ["realized_pnl", "unrealized_pnl", "remaining_tokens"]
+PNL_COLUMNS = LEDGER_COLUMNS + [
+    "buy_count", "sell_count", "first_buy_time", "last_sell_time",
+    "avg_buy_price", "avg_sell_price", "total_tax", "total_fee",
+    "buy_usd", "sell_usd",
+]
+
+
+def _num(df, col, order=None):
+    """Column as float array (optionally reordered), missing column or NaN -> 0"""
+    if col not in df.columns:
+        return np.zeros(len(df))
+    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    if order is not None:
+        values = values[order]
+    return np.nan_to_num(values, nan=0.0)
+
+
+def strip_token_prefix(df, token):
+    """Rename {TOKEN}_OUT_BeforeTax style columns to OUT_BeforeTax"""
+    prefix = f"{token.upper()}_"
+    return df.rename(columns=lambda c: c[len(prefix):] if isinstance(c, str) and c.startswith(prefix) else c)
+
+
+def latest_prices(swaps):
+    """Latest genesis_usdc_price per token (by timestamp, last row wins ties)"""
+    return PriceIndex(swaps).latest
+
+
+def revalue(pnl, prices):
+    """Copy of a fifo_pnl table with unrealized PnL at `prices`"""
+    pnl = pnl.copy()
+    latest = pnl["token_name"].map(prices).astype(float).fillna(0.0)
+    pnl["unrealized_pnl"] = pnl["remaining_tokens"] * latest
+    return pnl
+
+
+def fifo_pnl(swaps, pairs=None, prices=None, stats=True):
+    """FIFO realized/unrealized PnL and trade stats per (maker, token_name).
+
+    `swaps` uses the unprefixed amount columns (OUT_BeforeTax, OUT_AfterTax,
+    IN_BeforeTax, IN_AfterTax). Only `pairs` are computed when given, in
+    their order; `prices` maps token -> latest price and defaults to the
+    latest swap price of each token in `swaps`. With `stats=False` only
+    LEDGER_COLUMNS are returned, for callers that get trade stats elsewhere.
+
+    The frame is sorted once and split into per-pair segments. Lots are
+    consumed front to back, so the amount consumed after swap k is
+    C_k = min(C_{k-1} + sold_k, bought_k) = S_k + min(0, cummin(B - S)),
+    which turns the lot-matching loop into segmented cumulative sums.
+    """
+    if prices is None:
+        prices = latest_prices(swaps)
+    if pairs is not None:
+        pairs = pairs[PAIR_KEYS].astype(object).drop_duplicates()
+        wanted = pd.MultiIndex.from_frame(pairs)
+        swaps = swaps[pd.MultiIndex.from_frame(swaps[PAIR_KEYS]).isin(wanted)]
+    columns = PNL_COLUMNS if stats else LEDGER_COLUMNS
+    if swaps.empty:
+        return pd.DataFrame(columns=columns)
+
+    # ── One stable sort: by pair (first appearance), then timestamp ──
+    pair_code = group_codes(swaps, PAIR_KEYS)
+    order = segment_order(pair_code, swaps["timestamp"].to_numpy())
+    seg = pair_code[order]
+    n_seg = int(seg.max()) + 1
+    first_row, last_row = segment_bounds(seg)
+
+    n = len(order)
+    is_buy = (swaps["swapType"] == "buy").to_numpy(dtype=bool, na_value=False)[order]
+    is_sell = (swaps["swapType"] == "sell").to_numpy(dtype=bool, na_value=False)[order]
+    raw_price = pd.to_numeric(swaps["genesis_usdc_price"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)[order]
+    price = np.nan_to_num(raw_price, nan=0.0)
+    out_before = _num(swaps, "OUT_BeforeTax", order)
+    out_after = _num(swaps, "OUT_AfterTax", order)
+    in_before = _num(swaps, "IN_BeforeTax", order)
+    in_after = _num(swaps, "IN_AfterTax", order)
+
+    # ── Lots and sells that take part in matching ──
+    lot_buy = is_buy & (price > 0) & (out_before > 0) & (out_after > 0)
+    lot_sell = is_sell & (price > 0) & (in_after > 0) & (in_before > 0)
+    lot_qty = np.where(lot_buy, out_after, 0.0)
+    lot_cost = np.where(lot_buy, out_before * price, 0.0)
+    sell_qty = np.where(lot_sell, in_before, 0.0)
+    sell_rate = np.divide(in_after * price, sell_qty, out=np.zeros(n), where=lot_sell)
+
+    # ── Segmented cumulative sums -> consumed lot quantity per swap ──
+    running = pd.DataFrame({"bought": lot_qty, "sold": sell_qty}).groupby(seg).cumsum()
+    bought = running["bought"].to_numpy()
+    sold = running["sold"].to_numpy()
+    floor = pd.Series(bought - sold).groupby(seg).cummin().to_numpy()
+    consumed = sold + np.minimum(floor, 0.0)
+    consumed_before = np.r_[0.0, consumed[:-1]]
+    consumed_before[first_row] = 0.0
+    matched = np.where(lot_sell, consumed - consumed_before, 0.0)
+
+    # ── Realized: proceeds of matched sells minus cost of consumed lots ──
+    consumed_total = consumed[last_row]
+    lot_start = bought - lot_qty
+    used = np.divide(consumed_total[seg] - lot_start, lot_qty, out=np.zeros(n), where=lot_buy)
+    used = np.clip(used, 0.0, 1.0)
+    proceeds = np.bincount(seg, weights=sell_rate * matched, minlength=n_seg)
+    cost = np.bincount(seg, weights=lot_cost * used, minlength=n_seg)
+    remaining = np.maximum(bought[last_row] - consumed_total, 0.0)
+
+    # Keys leave as plain objects so categorical swap frames do not leak
+    # unobserved categories into groupbys on the result
+    result = swaps[PAIR_KEYS].iloc[order[last_row]].astype(object).reset_index(drop=True)
+    result["realized_pnl"] = proceeds - cost
+    result["remaining_tokens"] = remaining
+    latest = result["token_name"].map(prices).astype(float).fillna(0.0).to_numpy()
+    result["unrealized_pnl"] = remaining * latest
+
+    if stats:
+        result = pd.concat([result, _trade_stats(swaps, order, seg, is_buy, is_sell, raw_price)], axis=1)
+    result = result[columns]
+    if pairs is not None:
+        result = pairs.merge(result, on=PAIR_KEYS, how="inner")
+    return result
+
+
+def _trade_stats(swaps, order, seg, is_buy, is_sell, raw_price):
+    """Counts, first/last times, average prices and totals per segment"""
+    price = np.nan_to_num(raw_price, nan=0.0)
+    times = pd.Series(swaps["timestampReadable"].to_numpy()[order])
+    return pd.DataFrame({
+        "buy_count": is_buy,
+        "sell_count": is_sell,
+        "first_buy_time": times.where(is_buy),
+        "last_sell_time": times.where(is_sell),
+        "avg_buy_price": np.where(is_buy, raw_price, np.nan),
+        "avg_sell_price": np.where(is_sell, raw_price, np.nan),
+        "total_tax": _num(swaps, "Tax_1pct", order),
+        "total_fee": _num(swaps, "transactionFee", order),
+        "buy_usd": np.where(is_buy, price * _num(swaps, "OUT_AfterTax", order), 0.0),
+        "sell_usd": np.where(is_sell, price * _num(swaps, "IN_AfterTax", order), 0.0),
+    }).groupby(seg).agg({
+        "buy_count": "sum",
+        "sell_count": "sum",
+        "first_buy_time": "min",
+        "last_sell_time": "max",
+        "avg_buy_price": "mean",
+        "avg_sell_price": "mean",
+        "total_tax": "sum",
+        "total_fee": "sum",
+        "buy_usd": "sum",
+        "sell_usd": "sum",
+    }).reset_index(drop=True)
@@ -0,0 +1,108 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+
+def _column(swaps, name):
+    """`name` or the single `{TOKEN}_name` column of a frame that still has prefixed amounts"""
+    if name in swaps.columns:
+        return swaps[name]
+    matches = [col for col in swaps.columns if isinstance(col, str) and col.endswith(f"_{name}")]
+    return swaps[matches[0]] if len(matches) == 1 else None
+
+
+def _floats(values, n):
+    if values is None:
+        return np.full(n, np.nan)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _epoch(when):
+    """Epoch seconds of a datetime/Timestamp (naive means UTC) or a number"""
+    if isinstance(when, (datetime, date, pd.Timestamp)):
+        return pd.Timestamp(when).timestamp()
+    return float(when)
+
+
+class _Series:
+    __slots__ = ("times", "time_prices", "cum_usd", "cum_qty", "blocks", "block_prices")
+
+
+class PriceIndex:
+    """Per-token genesis_usdc_price series, built once from a swap frame.
+
+    `latest` maps token -> price of its latest swap by timestamp (the last
+    row wins ties) and is a dict lookup; core.pnl.latest_prices returns it.
+    `as_of` finds the price at a time or block by binary search, and
+    `vwap` averages over a time window from prefix sums, weighting each
+    swap by its token leg (OUT_AfterTax for buys, IN_AfterTax for sells).
+    Swaps without a time are left out of the time series, and swaps
+    without a block out of the block series.
+    """
+
+    def __init__(self, swaps):
+        self.latest = {}
+        self._series = {}
+        if swaps is None or swaps.empty:
+            return
+        n = len(swaps)
+        codes, tokens = pd.factorize(swaps["token_name"])
+        times = _floats(swaps["timestamp"], n)
+        blocks = _floats(swaps.get("blockNumber"), n)
+        price = _floats(swaps["genesis_usdc_price"], n)
+        side = swaps["swapType"].astype(object).to_numpy()
+        qty = np.where(side == "buy", _floats(_column(swaps, "OUT_AfterTax"), n),
+                       np.where(side == "sell", _floats(_column(swaps, "IN_AfterTax"), n), 0.0))
+        # Swaps without a price or amount carry no weight
+        qty = np.where(np.isnan(price) | np.isnan(qty), 0.0, qty)
+
+        by_time = np.flatnonzero((codes >= 0) & ~np.isnan(times))
+        by_time = by_time[np.lexsort((times[by_time], codes[by_time]))]
+        by_block = np.flatnonzero((codes >= 0) & ~np.isnan(blocks))
+        by_block = by_block[np.lexsort((blocks[by_block], codes[by_block]))]
+        time_bounds = np.searchsorted(codes[by_time], np.arange(len(tokens) + 1))
+        block_bounds = np.searchsorted(codes[by_block], np.arange(len(tokens) + 1))
+
+        for code, token in enumerate(tokens):
+            rows = by_time[time_bounds[code]:time_bounds[code + 1]]
+            block_rows = by_block[block_bounds[code]:block_bounds[code + 1]]
+            series = _Series()
+            series.times = times[rows]
+            series.time_prices = price[rows]
+            series.cum_usd = np.r_[0.0, np.cumsum(np.nan_to_num(price[rows]) * qty[rows])]
+            series.cum_qty = np.r_[0.0, np.cumsum(qty[rows])]
+            series.blocks = blocks[block_rows]
+            series.block_prices = price[block_rows]
+            self._series[token] = series
+            if len(rows):
+                self.latest[token] = float(price[rows[-1]])
+
+    def __contains__(self, token):
+        return token in self._series
+
+    def as_of(self, token, time=None, block=None):
+        """Price of the token's last swap at or before `time` (or `block`); NaN before its first swap"""
+        series = self._series.get(token)
+        if series is None:
+            return np.nan
+        if block is not None:
+            keys, prices, value = series.blocks, series.block_prices, float(block)
+        else:
+            keys, prices, value = series.times, series.time_prices, _epoch(time)
+        i = np.searchsorted(keys, value, side="right")
+        return float(prices[i - 1]) if i else np.nan
+
+    def prices_as_of(self, time=None, block=None):
+        """token -> as_of price for every token, for revaluing a PnL table at that point"""
+        return {token: self.as_of(token, time, block) for token in self._series}
+
+    def vwap(self, token, start=None, end=None):
+        """Volume-weighted price over swaps with start <= time <= end; NaN without volume"""
+        series = self._series.get(token)
+        if series is None:
+            return np.nan
+        lo = 0 if start is None else np.searchsorted(series.times, _epoch(start), side="left")
+        hi = len(series.times) if end is None else np.searchsorted(series.times, _epoch(end), side="right")
+        qty = series.cum_qty[hi] - series.cum_qty[lo]
+        return float((series.cum_usd[hi] - series.cum_usd[lo]) / qty) if qty > 0 else np.nan
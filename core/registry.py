@@ -0,0 +1,64 @@
+import threading
+import time
+
+from core.db import get_db
+
+PROGRESS_COLLECTION = "swap_progress"
+# Seconds a discovered token list is reused before it is looked up again
+REGISTRY_TTL = 600
+
+
+def swap_collection_names(db):
+    """Names of the `{token}_swap` collections, sorted; a name-only listing"""
+    return sorted(db.list_collection_names(filter={"name": {"$regex": "_swap$"}}))
+
+
+class TokenRegistry:
+    """Launched tokens that have a swap collection, discovered once and shared.
+
+    A token is listed when swap_progress has its symbol and its
+    `{token}_swap` collection exists. The list is rediscovered after `ttl`
+    seconds or right after `invalidate()`, e.g. once a new token is launched.
+    """
+
+    def __init__(self, db, ttl=REGISTRY_TTL):
+        self.db = db
+        self.ttl = ttl
+        self._tokens = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _discover(self):
+        existing = {name[: -len("_swap")] for name in swap_collection_names(self.db)}
+        launched = {str(symbol).lower() for symbol in self.db[PROGRESS_COLLECTION].distinct("token_symbol") if symbol}
+        return sorted(launched & existing)
+
+    def tokens(self):
+        """Lowercase token names, sorted"""
+        with self._lock:
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+            if stale:
+                self._tokens = self._discover()
+                self._loaded_at = time.monotonic()
+            return list(self._tokens)
+
+    def collections(self):
+        return [f"{token}_swap" for token in self.tokens()]
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def get_registry():
+    """The process-wide registry over the shared database"""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = TokenRegistry(get_db())
+    return _registry
@@ -0,0 +1,220 @@
+"""Precompute sniper and PnL tables for every token and store them in MongoDB.
+
+    python -m core.results [--tokens jarvis ...] [--force] [--every SECONDS]
+
+Each run loads a token's swaps, runs sniper detection and FIFO PnL the
+way the pages do and stores one row per wallet, stamped with the
+blockNumber watermark of the swaps it saw. Tokens whose swaps have not
+changed since their last run are skipped. Each run also brings the
+token_metadata document the token page's header reads up to date.
+"""
+import argparse
+import logging
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from core.db import get_db
+from core.metadata import block_edge, persona_launch_blocks, progress_launch_blocks, refresh_token_metadata
+from core.parallel import parallel_fifo_pnl, parallel_snipers
+from core.pnl import PAIR_KEYS, PNL_COLUMNS, latest_prices, strip_token_prefix
+from core.registry import get_registry
+from core.schema import coerce_swaps
+from core.snapshot import snapshot_store
+from core.sync import load_collection
+
+logger = logging.getLogger(__name__)
+
+# One summary document per (token, scope) pointing at its latest run
+RESULTS_COLLECTION = "token_results"
+# One PnL row per (token, scope, run, maker)
+WALLET_PNL_COLLECTION = "wallet_pnl"
+WALLET_PNL_INDEXES = [
+    [("run_id", 1), ("row", 1)],
+    [("token", 1), ("scope", 1)],
+]
+
+# "token": the token page, every swap, swap_progress genesis blocks, all wallets.
+# "global": the global page, swaps with fee and price, Personas launch
+# blocks, sniper wallets only.
+SCOPES = ("token", "global")
+# Columns of a stored wallet row, in the order the pages use
+RESULT_COLUMNS = PNL_COLUMNS + ["sniper"]
+
+
+def decode_swaps(col_name, docs):
+    """Swap documents as a typed frame with unprefixed amount columns"""
+    token = col_name[: -len("_swap")].upper()
+    df = pd.DataFrame(docs).drop(columns=["_id"], errors="ignore")
+    df["token_name"] = token
+    return coerce_swaps(strip_token_prefix(df, token))
+
+
+def wallet_table(swaps, launch_block, all_wallets=True):
+    """(sniper rows, PnL per wallet with a `sniper` flag) for one token's swaps"""
+    token = swaps["token_name"].iat[0]
+    launch_blocks = {} if launch_block is None else {token: launch_block}
+    snipers = parallel_snipers(swaps, launch_blocks)
+    pairs = None if all_wallets else snipers[PAIR_KEYS]
+    pnl = parallel_fifo_pnl(swaps, pairs, prices=latest_prices(swaps))
+    pnl["sniper"] = pnl["maker"].isin(set(snipers["maker"].astype(object)))
+    return snipers, pnl
+
+
+def _records(frame):
+    """Rows as BSON-ready dicts: NaN and NaT become None, numpy scalars plain Python"""
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict("records")
+
+
+def store_results(db, token, scope, pnl, summary):
+    """Write a run's rows, then point the summary at it.
+
+    Readers only follow the summary's run_id, so they never see a half
+    written run. Rows of the run before are kept until the next one, for
+    readers that fetched the previous summary just before the switch.
+    """
+    results = db[RESULTS_COLLECTION]
+    rows = db[WALLET_PNL_COLLECTION]
+    key = f"{token}:{scope}"
+    previous = results.find_one({"_id": key}, {"run_id": 1}) or {}
+    run_id = uuid.uuid4().hex
+
+    records = _records(pnl.reindex(columns=RESULT_COLUMNS).assign(
+        token=token, scope=scope, run_id=run_id, row=range(len(pnl))))
+    if records:
+        rows.insert_many(records, ordered=False)
+    results.replace_one({"_id": key}, {
+        "_id": key, "token": token, "scope": scope, "run_id": run_id,
+        "wallet_count": len(pnl), "sniper_count": int(pnl["sniper"].sum()) if len(pnl) else 0,
+        "computed_at": datetime.now(timezone.utc), **summary,
+    }, upsert=True)
+    keep = [run_id] + ([previous["run_id"]] if previous.get("run_id") else [])
+    rows.delete_many({"token": token, "scope": scope, "run_id": {"$nin": keep}})
+    return run_id
+
+
+def _up_to_date(stored, head, launch_block):
+    return (stored is not None and stored.get("watermark") == head[0]
+            and stored.get("edge_count") == head[1] and stored.get("launch_block") == launch_block)
+
+
+def refresh_token(db, token, launch_blocks, force=False, snapshots=None):
+    """Recompute and store both scopes of one token; returns the scopes written"""
+    token = token.upper()
+    col_name = f"{token.lower()}_swap"
+    head = block_edge(db[col_name])
+    stored = {doc["scope"]: doc for doc in db[RESULTS_COLLECTION].find({"token": token})}
+    pending = [scope for scope in SCOPES
+               if force or not _up_to_date(stored.get(scope), head, launch_blocks[scope](token))]
+    if not pending:
+        return []
+
+    swaps = load_collection(db, col_name, lambda name: None, decode_swaps, snapshots=snapshots)
+    if swaps is None or swaps.empty:
+        swaps = None
+        watermark, edge_count = None, 0
+    else:
+        blocks = swaps["blockNumber"]
+        watermark = int(blocks.max())
+        edge_count = int((blocks == watermark).sum())
+
+    for scope in pending:
+        launch_block = launch_blocks[scope](token)
+        frame = swaps
+        if scope == "global" and frame is not None:
+            required = [col for col in ("transactionFee", "genesis_usdc_price") if col in frame.columns]
+            frame = frame.dropna(subset=required)
+        if frame is None or frame.empty:
+            pnl = pd.DataFrame(columns=RESULT_COLUMNS)
+        else:
+            pnl = wallet_table(frame, launch_block, all_wallets=(scope == "token"))[1]
+        store_results(db, token, scope, pnl, {
+            "watermark": watermark, "edge_count": edge_count, "launch_block": launch_block,
+        })
+    return pending
+
+
+def run(db, tokens, force=False):
+    """[(token, status)] per token, refreshed in turn; status lists the scopes written, "up to date" or the error"""
+    progress_blocks = progress_launch_blocks(db)
+    persona_blocks = persona_launch_blocks(db)
+    snapshots = snapshot_store("results")
+
+    def global_block(token):
+        if persona_blocks is not None:
+            return persona_blocks.get(token)
+        # Without Personas the global page uses each token's first swap block
+        first = db[f"{token.lower()}_swap"].find_one({"blockNumber": {"$ne": None}}, {"blockNumber": 1},
+                                                     sort=[("blockNumber", 1)])
+        return None if first is None else first["blockNumber"]
+
+    launch_blocks = {"token": progress_blocks.get, "global": global_block}
+    report = []
+    for token in tokens:
+        try:
+            refresh_token_metadata(db, token)
+            written = refresh_token(db, token, launch_blocks, force, snapshots)
+            status = ", ".join(written) if written else "up to date"
+        except Exception as e:
+            logger.exception("Could not refresh results for %s", token)
+            status = f"error: {e}"
+        report.append((token.upper(), status))
+    return report
+
+
+# ───── Readers ─────
+
+def stored_results(db, scope, tokens):
+    """(summaries by token, wallet rows of their latest runs), or None when a token has no results"""
+    tokens = [token.upper() for token in tokens]
+    summaries = {doc["token"]: doc for doc in db[RESULTS_COLLECTION].find({"scope": scope, "token": {"$in": tokens}})}
+    if not tokens or set(tokens) - set(summaries):
+        return None
+    run_ids = [doc["run_id"] for doc in summaries.values()]
+    docs = db[WALLET_PNL_COLLECTION].find({"run_id": {"$in": run_ids}}, {"_id": 0}).sort([("run_id", 1), ("row", 1)])
+    rows = pd.DataFrame(list(docs)).reindex(columns=RESULT_COLUMNS + ["token"])
+    # Keep the token order of `tokens`, rows in their stored order within each
+    rows["token"] = pd.Categorical(rows["token"], categories=tokens)
+    rows = rows.sort_values("token", kind="stable").drop(columns=["token"]).reset_index(drop=True)
+    rows["sniper"] = rows["sniper"].astype(bool)
+    return summaries, rows
+
+
+def blocks_behind(db, summary):
+    """Blocks between a stored run's watermark and its collection's head, or None"""
+    head = block_edge(db[f"{summary['token'].lower()}_swap"])[0]
+    if head is None or summary.get("watermark") is None:
+        return None
+    return head - summary["watermark"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.results", description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", nargs="+", help="token symbols (default: every registered token)")
+    parser.add_argument("--force", action="store_true", help="recompute tokens that look up to date")
+    parser.add_argument("--every", type=float, metavar="SECONDS", help="keep running, one pass per interval")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db = get_db()
+    while True:
+        started = time.monotonic()
+        registry = get_registry()
+        registry.invalidate()
+        report = run(db, args.tokens or registry.tokens(), args.force)
+        for token, status in report:
+            print(f"{token:<12}  {status}")
+        failed = [token for token, status in report if status.startswith("error")]
+        refreshed = [token for token, status in report if status != "up to date" and token not in failed]
+        print(f"{len(report)} tokens checked, {len(refreshed)} refreshed, {len(failed)} failed")
+        if args.every is None:
+            return 1 if failed else 0
+        time.sleep(max(0.0, args.every - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Target dtype per swap field. "int64" columns with missing values become
+# nullable "Int64" instead of falling back to float.
+SWAP_DTYPES = {
+    "maker": "category",
+    "token_name": "category",
+    "swapType": "category",
+    "label": "category",
+    "timestamp": "int64",
+    "blockNumber": "int64",
+    "genesis_usdc_price": "float64",
+    "genesis_virtual_price": "float64",
+    "virtual_usdc_price": "float64",
+    "transactionFee": "float64",
+    "Tax_1pct": "float32",
+}
+# Token/VIRTUAL amount columns, matched by suffix so `{TOKEN}_`-prefixed
+# and stripped names both get float64
+AMOUNT_SUFFIXES = ("OUT_BeforeTax", "OUT_AfterTax", "IN_BeforeTax", "IN_AfterTax", "_IN", "_OUT")
+
+
+def field_dtype(col):
+    if col in SWAP_DTYPES:
+        return SWAP_DTYPES[col]
+    if isinstance(col, str) and col.endswith(AMOUNT_SUFFIXES):
+        return "float64"
+    return None
+
+
+def coerce_swaps(df):
+    """Swap frame with the declared dtypes, coerced once at load.
+
+    `timestampReadable` keeps the stored string's time, parsed as the pages
+    always did; only rows where it is missing or unparseable get the epoch
+    `timestamp` (UTC) instead. Columns the schema does not know are left
+    as they are.
+    """
+    df = df.copy()
+    for col in df.columns:
+        dtype = field_dtype(col)
+        if dtype is None:
+            continue
+        if dtype == "category":
+            df[col] = df[col].astype("category")
+        elif dtype == "int64":
+            values = pd.to_numeric(df[col], errors="coerce")
+            df[col] = values.astype("int64") if values.notna().all() else values.astype("Int64")
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+
+    if "timestampReadable" in df.columns:
+        times = pd.to_datetime(df["timestampReadable"], errors="coerce")
+        if "timestamp" in df.columns and times.isna().any():
+            epoch = pd.to_datetime(df["timestamp"], unit="s")
+            if times.dt.tz is not None:
+                epoch = epoch.dt.tz_localize("UTC").dt.tz_convert(times.dt.tz)
+            times = times.fillna(epoch)
+        df["timestampReadable"] = times
+    elif "timestamp" in df.columns:
+        df["timestampReadable"] = pd.to_datetime(df["timestamp"], unit="s")
+    return df
+
+
+def concat_frames(frames):
+    """pd.concat that keeps categorical columns categorical across differing categories"""
+    frames = [frame for frame in frames if frame is not None]
+    if len(frames) > 1:
+        for col in frames[0].columns:
+            if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+                try:
+                    categories = union_categoricals([f[col] for f in frames], ignore_order=True).categories
+                except TypeError:
+                    # Categories of different types; pd.concat falls back to object
+                    continue
+                frames = [f.assign(**{col: f[col].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+
+def group_codes(df, keys):
+    """Integer code per row for the combination of `keys`, in first-appearance order"""
+    codes = np.zeros(len(df), dtype="int64")
+    for key in keys:
+        key_codes, uniques = pd.factorize(df[key], use_na_sentinel=False)
+        codes, _ = pd.factorize(codes * len(uniques) + key_codes)
+        codes = codes.astype("int64")
+    return codes
+
+
+def segment_order(codes, ts):
+    """Stable row order by (codes, ts); one radix-friendly key when ts is integral and it fits int64"""
+    if np.issubdtype(ts.dtype, np.integer) and len(ts):
+        ts = ts.astype("int64") - ts.min()
+        span = int(ts.max()) + 1
+        if (int(codes.max()) + 1) * span < 2 ** 63:
+            return np.argsort(codes.astype("int64") * span + ts, kind="stable")
+    return np.lexsort((ts, codes))
+
+
+def segment_bounds(sorted_codes):
+    """First and last row of each run of equal codes in a sorted code array"""
+    boundary = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1])
+    return np.r_[0, boundary + 1], np.r_[boundary, len(sorted_codes) - 1]
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialised
+    fcntl = None
+
+import pandas as pd
+
+from core.schema import concat_frames
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes; older snapshots are then ignored
+SNAPSHOT_FORMAT = 3
+# Part files per collection before they are merged into one
+MAX_PARTS = 16
+
+
+class SnapshotStore:
+    """On-disk Parquet snapshots of decoded swap frames, one directory per collection.
+
+    Each sync writes only its new tail as another part file, and
+    `state.json` records the parts together with the blockNumber watermark
+    and the ids already held at that block. A snapshot is only as current
+    as its state file, so a part written without its state update is never
+    read. Snapshots are skipped (with a log line) when Parquet support is
+    missing or a frame cannot be written.
+
+    Several loaders may share a store, in one process or across processes,
+    so each collection is guarded by a file lock and a tail is only written
+    on top of the state it was fetched from. A loader that finds the
+    snapshot already moved on skips its write instead of duplicating rows.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _dir(self, col_name):
+        return os.path.join(self.root, col_name)
+
+    @contextmanager
+    def _locked(self, col_name, exclusive):
+        """flock on the collection's lock file; each open() gets its own lock, so threads are serialised too"""
+        if fcntl is None:
+            with self._lock:
+                yield
+            return
+        os.makedirs(self._dir(col_name), exist_ok=True)
+        with open(os.path.join(self._dir(col_name), ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_state(self, col_name):
+        try:
+            with open(os.path.join(self._dir(col_name), "state.json")) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("format") == SNAPSHOT_FORMAT else None
+
+    def _write_state(self, col_name, state):
+        path = os.path.join(self._dir(col_name), "state.json")
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def load(self, col_name):
+        """(frame, watermark, edge ids) from the snapshot, or None"""
+        if not os.path.isdir(self._dir(col_name)):
+            return None
+        try:
+            with self._locked(col_name, exclusive=False):
+                state = self._read_state(col_name)
+                if state is None:
+                    return None
+                parts = [pd.read_parquet(os.path.join(self._dir(col_name), name)) for name in state["parts"]]
+        except Exception as e:
+            logger.warning("Ignoring snapshot of %s: %s", col_name, e)
+            return None
+        frame = concat_frames(parts) if parts else None
+        return frame, state["watermark"], set(state["edge_ids"])
+
+    def append(self, col_name, frame, watermark, edge_ids, since=None, since_ids=()):
+        """Persist a new tail and the watermark it brings the collection to.
+
+        `since` and `since_ids` are the watermark and edge ids the tail was
+        fetched from (None for a full load). The write is skipped when the
+        stored snapshot is no longer at that point.
+        """
+        try:
+            with self._locked(col_name, exclusive=True):
+                state = self._read_state(col_name)
+                held = (None, set()) if state is None else (state["watermark"], set(state["edge_ids"]))
+                if held != (since, set(since_ids)):
+                    logger.info("Snapshot of %s moved on to block %s; not appending a tail fetched from %s",
+                                col_name, held[0], since)
+                    return False
+                state = state or {"format": SNAPSHOT_FORMAT, "parts": []}
+                if frame is not None and not frame.empty:
+                    name = f"{watermark}-{uuid.uuid4().hex[:8]}.parquet"
+                    frame.to_parquet(os.path.join(self._dir(col_name), name), index=False)
+                    state["parts"].append(name)
+                state["watermark"] = watermark
+                state["edge_ids"] = sorted(edge_ids)
+                self._write_state(col_name, state)
+                if len(state["parts"]) > MAX_PARTS:
+                    self._compact(col_name, state)
+                return True
+        except Exception as e:
+            logger.warning("Could not snapshot %s: %s", col_name, e)
+            return False
+
+    def _compact(self, col_name, state):
+        folder = self._dir(col_name)
+        merged = concat_frames([pd.read_parquet(os.path.join(folder, name)) for name in state["parts"]])
+        name = f"{state['watermark']}-{uuid.uuid4().hex[:8]}.parquet"
+        merged.to_parquet(os.path.join(folder, name), index=False)
+        old_parts, state["parts"] = state["parts"], [name]
+        self._write_state(col_name, state)
+        for old in old_parts:
+            os.remove(os.path.join(folder, old))
+
+
+def snapshot_store(namespace):
+    """Store under $SNAPSHOT_DIR (default .snapshots), or None when it is set empty"""
+    root = os.getenv("SNAPSHOT_DIR", ".snapshots")
+    return SnapshotStore(os.path.join(root, namespace)) if root else None
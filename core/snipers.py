@@ -0,0 +1,41 @@
+import pandas as pd
+
+from core.bursts import burst_mask
+from core.pnl import PAIR_KEYS
+
+# Gas paid by a sniper's buys, in ETH
+MIN_SNIPER_FEE = 0.000002
+# Buys this many blocks past launch still count as sniping
+LAUNCH_WINDOW_BLOCKS = 100
+QUICK_SELL = pd.Timedelta(minutes=20)
+
+
+def detect_snipers(swaps, launch_blocks, amount_col="OUT_BeforeTax"):
+    """Buy rows of likely snipers.
+
+    A sniper buy belongs to a large 10-minute buy burst of its (maker,
+    token_name), pays more than MIN_SNIPER_FEE gas when fees are known,
+    lands within LAUNCH_WINDOW_BLOCKS of the token's launch block and is
+    followed by a sell of the same pair within QUICK_SELL. Rows keep their
+    index labels and order.
+    """
+    buy_df = swaps[swaps["swapType"] == "buy"]
+    large_buys = buy_df[burst_mask(buy_df, PAIR_KEYS, amount_col)]
+    if "transactionFee" in large_buys.columns:
+        large_buys = large_buys[large_buys["transactionFee"] > MIN_SNIPER_FEE]
+
+    launch_block = pd.to_numeric(large_buys["token_name"].astype(object).map(launch_blocks), errors="coerce")
+    in_window = large_buys["blockNumber"] <= launch_block + LAUNCH_WINDOW_BLOCKS
+    sniper_buys = large_buys[in_window.fillna(False).astype(bool)]
+
+    sells = swaps[swaps["swapType"] == "sell"][["maker", "timestampReadable", "token_name"]]
+    merged = pd.merge(
+        sniper_buys[["maker", "timestampReadable", "token_name"]],
+        sells,
+        on=PAIR_KEYS,
+        suffixes=("_buy", "_sell"),
+    )
+    merged["time_diff"] = (merged["timestampReadable_sell"] - merged["timestampReadable_buy"]).dt.total_seconds()
+    quick_sells = merged[merged["time_diff"].between(0, QUICK_SELL.total_seconds())]
+    quick_pairs = pd.MultiIndex.from_frame(quick_sells[PAIR_KEYS])
+    return sniper_buys[pd.MultiIndex.from_frame(sniper_buys[PAIR_KEYS]).isin(quick_pairs)].copy()
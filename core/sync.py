@@ -0,0 +1,232 @@
+import contextvars
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from core.cache import result_cache
+from core.metrics import cache_miss, stage
+from core.pnl import PAIR_KEYS
+from core.prices import PriceIndex
+from core.schema import concat_frames
+
+
+_sync_ids = itertools.count()
+
+
+def _pair_index(df):
+    return pd.MultiIndex.from_frame(df[PAIR_KEYS])
+
+
+def rows_for_pairs(df, pairs):
+    """Rows of `df` whose (maker, token_name) is in the `pairs` MultiIndex"""
+    candidates = df[df["maker"].isin(pairs.get_level_values(0))]
+    return candidates[_pair_index(candidates).isin(pairs)]
+
+
+def load_collection(db, col_name, projection, decode, snapshots=None):
+    """Decoded swaps of a single collection, for processing tokens one at a time"""
+    return SwapSync(db, [col_name], projection, decode, max_workers=1, snapshots=snapshots).refresh()
+
+
+class SwapSync:
+    """Swap frame kept current by fetching only documents above a blockNumber watermark.
+
+    Swaps are append-only by blockNumber, so after the first full load each
+    refresh asks every collection for `blockNumber >= watermark` and drops
+    the documents already held from the watermark block itself. Per-pair
+    tables built through `pair_table` are recomputed only for the
+    (maker, token_name) pairs that received new swaps since their last build.
+
+    `projection(col_name)` gives the find() projection and
+    `decode(col_name, docs)` turns raw documents into a frame with the
+    page's column layout. Collections are fetched and decoded concurrently
+    on up to `max_workers` threads and concatenated once. With a
+    `snapshots` store the first load of each collection starts from its
+    local snapshot and only the missing tail is read from MongoDB. One
+    instance is shared by all sessions. Pair tables live in the shared
+    result cache under this instance's id, so they count against its
+    memory budget and an evicted one is rebuilt from the full frame.
+    """
+
+    def __init__(self, db, collections, projection, decode, ttl=300, max_workers=8, snapshots=None):
+        self.db = db
+        self.collections = list(collections)
+        self.projection = projection
+        self.decode = decode
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.snapshots = snapshots
+        self.frame = None
+        self.watermarks = {}
+        self._edge_ids = {}
+        self._version = 0
+        # version -> pairs touched by the append that moved past it; kept
+        # only as far back as the oldest pair table still cached
+        self._touched = {}
+        self._cache_id = next(_sync_ids)
+        self._table_names = set()
+        self._price_index = (None, None)
+        self._fetched_at = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Number of refreshes that brought in new swaps"""
+        return self._version
+
+    @property
+    def cache_id(self):
+        """Tells this instance's entries in the shared result cache apart from other instances'"""
+        return self._cache_id
+
+    @property
+    def price_index(self):
+        """PriceIndex of the current frame, built once per version"""
+        with self._lock:
+            version, index = self._price_index
+            if index is None or version != self.version:
+                index = PriceIndex(self.frame)
+                self._price_index = (self.version, index)
+            return index
+
+    @property
+    def prices(self):
+        """token -> latest genesis_usdc_price"""
+        return self.price_index.latest
+
+    def track(self, collections):
+        """Add collections to sync; a new one is loaded in full on the next refresh"""
+        with self._lock:
+            new = [name for name in collections if name not in self.collections]
+            self.collections += new
+            if new:
+                self._fetched_at = None
+
+    def refresh(self, force=False):
+        """Fetch swaps above each watermark at most once per ttl and return the full frame.
+
+        The fetch runs outside the lock readers take, which is held only to
+        apply the new rows and advance the watermarks. One refresh runs at
+        a time; while it is in flight other callers get the current frame
+        instead of waiting, unless nothing is loaded yet or `force` is set.
+        """
+        if not self._refresh_lock.acquire(blocking=force or self.frame is None):
+            return self.frame
+        try:
+            with self._lock:
+                fresh = self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl
+                if fresh and not force:
+                    return self.frame
+                collections = list(self.collections)
+            workers = max(1, min(self.max_workers, len(collections)))
+            # Each worker runs in a copy of the caller's context so its
+            # fetch and decode stages are recorded against the page run
+            contexts = [contextvars.copy_context() for _ in collections]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                fetched = list(pool.map(lambda ctx, col_name: ctx.run(self._fetch_new, col_name),
+                                        contexts, collections))
+            parts = [part for _, _, part in fetched if part is not None]
+            new_rows = concat_frames(parts) if parts else None
+            with self._lock:
+                for col_name, edge, _ in fetched:
+                    if edge is not None:
+                        self.watermarks[col_name], self._edge_ids[col_name] = edge
+                # Collections tracked during the fetch still need their first load
+                self._fetched_at = time.monotonic() if self.collections == collections else None
+                if new_rows is not None:
+                    self.append(new_rows)
+                return self.frame
+        finally:
+            self._refresh_lock.release()
+
+    def append(self, new_rows):
+        """Add decoded swaps to the frame and record the pairs they touch"""
+        with self._lock:
+            if new_rows.empty:
+                return
+            frame = new_rows if self.frame is None else concat_frames([self.frame, new_rows])
+            self.frame = frame.reset_index(drop=True)
+            self._touched[self._version] = _pair_index(new_rows).unique()
+            self._version += 1
+            self._prune_touched()
+
+    def _table_key(self, name):
+        return ("pair_table", self.cache_id, name)
+
+    def _prune_touched(self):
+        """Drop touched pairs no cached pair table can still need"""
+        held = [entry[0] for entry in (result_cache.peek(self._table_key(name)) for name in self._table_names)
+                if entry is not None]
+        oldest = min(held, default=self._version)
+        for version in [v for v in self._touched if v < oldest]:
+            del self._touched[version]
+
+    def _fetch_new(self, col_name):
+        """(col_name, (new watermark, ids at it) or None, decoded frame or None)"""
+        base = None
+        watermark = self.watermarks.get(col_name)
+        edge_ids = self._edge_ids.get(col_name, set())
+        if watermark is None and self.snapshots is not None:
+            snapshot = self.snapshots.load(col_name)
+            if snapshot is not None:
+                base, watermark, edge_ids = snapshot
+
+        query = {} if watermark is None else {"blockNumber": {"$gte": watermark}}
+        with stage("mongo_fetch") as record:
+            docs = [doc for doc in self.db[col_name].find(query, self.projection(col_name))
+                    if str(doc["_id"]) not in edge_ids]
+            record["rows"] = len(docs)
+        if not docs:
+            edge = None if watermark is None else (watermark, edge_ids)
+            return col_name, edge, base
+
+        edge = None
+        blocks = [doc["blockNumber"] for doc in docs if doc.get("blockNumber") is not None]
+        if blocks:
+            top = max(blocks)
+            top_ids = {str(doc["_id"]) for doc in docs if doc.get("blockNumber") == top}
+            if top == watermark:
+                top_ids |= edge_ids
+            edge = (top, top_ids)
+        with stage("decode", rows=len(docs)):
+            tail = self.decode(col_name, docs)
+        if self.snapshots is not None and edge is not None:
+            self.snapshots.append(col_name, tail, *edge, since=watermark, since_ids=edge_ids)
+        if base is not None:
+            tail = concat_frames([base, tail])
+        return col_name, edge, tail
+
+    def pair_table(self, name, compute, params=None, finalize=None):
+        """Per-pair table kept current by recomputing only touched pairs.
+
+        `compute(frame)` builds the table for the pairs present in `frame`.
+        A change of `params` rebuilds it from the full frame. `finalize`
+        runs on the merged table, e.g. to revalue every row at new prices.
+        """
+        with self._lock:
+            if self.frame is None:
+                return None
+            key = self._table_key(name)
+            self._table_names.add(name)
+            version, stored_params, table = result_cache.get(key, (None, None, None))
+            if table is not None and stored_params == params and version == self.version:
+                return table if finalize is None else finalize(table)
+            cache_miss()
+            missing = table is not None and any(v not in self._touched for v in range(version, self.version))
+            if table is None or stored_params != params or missing:
+                table = compute(self.frame)
+            else:
+                touched = self._touched[version]
+                for v in range(version + 1, self.version):
+                    touched = touched.union(self._touched[v])
+                kept = table[~_pair_index(table).isin(touched)]
+                table = concat_frames([kept, compute(rows_for_pairs(self.frame, touched))])
+            if finalize is not None:
+                table = finalize(table)
+            result_cache.put(key, (self.version, params, table))
+            self._prune_touched()
+            return table
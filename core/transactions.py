@@ -0,0 +1,168 @@
+import re
+from datetime import datetime, time, timedelta, timezone
+
+import pandas as pd
+
+# Stored fields the transactions table reads from a `{token}_swap` collection
+BASE_FIELDS = [
+    "blockNumber", "txHash", "maker", "swapType", "label", "timestamp", "timestampReadable",
+    "genesis_usdc_price", "genesis_virtual_price", "virtual_usdc_price", "Tax_1pct", "transactionFee",
+]
+
+# Stored fields the transactions table sorts on
+SORT_FIELDS = [
+    "blockNumber", "timestamp", "genesis_usdc_price", "genesis_virtual_price",
+    "virtual_usdc_price", "Tax_1pct", "transactionFee",
+]
+
+# Indexes behind the transaction filters and sorts, in create_index() key form.
+# Pages sort on (field, _id), so each sort index ends in _id; the swap type
+# and label filters get their own for the block and time sorts.
+TRANSACTION_INDEXES = [[(field, 1), ("_id", 1)] for field in SORT_FIELDS] + [
+    [(filter_field, 1), (field, 1), ("_id", 1)]
+    for filter_field in ("swapType", "label") for field in ("blockNumber", "timestamp")
+] + [
+    [("maker", 1), ("timestamp", 1)],
+    [("txHash", 1)],
+]
+
+
+def _side(buy, sell):
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": ["$swapType", "buy"]}, "then": buy},
+            {"case": {"$eq": ["$swapType", "sell"]}, "then": sell},
+        ],
+        "default": None,
+    }}
+
+
+def derived_fields(token):
+    """Expressions for the computed columns: token_amount, virtual_amount and usd_value.
+
+    Amounts are the token/VIRTUAL leg of the swap on its side, rounded to 4
+    places; other swap types get null. Missing stored values count as 0.
+    """
+    prefix = token.upper()
+    token_amount = _side({"$ifNull": [f"${prefix}_OUT", 0]}, {"$ifNull": [f"${prefix}_IN", 0]})
+    return {
+        "token_amount": {"$round": [token_amount, 4]},
+        "virtual_amount": {"$round": [_side({"$ifNull": ["$Virtual_IN", 0]}, {"$ifNull": ["$Virtual_OUT", 0]}), 4]},
+        "usd_value": {"$round": [{"$multiply": [
+            {"$round": [token_amount, 4]}, {"$ifNull": ["$genesis_usdc_price", 0]}]}, 4]},
+    }
+
+
+def transaction_filter(swap_type="all", label="All", date_range=None, search=None):
+    """$match document for the swap type, label, UTC date range and search box.
+
+    The search matches the block number, maker or tx hash as a
+    case-insensitive substring.
+    """
+    match = {}
+    if swap_type and swap_type != "all":
+        match["swapType"] = swap_type.lower()
+    if label and label != "All":
+        match["label"] = label
+    if date_range is not None and len(date_range) == 2:
+        start = datetime.combine(date_range[0], time(), tzinfo=timezone.utc)
+        end = datetime.combine(date_range[1], time(), tzinfo=timezone.utc) + timedelta(days=1)
+        match["timestamp"] = {"$gte": int(start.timestamp()), "$lt": int(end.timestamp())}
+    if search and search.strip():
+        pattern = re.escape(search.strip().lower())
+        match["$or"] = [
+            {"maker": {"$regex": pattern, "$options": "i"}},
+            {"txHash": {"$regex": pattern, "$options": "i"}},
+            {"$expr": {"$regexMatch": {"input": {"$toString": "$blockNumber"}, "regex": pattern}}},
+        ]
+    return match
+
+
+def _range_stages(token, match, value_range):
+    stages = [{"$match": match}]
+    if value_range is not None:
+        field, lo, hi = value_range
+        derived = derived_fields(token)
+        if field in derived:
+            stages.append({"$addFields": {field: derived[field]}})
+        stages.append({"$match": {field: {"$gte": lo, "$lte": hi}}})
+    return stages
+
+
+def page_pipeline(token, match, sort_field, ascending=True, value_range=None, skip=0, limit=50):
+    """Aggregation pipeline returning one sorted page of swaps.
+
+    `value_range` is an optional (field, lo, hi) filter. `_id` breaks ties
+    so pages do not overlap, and a sort on one of SORT_FIELDS walks its
+    (field, _id) index. Computed fields (token_amount, virtual_amount,
+    usd_value) have no index: sorting on one adds it to every matching
+    swap and sorts them in memory, so it costs a pass over the whole
+    filtered set. Otherwise they are only added to the page itself.
+    """
+    derived = derived_fields(token)
+    stages = _range_stages(token, match, value_range)
+    if sort_field in derived and (value_range is None or value_range[0] != sort_field):
+        stages.append({"$addFields": {sort_field: derived[sort_field]}})
+    direction = 1 if ascending else -1
+    stages += [
+        {"$sort": {sort_field: direction, "_id": direction}},
+        {"$skip": int(skip)},
+        {"$limit": int(limit)},
+        {"$addFields": derived},
+        {"$project": {"_id": 0, **{f: 1 for f in BASE_FIELDS + list(derived)}}},
+    ]
+    return stages
+
+
+def count_transactions(collection, token, match, value_range=None):
+    """Number of swaps matching the filter"""
+    if value_range is None:
+        return collection.count_documents(match)
+    rows = list(collection.aggregate(_range_stages(token, match, value_range) + [{"$count": "n"}]))
+    return rows[0]["n"] if rows else 0
+
+
+def value_bounds(collection, token, match, field):
+    """(min, max) of a stored or computed field over the matching swaps, or (None, None)"""
+    expr = derived_fields(token).get(field, f"${field}")
+    rows = list(collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": None, "lo": {"$min": expr}, "hi": {"$max": expr}}},
+    ]))
+    return (rows[0]["lo"], rows[0]["hi"]) if rows else (None, None)
+
+
+def fetch_transactions(collection, token, match, sort_field, ascending=True, value_range=None, skip=0, limit=50):
+    """One page of swaps as a frame with the stored and computed fields"""
+    docs = list(collection.aggregate(page_pipeline(token, match, sort_field, ascending, value_range, skip, limit),
+                                     allowDiskUse=True))
+    return pd.DataFrame(docs, columns=BASE_FIELDS + list(derived_fields(token)))
+
+
+def trader_volumes(collection, token):
+    """USD volume per (maker, swapType) over the whole collection"""
+    token_amount = derived_fields(token)["token_amount"]
+    rows = list(collection.aggregate([
+        {"$group": {
+            "_id": {"maker": "$maker", "swapType": "$swapType"},
+            "usd": {"$sum": {"$multiply": [token_amount, {"$ifNull": ["$genesis_usdc_price", 0]}]}},
+        }},
+        {"$project": {"_id": 0, "maker": "$_id.maker", "swapType": "$_id.swapType", "usd": 1}},
+    ], allowDiskUse=True))
+    return pd.DataFrame(rows, columns=["maker", "swapType", "usd"])
+
+
+def daily_volume(collection, token):
+    """Summed token amount per UTC day"""
+    rows = list(collection.aggregate([
+        {"$match": {"timestamp": {"$ne": None}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d",
+                                      "date": {"$toDate": {"$multiply": ["$timestamp", 1000]}}}},
+            "volume": {"$sum": derived_fields(token)["token_amount"]},
+        }},
+        {"$sort": {"_id": 1}},
+    ], allowDiskUse=True))
+    frame = pd.DataFrame(rows, columns=["_id", "volume"]).rename(columns={"_id": "date"})
+    frame["date"] = pd.to_datetime(frame["date"]).dt.date
+    return frame
@@ -1,10 +1,22 @@
 import streamlit as st
 import pandas as pd
 import os
-from pymongo import MongoClient
-from collections import defaultdict, deque
+import time
 from dotenv import load_dotenv
 import altair as alt
+from core.aggregates import with_wallet_stats
+from core.cache import result_cache
+from core.db import get_db, health
+from core.live import LiveFeed
+from core.metadata import block_edge, persona_launch_blocks
+from core.metrics import cache_miss, debug_panel, serve, stage, start_render
+from core.parallel import parallel_fifo_pnl, parallel_snipers
+from core.pnl import latest_prices, revalue
+from core.registry import get_registry
+from core.results import blocks_behind, stored_results
+from core.schema import coerce_swaps
+from core.snapshot import snapshot_store
+from core.sync import SwapSync, load_collection
 
 # Streamlit Page Setup - MUST be first command
 st.set_page_config(page_title="Sniper PnL Dashboard", layout="wide")
@@ -136,278 +148,273 @@ st.markdown("""
 
 load_dotenv()
 
-# MongoDB Connection
+# WALLET_STATS=mongo computes per-wallet trade stats server-side
+STATS_PUSHDOWN = os.getenv("WALLET_STATS", "pandas").lower() == "mongo"
+# GLOBAL_MODE=stream analyses one token at a time, so memory is bounded by
+# the largest token instead of the sum of all of them
+STREAM_MODE = os.getenv("GLOBAL_MODE", "memory").lower() == "stream"
+# RESULTS_SOURCE picks where sniper and PnL tables come from: "stored" reads
+# the tables written by `python -m core.results`, "watch" follows MongoDB
+# change streams (needs a replica set) and "live" recomputes on the cache TTL
+RESULTS_SOURCE = os.getenv("RESULTS_SOURCE", "stored").lower()
+# Seconds between checks for new swaps in watch mode
+LIVE_REFRESH = int(os.getenv("LIVE_REFRESH_SECONDS", "5"))
+# Seconds to wait for the live feed before recomputing instead
+LIVE_WAIT = float(os.getenv("LIVE_WAIT_SECONDS", "60"))
+# Stage timings in the sidebar, also with ?debug=1 in the URL
+DEBUG_METRICS = os.getenv("DEBUG_METRICS", "0") == "1" or st.query_params.get("debug") == "1"
+
+start_render("global_snipers")
+serve()
+
+# MongoDB Connection (one pooled client per process, shared with the other pages)
+db_status = health()
+if not db_status["ok"]:
+    st.error(f"Database unavailable: {db_status['error']}")
+    st.stop()
+
+def swap_projection(col_name):
+    """Projection with the collection's token-prefixed amount fields"""
+    token_prefix = col_name.replace('_swap', '').upper() + "_"
+    return {
+        f"{token_prefix}OUT_BeforeTax": 1,
+        f"{token_prefix}OUT_AfterTax": 1,
+        f"{token_prefix}IN_BeforeTax": 1,
+        f"{token_prefix}IN_AfterTax": 1,
+        "maker": 1,
+        "token_name": 1,
+        "swapType": 1,
+        "timestamp": 1,
+        "timestampReadable": 1,
+        "blockNumber": 1,
+        "genesis_usdc_price": 1,
+        "transactionFee": 1,
+        "Tax_1pct": 1
+    }
+
+def decode_swaps(col_name, docs):
+    """Swap documents of one collection as a frame with unprefixed amount columns"""
+    token_name = col_name.replace('_swap', '')
+    token_prefix = token_name.upper() + "_"
+    df = pd.DataFrame(docs)
+    df.drop(columns=['_id'], errors='ignore', inplace=True)
+    # Remove token prefix from relevant columns
+    df.columns = [col.replace(token_prefix, '') if col.startswith(token_prefix) else col for col in df.columns]
+    df["token_name"] = token_name.upper()
+    df = df.dropna(subset=['transactionFee', 'genesis_usdc_price'])
+    return coerce_swaps(df)
+
 @st.cache_resource
-def get_mongo_client():
-    """Cache MongoDB client connection"""
-    return MongoClient(st.secrets["MONGO_URI"])
+def get_swap_sync():
+    """Shared swap store, started from local snapshots and topped up by blockNumber watermark every 5 minutes"""
+    db = get_db()
+    return SwapSync(db, get_registry().collections(), swap_projection, decode_swaps, ttl=300,
+                    snapshots=snapshot_store("global"))
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def load_swap_data():
-    """Load and cache swap data from MongoDB"""
-    client = get_mongo_client()
-    db = client["genesis_tokens_swap_info"]
-    
-    # swap_collections = [col for col in db.list_collection_names() if col.endswith('_swap')]
-    swap_collections = ['jarvis_swap', 'tian_swap', 'badai_swap', 'aispace_swap', 'wint_swap']
-    combined_df = pd.DataFrame()
-
-    for col_name in swap_collections:
-        token_name = col_name.replace('_swap', '')  
-        token_prefix = token_name.upper() + "_"     
-        # Build projection dict with correct prefixed column names
-        projection = {
-            f"{token_prefix}OUT_BeforeTax": 1,
-            f"{token_prefix}OUT_AfterTax": 1,
-            f"{token_prefix}IN_BeforeTax": 1,
-            f"{token_prefix}IN_AfterTax": 1,
-            "maker": 1,
-            "token_name": 1,
-            "swapType": 1,
-            "timestamp": 1,
-            "timestampReadable": 1,
-            "blockNumber": 1,
-            "genesis_usdc_price": 1,
-            "transactionFee": 1,
-            "Tax_1pct": 1
-        }
-        collection = db[col_name]
-        data = list(collection.find({}, projection))
-        if not data:
-            continue
-        df = pd.DataFrame(data)
-        df.drop(columns=['_id'], errors='ignore', inplace=True)
-        # Remove token prefix from relevant columns
-        df.columns = [col.replace(token_prefix, '') if col.startswith(token_prefix) else col for col in df.columns]
-        df["token_name"] = token_name.upper()
-        combined_df = pd.concat([combined_df, df], ignore_index=True)
-
-    if combined_df.empty:
+    """Load swap data, fetching only swaps newer than the last load"""
+    sync = get_swap_sync()
+    # Tokens launched since the store was created are loaded in full once
+    sync.track(get_registry().collections())
+    combined_df = sync.refresh()
+    if combined_df is None or combined_df.empty:
         return None
-
-    combined_df = combined_df.dropna(subset=['transactionFee'])
-    combined_df = combined_df.dropna(subset=['genesis_usdc_price'])
-    combined_df['timestampReadable'] = pd.to_datetime(combined_df['timestampReadable'])
-    
     return combined_df
 
 @st.cache_data(ttl=600)  # Cache for 10 minutes
 def load_launch_blocks():
-    """Load and cache launch block information"""
-    client = get_mongo_client()
-    db = client["genesis_tokens_swap_info"]
-    db_persona = client["virtualgenesis"]
-    
-    try:
-        launch_info = list(db["Personas"].find({}, {"symbol": 1, "blockNumber": 1})) 
-        launch_df = pd.DataFrame(launch_info)
-        
-        # Check if the DataFrame has the expected columns
-        if not launch_df.empty and 'symbol' in launch_df.columns and 'blockNumber' in launch_df.columns:
-            token_launch_blocks = dict(zip(launch_df['symbol'], launch_df['blockNumber']))
-        else:
-            # use the combined_df to get launch blocks
-            combined_df = load_swap_data()
-            if combined_df is not None:
-                token_launch_blocks = combined_df.sort_values(by='blockNumber').groupby('token_name')['blockNumber'].first().to_dict()
-            else:
-                token_launch_blocks = {}
-            print("Warning: Could not fetch launch info from Personas collection, using fallback method")
-    except Exception as e:
-        print(f"Error fetching launch info: {e}")
-        # use the combined_df to get launch blocks
-        combined_df = load_swap_data()
-        if combined_df is not None:
-            token_launch_blocks = combined_df.sort_values(by='blockNumber').groupby('token_name')['blockNumber'].first().to_dict()
-        else:
-            token_launch_blocks = {}
-    
-    return token_launch_blocks
+    """Load and cache launch block information (shared with the batch job's "global" scope)"""
+    cache_miss()
+    # None tells the caller to fall back to each token's first swap block
+    return persona_launch_blocks(get_db())
+
+def first_blocks(df):
+    """Fallback launch blocks: the first swap block of each token"""
+    return df.groupby('token_name', observed=True)['blockNumber'].min().to_dict()
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def process_sniper_data(combined_df, token_launch_blocks):
-    """Process and cache sniper identification logic"""
-    # Identify Large Buys
-    buy_df = combined_df[combined_df['swapType'] == 'buy'].copy()
-    buy_df = buy_df.sort_values(by=['maker', 'token_name', 'timestampReadable'])
-    chunked_buys = []
-    time_threshold = pd.Timedelta(minutes=10)
-
-    for (maker, token), group in buy_df.groupby(['maker', 'token_name']):
-        current_chunk = []
-        current_sum = 0
-        chunk_start_time = None
-        for row in group.itertuples():
-            if not current_chunk:
-                chunk_start_time = row.timestampReadable
-                current_chunk = [row]
-                current_sum = row.OUT_BeforeTax
-            else:
-                if row.timestampReadable - chunk_start_time <= time_threshold:
-                    current_chunk.append(row)
-                    current_sum += row.OUT_BeforeTax
-                else:
-                    if current_sum > 100000:
-                        chunked_buys.extend(current_chunk)
-                    chunk_start_time = row.timestampReadable
-                    current_chunk = [row]
-                    current_sum = row.OUT_BeforeTax
-        if current_sum > 100000:
-            chunked_buys.extend(current_chunk)
-
-    df_chunked_large_buys = pd.DataFrame(chunked_buys).drop_duplicates()
-    df_high_gas = df_chunked_large_buys[df_chunked_large_buys['transactionFee'] > 0.000002]
-
-    def is_sniper_buy(row):
-        launch_block = token_launch_blocks.get(row['token_name'])
-        return launch_block is not None and row['blockNumber'] <= launch_block + 100
-
-    df_sniper_buys = df_high_gas[df_high_gas.apply(is_sniper_buy, axis=1)]
-
-    sells = combined_df[combined_df['swapType'] == 'sell'][['maker', 'timestampReadable', 'token_name']]
-
-    merged = pd.merge(
-        df_sniper_buys[['maker', 'timestampReadable', 'token_name']],
-        sells,
-        on=['maker', 'token_name'],
-        suffixes=('_buy', '_sell')
-    )
-
-    merged['time_diff'] = (merged['timestampReadable_sell'] - merged['timestampReadable_buy']).dt.total_seconds()
-    quick_sells = merged[merged['time_diff'].between(0, 20 * 60)]
-    quick_sells_pairs = set(zip(quick_sells['maker'], quick_sells['token_name']))
-    potential_sniper_df = df_sniper_buys[
-        df_sniper_buys.apply(lambda row: (row['maker'], row['token_name']) in quick_sells_pairs, axis=1)
-    ].copy()
-    
+    """Sniper identification logic (core.snipers), sharded over ANALYSIS_WORKERS processes"""
+    potential_sniper_df = parallel_snipers(combined_df, token_launch_blocks)
     return potential_sniper_df, combined_df
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def calculate_pnl(potential_sniper_df, combined_df):
-    """Calculate and cache PnL results"""
-    results = []
-    sniper_pairs = potential_sniper_df[['maker', 'token_name']].drop_duplicates()
-
-    for _, row in sniper_pairs.iterrows():
-        maker = row['maker']
-        token = row['token_name']
-        df = combined_df[(combined_df['maker'] == maker) & (combined_df['token_name'] == token)]
-        df = df.sort_values(by='timestamp')
-        trades_by_maker = defaultdict(list)
-
-        buy_txn_count = (df['swapType'] == 'buy').sum()
-        sell_txn_count = (df['swapType'] == 'sell').sum()
-        first_buy_time = df.loc[df['swapType'] == 'buy', 'timestampReadable'].min()
-        last_sell_time = df.loc[df['swapType'] == 'sell', 'timestampReadable'].max()
-        avg_buy_price = df.loc[df['swapType'] == 'buy', 'genesis_usdc_price'].mean()
-        avg_sell_price = df.loc[df['swapType'] == 'sell', 'genesis_usdc_price'].mean()
-        total_tax_paid = df['Tax_1pct'].sum()
-        total_transaction_fee_paid = df['transactionFee'].sum()
-
-        for _, doc in df.iterrows():
-            swap_type = doc.get("swapType")
-            price = float(doc.get("genesis_usdc_price", 0) or 0)
-            if price <= 0:
-                continue
-            if swap_type == "buy":
-                amount_bought_before_tax = float(doc.get("OUT_BeforeTax", 0) or 0)
-                amount_received = float(doc.get("OUT_AfterTax", 0) or 0)
-                if amount_bought_before_tax <= 0:
-                    continue
-                trades_by_maker[maker].append({
-                    'type': 'buy',
-                    'amount_bought_before_tax': amount_bought_before_tax,
-                    'amount_received': amount_received,
-                    'price': price
-                })
-            elif swap_type == "sell":
-                amount_sold_net = float(doc.get("IN_AfterTax", 0) or 0)
-                amount_from_wallet = float(doc.get("IN_BeforeTax", 0) or 0)
-                if amount_sold_net <= 0:
-                    continue
-                trades_by_maker[maker].append({
-                    'type': 'sell',
-                    'amount_sold_net': amount_sold_net,
-                    'amount_from_wallet': amount_from_wallet,
-                    'price': price
-                })
-
-        total_realized_pnl = 0.0
-        remaining_tokens = 0.0
-        buy_queue = deque()
-
-        for trade in trades_by_maker[maker]:
-            if trade['type'] == 'buy':
-                buy_queue.append({
-                    'amount': trade['amount_received'],
-                    'amount_paid_for': trade['amount_bought_before_tax'],
-                    'price': trade['price']
-                })
-            elif trade['type'] == 'sell':
-                remaining_to_match = trade['amount_from_wallet']
-                amount_sold_net = trade['amount_sold_net']
-                sell_price = trade['price']
-
-                while remaining_to_match > 0 and buy_queue:
-                    buy = buy_queue.popleft()
-                    matched_amount = min(remaining_to_match, buy['amount'])
-                    ratio = matched_amount / buy['amount']
-                    matched_paid = buy['amount_paid_for'] * ratio
-
-                    proceeds_ratio = matched_amount / trade['amount_from_wallet']
-                    actual_proceeds = amount_sold_net * sell_price * proceeds_ratio
-                    cost_paid = matched_paid * buy['price']
-
-                    total_realized_pnl += actual_proceeds - cost_paid
-
-                    remaining_to_match -= matched_amount
-                    remaining_buy = buy['amount'] - matched_amount
-                    if remaining_buy > 0:
-                        remaining_paid = buy['amount_paid_for'] * (remaining_buy / buy['amount'])
-                        buy_queue.appendleft({
-                            'amount': remaining_buy,
-                            'amount_paid_for': remaining_paid,
-                            'price': buy['price']
-                        })
-
-        remaining_tokens = sum(b['amount'] for b in buy_queue)
-
-        # Get latest price for the token from combined_df
-        latest_token_row = combined_df[combined_df['token_name'] == token].sort_values(by='timestamp', ascending=False).head(1)
-        if not latest_token_row.empty:
-            latest_price = float(latest_token_row['genesis_usdc_price'].values[0])
-        else:
-            latest_price = 0.0
-        unrealized_pnl = remaining_tokens * latest_price
-
-        results.append({
-            'Sniper Wallet Address': maker,
-            'Token': token,
-            'Net PnL': round(total_realized_pnl, 6),
-            'Unrealized PnL': round(unrealized_pnl, 6),
-            'Remaining Tokens': round(remaining_tokens, 6),
-            'Buy Txn Count': int(buy_txn_count),
-            'Sell Txn Count': int(sell_txn_count),
-            'First Buy Time': first_buy_time,
-            'Last Sell Time': last_sell_time,
-            'Average Buy Price USD': round(avg_buy_price, 6),
-            'Average Sell Price USD': round(avg_sell_price, 6),
-            'Total Tax Paid': round(total_tax_paid, 6),
-            'Total Transaction Fee Paid': round(total_transaction_fee_paid, 6)
-        })
-
-    return pd.DataFrame(results)
+def calculate_pnl(potential_sniper_df, combined_df, prices=None):
+    """FIFO PnL for the sniper (maker, token) pairs"""
+    pairs = potential_sniper_df[['maker', 'token_name']]
+    if not STATS_PUSHDOWN:
+        return parallel_fifo_pnl(combined_df, pairs, prices=prices)
+    # Counts, times, averages and totals come from $group pipelines
+    ledger = parallel_fifo_pnl(combined_df, pairs, prices=prices, stats=False)
+    db = get_db()
+    return with_wallet_stats(db, ledger, require_fields=('transactionFee', 'genesis_usdc_price'))
+
+@st.cache_data(ttl=60)
+def load_block_edge(col_name):
+    """(highest blockNumber, swaps at it) of one collection, looked up at most once a minute"""
+    return block_edge(get_db()[col_name])
+
+def analyse_collection(col_name, launch_block):
+    """(sniper rows, PnL) of one token, loading only that token's swaps.
+
+    Results are cached under the collection's block edge, so a token
+    without new swaps is never reloaded. The edge is itself cached for a
+    minute, so reruns do not query every collection and new swaps show up
+    within that minute.
+    """
+    db = get_db()
+    key = ("analyse_collection", col_name, load_block_edge(col_name), launch_block)
+
+    def analyse():
+        df = load_collection(db, col_name, swap_projection, decode_swaps, snapshots=snapshot_store("global"))
+        if df is None or df.empty:
+            return None
+        token_launch_blocks = first_blocks(df) if launch_block is None else {df['token_name'].iat[0]: launch_block}
+        potential_sniper_df = process_sniper_data(df, token_launch_blocks)[0]
+        return potential_sniper_df, calculate_pnl(potential_sniper_df, df, prices=latest_prices(df))
+
+    return result_cache.get_or_compute(key, analyse)
+
+def stream_analysis(collections, token_launch_blocks):
+    """Snipers and PnL of every token, one token in memory at a time"""
+    sniper_parts, pnl_parts = [], []
+    progress = st.progress(0.0)
+    for i, col_name in enumerate(collections):
+        token = col_name.replace('_swap', '').upper()
+        launch_block = None if token_launch_blocks is None else token_launch_blocks.get(token)
+        with stage("analyse_collection", cached=True) as record:
+            result = analyse_collection(col_name, launch_block)
+            record["rows"] = 0 if result is None else len(result[1])
+        if result is not None:
+            sniper_parts.append(result[0])
+            pnl_parts.append(result[1])
+        progress.progress((i + 1) / len(collections),
+                          text=f"Analysed {token} ({i + 1}/{len(collections)}), {sum(map(len, pnl_parts))} sniper wallets so far")
+    progress.empty()
+    if not pnl_parts:
+        return None, None
+    return pd.concat(sniper_parts, ignore_index=True), pd.concat(pnl_parts, ignore_index=True)
+
+@st.cache_data(ttl=60)
+def load_stored_results(tokens):
+    """(PnL of every token from the batch job, freshness note), or None unless every token has results"""
+    cache_miss()
+    db = get_db()
+    stored = stored_results(db, "global", tokens)
+    if stored is None:
+        return None
+    summaries, pnl = stored
+    lags = [lag for lag in (blocks_behind(db, doc) for doc in summaries.values()) if lag is not None]
+    oldest = min(doc["computed_at"] for doc in summaries.values())
+    note = f"Precomputed results, oldest from {oldest:%Y-%m-%d %H:%M} UTC"
+    if lags:
+        note += f", up to {max(lags):,} blocks behind the latest swaps"
+    return pnl, note
+
+@st.cache_resource
+def get_live_feed():
+    """One ledger over every swap collection, updated from change streams and shared by all sessions"""
+    return LiveFeed(get_db(), get_registry().collections(), load_launch_blocks(),
+                    require=('transactionFee', 'genesis_usdc_price')).start()
+
+@st.fragment(run_every=LIVE_REFRESH)
+def follow_live_feed(version):
+    """Rerun the page once the live feed has applied new swaps"""
+    if get_live_feed().version != version:
+        st.rerun()
+
+def format_pnl(pnl):
+    """PnL table with display columns"""
+    return pd.DataFrame({
+        'Sniper Wallet Address': pnl['maker'],
+        'Token': pnl['token_name'],
+        'Net PnL': pnl['realized_pnl'].round(6),
+        'Unrealized PnL': pnl['unrealized_pnl'].round(6),
+        'Remaining Tokens': pnl['remaining_tokens'].round(6),
+        'Buy Txn Count': pnl['buy_count'].astype(int),
+        'Sell Txn Count': pnl['sell_count'].astype(int),
+        'First Buy Time': pnl['first_buy_time'],
+        'Last Sell Time': pnl['last_sell_time'],
+        'Average Buy Price USD': pnl['avg_buy_price'].round(6),
+        'Average Sell Price USD': pnl['avg_sell_price'].round(6),
+        'Total Tax Paid': pnl['total_tax'].round(6),
+        'Total Transaction Fee Paid': pnl['total_fee'].round(6)
+    })
 
 # Load data with caching
-with st.spinner("Loading data..."):
-    combined_df = load_swap_data()
-    if combined_df is None:
+stored = None
+if RESULTS_SOURCE == "stored":
+    with stage("stored_results", cached=True) as record:
+        stored = load_stored_results(tuple(get_registry().tokens()))
+        record["rows"] = None if stored is None else len(stored[0])
+results_note = None
+pnl = None
+if RESULTS_SOURCE == "watch":
+    feed = get_live_feed()
+    # Tokens launched since the feed started are loaded on its thread
+    feed.track(get_registry().collections())
+    with st.spinner("Loading swaps for live updates..."):
+        live = feed.wait_live(LIVE_WAIT)
+    follow_live_feed(feed.version)
+    if live:
+        with stage("live_table") as record:
+            pnl = feed.table(snipers_only=True)
+            record["rows"] = len(pnl)
+        if feed.updated_at is not None:
+            results_note = f"Live from change streams, last swap applied {time.time() - feed.updated_at:.0f}s ago"
+    else:
+        st.warning(f"Live updates unavailable ({feed.error or 'still loading swaps'}), recomputing instead")
+if pnl is not None:
+    if pnl.empty:
+        st.error("No data found from MongoDB collections.")
+        st.stop()
+    pnl_df = format_pnl(pnl)
+elif stored is not None:
+    pnl, results_note = stored
+    if pnl.empty:
         st.error("No data found from MongoDB collections.")
         st.stop()
+    pnl_df = format_pnl(pnl)
+elif STREAM_MODE:
+    with stage("launch_blocks", cached=True):
+        token_launch_blocks = load_launch_blocks()
+    with stage("stream_analysis") as record:
+        potential_sniper_df, pnl = stream_analysis(get_registry().collections(), token_launch_blocks)
+        record["rows"] = None if pnl is None else len(pnl)
+    if pnl is None:
+        st.error("No data found from MongoDB collections.")
+        st.stop()
+    pnl_df = format_pnl(pnl)
+else:
+    with st.spinner("Loading data..."):
+        with stage("load_swaps") as record:
+            combined_df = load_swap_data()
+            record["rows"] = 0 if combined_df is None else len(combined_df)
+        if combined_df is None:
+            st.error("No data found from MongoDB collections.")
+            st.stop()
     
-    token_launch_blocks = load_launch_blocks()
-    potential_sniper_df, combined_df = process_sniper_data(combined_df, token_launch_blocks)
-    pnl_df = calculate_pnl(potential_sniper_df, combined_df)
+        with stage("launch_blocks", cached=True):
+            token_launch_blocks = load_launch_blocks()
+        if token_launch_blocks is None:
+            token_launch_blocks = first_blocks(combined_df)
+        # Snipers and PnL are kept per (maker, token) and only recomputed for
+        # pairs with new swaps since the last refresh
+        sync = get_swap_sync()
+        launch_params = tuple(sorted(token_launch_blocks.items()))
+        with stage("snipers", cached=True) as record:
+            potential_sniper_df = sync.pair_table(
+                "snipers",
+                lambda df: process_sniper_data(df, token_launch_blocks)[0],
+                params=launch_params
+            )
+            record["rows"] = len(potential_sniper_df)
+        with stage("pnl", cached=True) as record:
+            pnl_df = format_pnl(sync.pair_table(
+                "pnl",
+                lambda df: calculate_pnl(potential_sniper_df, df, prices=sync.prices),
+                params=launch_params,
+                finalize=lambda pnl: revalue(pnl, sync.prices)
+            ))
+            record["rows"] = len(pnl_df)
 
 def render_sidebar():
     with st.sidebar:
@@ -460,6 +467,8 @@ render_sidebar()
 # Streamlit UI
 # Page Title
 st.markdown("<h1 style='color: white;'>Potential Snipers – PnL Overview</h1>", unsafe_allow_html=True)
+if results_note:
+    st.caption(results_note)
 
 # Filter Popover Top-Right
 header_left, header_right = st.columns([6, 1])
@@ -531,7 +540,8 @@ filtered_df['S.No'] = range(1, len(filtered_df) + 1)
 # Autosize all columns
 column_config = {col: {"width": "auto"} for col in filtered_df.columns}
 st.markdown("<div class='scrollable'>", unsafe_allow_html=True)
-st.dataframe(filtered_df, hide_index=True, column_config=column_config)
+with stage("table", rows=len(filtered_df)):
+    st.dataframe(filtered_df, hide_index=True, column_config=column_config)
 st.markdown("</div>", unsafe_allow_html=True)
 
 # Add gap between table and KPIs
@@ -574,7 +584,8 @@ if token_filter:
             y=alt.Y('Sniper Wallet Address:Q', title='Unique Snipers'),
             tooltip=['Token', 'Sniper Wallet Address']
         ).properties(height=250)
-        st.altair_chart(chart_counts, use_container_width=True)
+        with stage("chart:chart_counts", rows=len(chart_counts.data)):
+            st.altair_chart(chart_counts, use_container_width=True)
 
     with col2:
         st.markdown("##### Top 10 Snipers by Net PnL (Filtered)")
@@ -587,7 +598,8 @@ if token_filter:
             y=alt.Y('Net PnL:Q'),
             tooltip=['Sniper Wallet Address', 'Net PnL']
         ).properties(height=350)
-        st.altair_chart(chart_top10, use_container_width=True)
+        with stage("chart:chart_top10", rows=len(chart_top10.data)):
+            st.altair_chart(chart_top10, use_container_width=True)
 
     with col3:
         st.markdown("##### Sniper PnL Distribution (Filtered)")
@@ -596,7 +608,8 @@ if token_filter:
             y=alt.Y('count():Q'),
             tooltip=['count()']
         ).properties(height=350)
-        st.altair_chart(chart_pnl_dist, use_container_width=True)
+        with stage("chart:chart_pnl_dist", rows=len(chart_pnl_dist.data)):
+            st.altair_chart(chart_pnl_dist, use_container_width=True)
 
 st.subheader("📊 Sniper Metrics")
 
@@ -647,7 +660,8 @@ with graph1:
         y=alt.Y('Sniper Wallet Address:N', sort='-x', title='Sniper Wallet Address'),
         tooltip=['Sniper Wallet Address', 'Net PnL']
     ).properties(title='Top 10 Snipers by Net PnL', height=350)
-    st.altair_chart(chart, use_container_width=True)
+    with stage("chart:chart", rows=len(chart.data)):
+        st.altair_chart(chart, use_container_width=True)
 
 # Token Sniper Activity — only show tokens in filtered_df
 with graph2:
@@ -657,7 +671,8 @@ with graph2:
         y=alt.Y('Token:N', sort='-x', title='Token'),
         tooltip=['Token', 'Sniper Wallet Address']
     ).properties(title='Token Sniper Activity', height=350)
-    st.altair_chart(chart2, use_container_width=True)
+    with stage("chart:chart2", rows=len(chart2.data)):
+        st.altair_chart(chart2, use_container_width=True)
 
 # Sniper Profit Distribution (filtered)
 st.subheader("📊 Sniper Profit Distribution")
@@ -666,4 +681,8 @@ hist = alt.Chart(pnl_df).mark_bar().encode(
     y=alt.Y('count()', title='Number of Snipers'),
     tooltip=['count()']
 ).properties(title='Sniper Profit Distribution', height=300)
-st.altair_chart(hist, use_container_width=True)
\ No newline at end of file
+with stage("chart:hist", rows=len(hist.data)):
+    st.altair_chart(hist, use_container_width=True)
+
+if DEBUG_METRICS:
+    debug_panel()
@@ -2,11 +2,27 @@ import os
 from dotenv import load_dotenv
 import pandas as pd
 import streamlit as st
-from pymongo import MongoClient
-from datetime import timedelta, datetime, timezone, time
+from datetime import datetime, timezone, time
 from random import randint
+import time as time_module
 import altair as alt
-from collections import defaultdict, deque
+from core.aggregates import with_wallet_stats
+from core.db import get_db, health
+from core.history import synced_history
+from core.live import LiveFeed
+from core.metadata import progress_launch_blocks, token_metadata
+from core.metrics import cache_miss, debug_panel, serve, stage, start_render
+from core.parallel import parallel_fifo_pnl, parallel_snipers
+from core.pnl import PAIR_KEYS, revalue, strip_token_prefix
+from core.registry import get_registry
+from core.results import blocks_behind, stored_results
+from core.schema import coerce_swaps
+from core.snapshot import snapshot_store
+from core.sync import SwapSync
+from core.transactions import (
+    BASE_FIELDS, count_transactions, daily_volume, fetch_transactions, trader_volumes,
+    transaction_filter, value_bounds
+)
 
 # ───── Streamlit Setup ─────
 st.set_page_config(layout="wide", page_title="Sniper Analysis by Lampros")
@@ -200,20 +216,33 @@ scrollable_style = """
 st.markdown(scrollable_style, unsafe_allow_html=True)
 # ───── Load DB Connection ─────
 load_dotenv()
-dbconn = os.getenv("MongoLink")
-client = MongoClient(dbconn)
-db = client['genesis_tokens_swap_info']
+db = get_db()
+db_status = health()
+if not db_status["ok"]:
+    st.error(f"Database unavailable: {db_status['error']}")
+    st.stop()
+# WALLET_STATS=mongo computes per-wallet trade stats server-side
+STATS_PUSHDOWN = os.getenv("WALLET_STATS", "pandas").lower() == "mongo"
+# RESULTS_SOURCE picks where sniper and PnL tables come from: "stored" reads
+# the tables written by `python -m core.results`, "watch" follows MongoDB
+# change streams (needs a replica set) and "live" recomputes on the cache TTL
+RESULTS_SOURCE = os.getenv("RESULTS_SOURCE", "stored").lower()
+# Seconds between refreshes of the sniper view in watch mode
+LIVE_REFRESH = int(os.getenv("LIVE_REFRESH_SECONDS", "5"))
+# Seconds to wait for the live feed before recomputing instead
+LIVE_WAIT = float(os.getenv("LIVE_WAIT_SECONDS", "60"))
+# Stage timings in the sidebar, also with ?debug=1 in the URL
+DEBUG_METRICS = os.getenv("DEBUG_METRICS", "0") == "1" or st.query_params.get("debug") == "1"
+
+start_render("token")
+serve()
 
 
 # ───── Token Parameter ─────
 query_params = st.query_params
 token = query_params.get('token', '').lower().strip()
-# Token list (use DB here if needed)
-available_tokens = [
-    "jarvis", "pilot", "tian", "vgn", "badai", "bolz", "trivi", "vruff",
-    "wbug", "aispace", "wint", "ling", "gloria", "light", "rwai", "nyko",
-    "super", "xllm2", "maneki", "whim"
-]
+# Token list from the shared registry
+available_tokens = get_registry().tokens()
 
 # If no token in URL, show fallback UI
 if not token:
@@ -224,39 +253,29 @@ if not token:
         st.switch_page(f"/tokendatatestcopy.py?token={selected.lower()}")
     
     st.stop()
+# ───── Token Metadata ─────
+# One stored document per token, kept by core.results; read here and topped up by blockNumber
+@st.cache_data(ttl=60)
+def load_token_metadata(token_symbol):
+    cache_miss()
+    return token_metadata(db, token_symbol)
+
 colh, cold, colmpty = st.columns([3, 4, 5])
 with colh:
     st.markdown(f"<h1 style='margin-top: 0rem; color: white;'>TOKEN {token.upper()}</h1>", unsafe_allow_html=True)
 
 with cold:
-    doc = db["swap_progress"].find_one({"token_symbol": token.upper()})
+    with stage("metadata", cached=True):
+        doc = load_token_metadata(token.upper())
     if doc:
-        token_addr = doc.get("token_address", "N/A")
-        lp_addr = doc.get("lp", "N/A")
-        genesis_block = doc.get("genesis_block", "N/A")
-
-        # We cannot get name, dao, or timestamp from swap_progress — we'll extract from first swap doc
-        #token_collection = f"{token.lower()}_swap"
-        token_collection = ['jarvis_swap', 'afath_swap', 'pilot_swap', 'tian_swap', 'vgn_swap', 'badai_swap',
-                       'bolz_swap', 'trivi_swap', 'vruff_swap', 'wbug_swap', 'aispace_swap', 'wint_swap', 
-                       'ling_swap', 'gloria_swap', 'light_swap', 'rwai_swap', 'nyko_swap', 'super_swap',
-                       'xllm2_swap', 'maneki_swap', 'whim_swap']
-        swap_doc = None
-        for col_name in token_collection:
-            result = db[col_name].find_one(
-                {"genesis_token_symbol": token.upper()},
-                sort=[("timestamp", 1)]
-            )
-            if result:
-                swap_doc = result
-                break
-
-        name = swap_doc.get("persona_name", "N/A") if swap_doc else "N/A"
-        dao_addr = swap_doc.get("persona_dao", "N/A") if swap_doc else "N/A"
-        timestamp = swap_doc.get("timestamp", 0) if swap_doc else 0
+        token_addr = doc.get("token_address") or "N/A"
+        lp_addr = doc.get("lp") or "N/A"
+        genesis_block = doc.get("genesis_block") or "N/A"
+        name = doc.get("persona_name") or "N/A"
+        dao_addr = doc.get("persona_dao") or "N/A"
+        timestamp = doc.get("launch_timestamp") or 0
         launch_time = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%d-%m-%Y %H:%M') if timestamp else "N/A"
-        collection_name = f"{token.lower()}_swap"
-        swap_count = db[collection_name].count_documents({})
+        swap_count = doc["swap_count"]
         details_card = f"""
         <div style="
             background-color: rgba(255, 255, 255, 0.1);
@@ -283,60 +302,62 @@ with colmpty:
     st.write("")
 
 # ───── Collection Naming ─────
-token_in_col = f"{token.upper()}_IN"
-token_out_col = f"{token.upper()}_OUT"
-virtual_in_col = "Virtual_IN"
-virtual_out_col = "Virtual_OUT"
 collection_name = f"{token}_swap"
 
-# ───── Fetch Data ─────
-data = list(db[collection_name].find({}, {
-    "blockNumber": 1, "txHash": 1, "maker": 1, "swapType": 1, "label": 1, "timestampReadable": 1,
-    token_in_col: 1, token_out_col: 1, virtual_in_col: 1, virtual_out_col: 1,
-    "genesis_usdc_price": 1, "genesis_virtual_price": 1, "virtual_usdc_price": 1, "Tax_1pct":1, "transactionFee":1
-}))
-#st.write("Fetched rows:", len(data))
-#st.write("Sample doc:", data[0] if data else "No data")
-
-tabdf = pd.DataFrame(data).fillna(0)
-
-# ───── Process Data ─────
-def extract_amount(row):
-    if row.get("swapType") == "buy":
-        return pd.Series([row.get(token_out_col), row.get(virtual_in_col)])
-    elif row.get("swapType") == "sell":
-        return pd.Series([row.get(token_in_col), row.get(virtual_out_col)])
-    return pd.Series([None, None])
-
-tabdf[["TokenAmount", "Virtual"]] = tabdf.apply(extract_amount, axis=1)
-tabdf["TokenAmount"] = pd.to_numeric(tabdf["TokenAmount"]).round(4)
-tabdf["Virtual"] = pd.to_numeric(tabdf["Virtual"]).round(4)
-tabdf.rename(columns={"TokenAmount": token.upper()}, inplace=True)
-
-tabdf["txHash"] = tabdf["txHash"].apply(lambda tx: f"<a href='https://basescan.org/tx/{tx}' target='_blank'>Link to txn</a>")
-tabdf["swapType"] = tabdf["swapType"].apply(lambda x: f"<span style='color: {'#74fe64' if x == 'buy' else 'red'}; font-weight:bold'>{x}</span>")
-
-tabdf = tabdf[[
-    "blockNumber", "txHash", "maker", "swapType", "label", "timestampReadable",
-    token.upper(), "Virtual", "genesis_usdc_price", "genesis_virtual_price", "virtual_usdc_price", "Tax_1pct", "transactionFee"
-]].rename(columns={
-    "blockNumber": "BLOCK", "txHash": "TX HASH", "maker": "MAKER",
-    "swapType": "TX TYPE", "label": "SWAP TYPE", "timestampReadable": "TIME",
-    "Virtual": "VIRTUAL",
-    "genesis_usdc_price": "GENESIS \nPRICE ($)",
-    "genesis_virtual_price": "GENESIS PRICE \n($VIRTUAL)",
-    "virtual_usdc_price": "VIRTUAL \nPRICE ($)",
-    "Tax_1pct": "TAX (ETH)",
-    "transactionFee": f"TX FEE ({token.upper()})"})
-tabdf["MAKER"] = tabdf["MAKER"].apply(lambda addr: f"<span title='{addr}'>{addr[:5]}...{addr[-5:]}</span>" if isinstance(addr, str) else addr)
-tabdf["TIME_PARSED"] = pd.to_datetime(tabdf["TIME"], errors='coerce')
-tabdf["TX_TYPE_RAW"] = tabdf["TX TYPE"].str.extract(r">(\w+)<")
-tabdf["TRANSACTION VALUE ($)"] = (pd.to_numeric(tabdf[token.upper()], errors="coerce") * pd.to_numeric(tabdf["GENESIS \nPRICE ($)"], errors="coerce")).round(4)
-filtered_df = tabdf.copy()
+# ───── Transaction Queries ─────
+# Table column -> stored or computed swap field. Filters, sorting and paging
+# run in MongoDB, so only the page being shown is ever loaded.
+tx_fields = {
+    "BLOCK": "blockNumber", "TX HASH": "txHash", "MAKER": "maker", "TX TYPE": "swapType",
+    "SWAP TYPE": "label", "TIME": "timestampReadable",
+    token.upper(): "token_amount", "VIRTUAL": "virtual_amount",
+    "GENESIS \nPRICE ($)": "genesis_usdc_price", "TRANSACTION VALUE ($)": "usd_value",
+    "GENESIS PRICE \n($VIRTUAL)": "genesis_virtual_price", "VIRTUAL \nPRICE ($)": "virtual_usdc_price",
+    "TAX (ETH)": "Tax_1pct", f"TX FEE ({token.upper()})": "transactionFee",
+}
+# TIME sorts on the indexed epoch timestamp, which orders the same way
+sort_fields = {**tx_fields, "TIME": "timestamp"}
+
+@st.cache_data(ttl=60)
+def query_count(collection_name, token, match, value_range):
+    cache_miss()
+    return count_transactions(db[collection_name], token, match, value_range)
+
+@st.cache_data(ttl=60)
+def query_bounds(collection_name, token, match, field):
+    cache_miss()
+    return value_bounds(db[collection_name], token, match, field)
+
+@st.cache_data(ttl=60)
+def query_page(collection_name, token, match, sort_field, ascending, value_range, skip, limit):
+    cache_miss()
+    return fetch_transactions(db[collection_name], token, match, sort_field, ascending, value_range, skip, limit)
+
+@st.cache_data(ttl=300)
+def query_labels(collection_name):
+    cache_miss()
+    return sorted(label for label in db[collection_name].distinct("label") if label is not None)
+
+@st.cache_data(ttl=300)
+def query_activity(collection_name, token):
+    cache_miss()
+    return trader_volumes(db[collection_name], token), daily_volume(db[collection_name], token)
+
+# Only the rows of the page being shown get their HTML cells
+def format_transactions(page):
+    page = page.fillna({field: 0 for field in BASE_FIELDS})
+    page = page[list(tx_fields.values())].rename(columns={v: k for k, v in tx_fields.items()})
+    page["TX HASH"] = page["TX HASH"].apply(lambda tx: f"<a href='https://basescan.org/tx/{tx}' target='_blank'>Link to txn</a>")
+    page["TX TYPE"] = page["TX TYPE"].apply(lambda x: f"<span style='color: {'#74fe64' if x == 'buy' else 'red'}; font-weight:bold'>{x}</span>")
+    page["MAKER"] = page["MAKER"].apply(lambda addr: f"<span title='{addr}'>{addr[:5]}...{addr[-5:]}</span>" if isinstance(addr, str) else addr)
+    return page
+
+PAGE_SIZES = [50, 100, 250, 500]
 
 sortable_columns = [
     "BLOCK",                   # from "blockNumber"
     "TIME",                    # from "timestampReadable"
+    # Computed per swap and not indexed; sorting on it sorts every filtered swap
     "VIRTUAL",                 # from "Virtual"
     "GENESIS \nPRICE ($)",     # from "genesis_usdc_price"
     "GENESIS PRICE \n($VIRTUAL)", # from "genesis_virtual_price"
@@ -344,9 +365,18 @@ sortable_columns = [
     "TAX (ETH)",f"TX FEE ({token.upper()})"
 ]
 
-tab1, tab2, tab3 = st.tabs(["TRANSCTIONS", "SNIPER INSIGHTS", "OTHER"])
-
-with tab1:
+# ───── View Selector ─────
+# Only the selected view runs on a rerun (st.tabs would run every tab body),
+# and each view is a fragment so its own widgets rerun only that view
+view = st.segmented_control(
+    "View", options=["TRANSCTIONS", "SNIPER INSIGHTS", "OTHER"], default="TRANSCTIONS",
+    key="view", label_visibility="collapsed"
+) or "TRANSCTIONS"
+
+@st.fragment
+def render_transactions():
+    # A fragment rerun is a run of its own
+    start_render("token")
     # ───── Filters: Panel 1 ─────
     with st.container():
         col1, col2, col3, col4, col5, col10 = st.columns(6)
@@ -357,12 +387,21 @@ with tab1:
     
         with col2:
             st.markdown("<div style='color: white; font-weight: 500;'>Swap Type</div>", unsafe_allow_html=True)
-            label_options = ["All"] + sorted(tabdf["SWAP TYPE"].dropna().unique())
+            with stage("tx_labels", cached=True):
+                label_options = ["All"] + query_labels(collection_name)
             label_filter = st.selectbox("", label_options)
     
         with col3:
             st.markdown("<div style='color: white; font-weight: 500;'>Date Range</div>", unsafe_allow_html=True)
-            date_range = st.date_input("", value=(tabdf["TIME_PARSED"].min(), tabdf["TIME_PARSED"].max()))
+            with stage("tx_bounds", cached=True):
+                first_ts, last_ts = query_bounds(collection_name, token, {}, "timestamp")
+            if first_ts is None:
+                st.error("No data found for this token.")
+                return
+            date_range = st.date_input("", value=(
+                datetime.fromtimestamp(first_ts, tz=timezone.utc).date(),
+                datetime.fromtimestamp(last_ts, tz=timezone.utc).date()
+            ))
     
         with col4:
             st.markdown("<div style='color: white; font-weight: 500;'>Sort by</div>", unsafe_allow_html=True)
@@ -375,25 +414,16 @@ with tab1:
         with col10:
             st.markdown("<div style='color: white; font-weight: 500;'>Search</div>", unsafe_allow_html=True)
             search_query = st.text_input("", placeholder="BLOCK | MAKER | TX HASH")
-            if search_query:
-                q = search_query.strip().lower()
-                filtered_df = filtered_df[
-                    filtered_df["BLOCK"].astype(str).str.contains(q) |
-                    filtered_df["MAKER"].str.lower().str.contains(q) |
-                    filtered_df["TX HASH"].str.lower().str.contains(q)
-                ]
     
     # ───── Apply Filters ─────
-    if swap_filter != "all":
-        filtered_df = filtered_df[filtered_df["TX_TYPE_RAW"].str.lower() == swap_filter.lower()]
-    if label_filter != "All":
-        filtered_df = filtered_df[filtered_df["SWAP TYPE"] == label_filter]
-    if isinstance(date_range, tuple) and len(date_range) == 2:
-        start_date = pd.to_datetime(date_range[0])
-        end_date = pd.to_datetime(date_range[1]) + timedelta(days=1)
-        filtered_df = filtered_df[(filtered_df["TIME_PARSED"] >= start_date) & (filtered_df["TIME_PARSED"] <= end_date)]
+    match = transaction_filter(
+        swap_filter or "all", label_filter,
+        date_range if isinstance(date_range, tuple) else None,
+        search_query
+    )
     
     # ───── Filters: Panel 2 (Numeric Range) ─────
+    value_range = None
     with st.container():
         col6, col7 = st.columns([1, 4])
         with col6:
@@ -402,34 +432,48 @@ with tab1:
             selected_col = st.selectbox("", numeric_columns)
     
         with col7:
-            if selected_col in filtered_df.columns and not filtered_df[selected_col].dropna().empty:
-                col_min, col_max = filtered_df[selected_col].min(), filtered_df[selected_col].max()
-                if pd.notnull(col_min) and pd.notnull(col_max) and col_min != col_max:
-                    st.markdown(f"<div style='color: white; font-weight: 500;'>Range for {selected_col}</div>", unsafe_allow_html=True)
-                    value_range = st.slider(
-                        "", float(col_min), float(col_max), (float(col_min), float(col_max)),
-                        step=0.000001, format="%.6f"
-                    )
-                    filtered_df = filtered_df[
-                        (filtered_df[selected_col] >= value_range[0]) &
-                        (filtered_df[selected_col] <= value_range[1])
-                    ]
+            with stage("tx_bounds", cached=True):
+                col_min, col_max = query_bounds(collection_name, token, match, tx_fields[selected_col])
+            if pd.notnull(col_min) and pd.notnull(col_max) and col_min != col_max:
+                st.markdown(f"<div style='color: white; font-weight: 500;'>Range for {selected_col}</div>", unsafe_allow_html=True)
+                selected_range = st.slider(
+                    "", float(col_min), float(col_max), (float(col_min), float(col_max)),
+                    step=0.000001, format="%.6f"
+                )
+                # The full range filters nothing, so it is left out of the query
+                if selected_range != (float(col_min), float(col_max)):
+                    value_range = (tx_fields[selected_col], *selected_range)
     
     #--TABLE RENDERING
-    filtered_df = filtered_df.sort_values(by=sort_col, ascending=(sort_dir == "Ascending"))
-    filtered_df = filtered_df.drop(columns=["TX_TYPE_RAW", "TIME_PARSED"], errors="ignore")
-    #ordering columns
-    ordered_cols = [
-        "BLOCK", "TX HASH", "MAKER", "TX TYPE", "SWAP TYPE", "TIME",
-        token.upper(), "VIRTUAL", "GENESIS \nPRICE ($)", "TRANSACTION VALUE ($)",
-        "GENESIS PRICE \n($VIRTUAL)", "VIRTUAL \nPRICE ($)", "TAX (ETH)", f"TX FEE ({token.upper()})"
-    ]
-    filtered_df = filtered_df[[col for col in ordered_cols if col in filtered_df.columns]]
-    
-    html_table = filtered_df.to_html(escape=False, index=False, float_format="%.8f")
+    # ───── Pagination ─────
+    with stage("tx_count", cached=True):
+        total_rows = query_count(collection_name, token, match, value_range)
+    with st.container():
+        colp1, colp2, colp3 = st.columns([1, 1, 4])
+        with colp1:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES, key="tx_page_size")
+        num_pages = max(1, -(-total_rows // page_size))
+        # Filters can shrink the result below the page the user was on
+        if st.session_state.get("tx_page", 1) > num_pages:
+            st.session_state["tx_page"] = num_pages
+        with colp2:
+            page_no = st.number_input("Page", min_value=1, max_value=num_pages, step=1, key="tx_page")
+        with colp3:
+            st.markdown(f"<div style='color: white; padding-top: 2rem;'>{total_rows:,} transactions · page {page_no} of {num_pages}</div>", unsafe_allow_html=True)
+
+    with stage("tx_page", cached=True) as record:
+        page_df = query_page(
+            collection_name, token, match, sort_fields[sort_col], sort_dir == "Ascending",
+            value_range, (page_no - 1) * page_size, page_size
+        )
+        record["rows"] = len(page_df)
+    with stage("tx_to_html", rows=len(page_df)):
+        html_table = format_transactions(page_df).to_html(escape=False, index=False, float_format="%.8f")
     
-    tabdf["date"] = tabdf["TIME_PARSED"].dt.date
-    volume_df = tabdf.groupby("date")[token.upper()].sum().reset_index()
+    with stage("activity", cached=True) as record:
+        volumes, volume_df = query_activity(collection_name, token)
+        record["rows"] = len(volumes)
+    volume_df = volume_df.rename(columns={"volume": token.upper()})
     # --- KPI METRICS ---
     with st.container():
         
@@ -437,40 +481,24 @@ with tab1:
 
         with col1:
             
-            if "MAKER_CLEAN" not in tabdf.columns:
-                import re
-                tabdf["MAKER_CLEAN"] = tabdf["MAKER"].apply(lambda addr: re.sub(r'<.*?>', '', addr) if isinstance(addr, str) else addr)
-            unique_makers = tabdf["MAKER_CLEAN"].nunique()
+            unique_makers = volumes["maker"].nunique()
             
-            sell_volume_usd = (
-                tabdf[tabdf["TX_TYPE_RAW"] == "sell"][token.upper()] *
-                tabdf[tabdf["TX_TYPE_RAW"] == "sell"]["GENESIS \nPRICE ($)"]
-            ).sum()
+            sell_volume_usd = volumes.loc[volumes["swapType"] == "sell", "usd"].sum()
+            buy_volume_usd = volumes.loc[volumes["swapType"] == "buy", "usd"].sum()
             
-            buy_volume_usd = (
-                tabdf[tabdf["TX_TYPE_RAW"] == "buy"][token.upper()] *
-                tabdf[tabdf["TX_TYPE_RAW"] == "buy"]["GENESIS \nPRICE ($)"]
-            ).sum()
-            
-        tabdf["MAKER_CLEAN"] = tabdf["MAKER"].str.replace(r"<.*?>", "", regex=True)
-        # BUYERS: Group by address, compute total USD bought
+        # BUYERS: Top wallets by total USD bought
         buyers = (
-            tabdf[tabdf["TX_TYPE_RAW"] == "buy"]
-            .groupby("MAKER_CLEAN")
-            .apply(lambda df: (df[token.upper()] * df["GENESIS \nPRICE ($)"]).sum())
-            .nlargest(10)
-            .reset_index(name="buy_volume_usd")
+            volumes[volumes["swapType"] == "buy"]
+            .nlargest(10, "usd")
+            .rename(columns={"maker": "MAKER_CLEAN", "usd": "buy_volume_usd"})
         )
 
-        # SELLERS: Group by address, compute total USD sold
+        # SELLERS: Top wallets by total USD sold
         sellers = (
-            tabdf[tabdf["TX_TYPE_RAW"] == "sell"]
-            .groupby("MAKER_CLEAN")
-            .apply(lambda df: (df[token.upper()] * df["GENESIS \nPRICE ($)"]).sum())
-            .nlargest(10)
-            .reset_index(name="sell_volume_usd")
+            volumes[volumes["swapType"] == "sell"]
+            .nlargest(10, "usd")
+            .rename(columns={"maker": "MAKER_CLEAN", "usd": "sell_volume_usd"})
         )
-
         # Shorten address for readability
         buyers["MAKER_SHORT"] = buyers["MAKER_CLEAN"].apply(lambda a: a[:6] + "..." + a[-4:])
         sellers["MAKER_SHORT"] = sellers["MAKER_CLEAN"].apply(lambda a: a[:6] + "..." + a[-4:])
@@ -507,14 +535,6 @@ with tab1:
     ).properties(title=" ", width=700, height=eq_height)
 
 
-    # --- Prepare Buyers & Sellers Data (clean + group) ---
-    def clean_address(addr):
-        import re
-        if isinstance(addr, str):
-            addr = re.sub(r'<.*?>', '', addr)  # Strip HTML tags if present
-            return addr
-        return addr
-
     # --- Render Everything ---
     with st.container():
         st.markdown(scrollable_style, unsafe_allow_html=True)
@@ -530,223 +550,222 @@ with tab1:
             st.markdown(f"<div class='glass-kpi'><h4>BUY VOLUME ($)</h4><p>${buy_volume_usd:,.2f}</p></div>", unsafe_allow_html=True)
         with col2:
             st.subheader("TOP 10 BUYERS")
-            st.altair_chart(chart_buyers, use_container_width=True)
+            with stage("chart:chart_buyers", rows=len(chart_buyers.data)):
+                st.altair_chart(chart_buyers, use_container_width=True)
         with col3:
             st.subheader("TOP 10 SELLERS")
-            st.altair_chart(chart_sellers, use_container_width=True)
+            with stage("chart:chart_sellers", rows=len(chart_sellers.data)):
+                st.altair_chart(chart_sellers, use_container_width=True)
         st.subheader("SWAP VOLUME OVER TIME")
-        st.altair_chart(chart, use_container_width=True)
+        with stage("chart:chart", rows=len(chart.data)):
+            st.altair_chart(chart, use_container_width=True)
 
-with tab2:
+@st.fragment(run_every=LIVE_REFRESH if RESULTS_SOURCE == "watch" else None)
+def render_sniper_insights():
+    # A fragment rerun is a run of its own
+    start_render("token")
 
     # ───── Token from Query Params ─────
     token_upper = token.upper()
 
     # ───── Load Swap Data for Token ─────
-    @st.cache_data(ttl=300)
+    def decode_swaps(col_name, docs):
+        df = pd.DataFrame(docs)
+        df.drop(columns=["_id"], errors="ignore", inplace=True)
+        df["token_name"] = col_name.replace("_swap", "").upper()
+        return coerce_swaps(df)
+
+    # Shared per-token swap store, started from the local snapshot and
+    # topped up by blockNumber watermark
+    @st.cache_resource(max_entries=20)
+    def get_swap_sync(token):
+        return SwapSync(db, [f"{token}_swap"], lambda col_name: None, decode_swaps, ttl=300,
+                        snapshots=snapshot_store("token"))
+
     def load_swap_data(token):
-        col_name = f"{token}_swap"
-        data = list(db[col_name].find())
-        if not data:
+        df = get_swap_sync(token).refresh()
+        if df is None or df.empty:
             return None
-        df = pd.DataFrame(data)
-        df.drop(columns=["_id"], errors="ignore", inplace=True)
-        df["token_name"] = token.upper()
-        df["timestampReadable"] = pd.to_datetime(df["timestampReadable"], errors='coerce')
         return df
 
 
     # ───── Launch Block (fallback logic) ─────
     @st.cache_data(ttl=600)
     def load_launch_blocks():
-        client = MongoClient(dbconn)
-        db = client["genesis_tokens_swap_info"]
+        cache_miss()
         try:
-            persona_data = list(db["swap_progress"].find({}, {"token_symbol": 1, "genesis_block": 1}))
-            df = pd.DataFrame(persona_data)
-            if not df.empty and "token_symbol" in df and "genesis_block" in df:
-                return dict(zip(df["token_symbol"], df["genesis_block"]))
+            return progress_launch_blocks(db)
         except Exception as e:
             print("Error loading launch blocks:", e)
         return {}
 
+    # Shared per-token ledger, updated from the collection's change stream;
+    # a feed dropped from the cache stops its thread once collected
+    @st.cache_resource(max_entries=20)
+    def get_live_feed(token):
+        return LiveFeed(db, [f"{token}_swap"], load_launch_blocks()).start()
+
+    # Checkpointed FIFO replay of the token's swaps, extended with new swaps
+    # and held in the shared result cache
+    def get_ledger_history(token):
+        return synced_history(get_swap_sync(token), load_launch_blocks(),
+                              prepare=lambda rows: strip_token_prefix(rows, token.upper()))
+
     # ───── Sniper Detection Logic ─────
     #@st.cache_data(ttl=300)
     def process_sniper_data(combined_df, token_launch_blocks):
-        buy_df = combined_df[combined_df["swapType"] == "buy"].copy()
-        buy_df = buy_df.sort_values(by=["maker", "timestampReadable"])
-        chunked_buys = []
-        time_threshold = pd.Timedelta(minutes=10)
-
-        for maker, group in buy_df.groupby("maker"):
-            current_chunk = []
-            chunk_start_time = None
-            current_sum = 0
-            for row in group.itertuples():
-                if not current_chunk:
-                    chunk_start_time = row.timestampReadable
-                    current_chunk = [row]
-                    token_prefix = row.token_name  # e.g., "AFATH"
-                    field = f"{token_prefix}_OUT_BeforeTax"
-                    current_sum = getattr(row, field, 0)  # fallback to 0 if field missing
-
-                elif row.timestampReadable - chunk_start_time <= time_threshold:
-                    current_chunk.append(row)
-                    current_sum += getattr(row, field, 0)
-                else:
-                    if current_sum > 100000:
-                        chunked_buys.extend(current_chunk)
-                    chunk_start_time = row.timestampReadable
-                    current_chunk = [row]
-                    token_prefix = row.token_name
-                    field = f"{token_prefix}_OUT_BeforeTax"
-                    current_sum = getattr(row, field, 0)
-
-            if current_sum > 100000:
-                chunked_buys.extend(current_chunk)
-
-        df_chunked_large_buys = pd.DataFrame(chunked_buys).drop_duplicates()
-        if "transactionFee" in df_chunked_large_buys.columns:
-            df_high_gas = df_chunked_large_buys[df_chunked_large_buys["transactionFee"] > 0.000002]
-        else:
-            df_high_gas = df_chunked_large_buys.copy()
+        if "transactionFee" not in combined_df.columns:
             st.warning("⚠️ 'transactionFee' missing in dataset — skipping gas filter.")
-
-
-        def is_sniper_buy(row):
-            launch_block = token_launch_blocks.get(row["token_name"])
-            return launch_block is not None and row["blockNumber"] <= launch_block + 100
-
-        df_sniper_buys = df_high_gas[df_high_gas.apply(is_sniper_buy, axis=1)]
-
-        sells = combined_df[combined_df["swapType"] == "sell"][["maker", "timestampReadable", "token_name"]]
-        merged = pd.merge(
-            df_sniper_buys[["maker", "timestampReadable", "token_name"]],
-            sells,
-            on=["maker", "token_name"],
-            suffixes=("_buy", "_sell"),
-        )
-        merged["time_diff"] = (merged["timestampReadable_sell"] - merged["timestampReadable_buy"]).dt.total_seconds()
-        quick_sells = merged[merged["time_diff"].between(0, 20 * 60)]
-        potential_sniper_df = df_sniper_buys[df_sniper_buys["maker"].isin(quick_sells["maker"])].copy()
-        #st.write("🔍 Potential sniper rows found:", len(potential_sniper_df))
+        potential_sniper_df = parallel_snipers(combined_df, token_launch_blocks, f"{token_upper}_OUT_BeforeTax")
         return potential_sniper_df, combined_df
 
     # ───── PnL Calculation ─────
-    @st.cache_data(ttl=300)
-    def calculate_pnl(potential_sniper_df, combined_df):
-        results = []
-        sniper_pairs = potential_sniper_df[["maker", "token_name"]].drop_duplicates()
-        for _, row in sniper_pairs.iterrows():
-            maker = row["maker"]
-            token = row["token_name"]
-            df = combined_df[(combined_df["maker"] == maker) & (combined_df["token_name"] == token)]
-            df = df.sort_values(by="timestamp")
-            trades = defaultdict(list)
-
-            # Dynamic field names based on token
-            out_before_tax_col = f"{token}_OUT_BeforeTax"
-            out_after_tax_col = f"{token}_OUT_AfterTax"
-            in_before_tax_col = f"{token}_IN_BeforeTax"
-            in_after_tax_col = f"{token}_IN_AfterTax"
-
-            buy_txn_count = (df["swapType"] == "buy").sum()
-            sell_txn_count = (df["swapType"] == "sell").sum()
-            first_buy_time = df.loc[df["swapType"] == "buy", "timestampReadable"].min()
-            last_sell_time = df.loc[df["swapType"] == "sell", "timestampReadable"].max()
-            avg_buy_price = df.loc[df["swapType"] == "buy", "genesis_usdc_price"].mean()
-            avg_sell_price = df.loc[df["swapType"] == "sell", "genesis_usdc_price"].mean()
-            total_tax_paid = df["Tax_1pct"].sum()
-            total_tx_fees = df["transactionFee"].sum()
-
-            for _, tx in df.iterrows():
-                token_prefix = tx["token_name"]
-                
-                if tx["swapType"] == "buy":
-                    out_before_tax = tx.get(f"{token_prefix}_OUT_BeforeTax", 0.0)
-                    out_after_tax = tx.get(f"{token_prefix}_OUT_AfterTax", 0.0)
-                    trades[maker].append({
-                        "type": "buy",
-                        "amount": out_after_tax,
-                        "cost": out_before_tax,
-                        "price": tx["genesis_usdc_price"]
-                    })
-
-                elif tx["swapType"] == "sell":
-                    in_before_tax = tx.get(f"{token}_IN_BeforeTax", 0.0)
-                    in_after_tax = tx.get(f"{token}_IN_AfterTax", 0.0)
-                    trades[maker].append({
-                        "type": "sell",
-                        "amount": in_after_tax,
-                        "from_wallet": in_before_tax,
-                        "price": tx["genesis_usdc_price"]
-                    })
-
-
-            buy_queue = deque()
-            realized = 0.0
-            for tx in trades[maker]:
-                if tx["type"] == "buy":
-                    buy_queue.append({
-                        "amount": tx["amount"],
-                        "cost": tx["cost"],
-                        "price": tx["price"]
-                    })
-                elif tx["type"] == "sell":
-                    to_match = tx["from_wallet"]
-                    proceeds = tx["amount"] * tx["price"]
-                    while to_match > 0 and buy_queue:
-                        buy = buy_queue.popleft()
-                        match_amt = min(to_match, buy["amount"])
-                        match_cost = buy["cost"] * (match_amt / buy["amount"])
-                        realized += proceeds * (match_amt / tx["from_wallet"]) - match_cost * buy["price"]
-                        to_match -= match_amt
-                        leftover = buy["amount"] - match_amt
-                        if leftover > 0:
-                            buy_queue.appendleft({
-                                "amount": leftover,
-                                "cost": buy["cost"] * (leftover / buy["amount"]),
-                                "price": buy["price"]
-                            })
-
-            remaining = sum(b["amount"] for b in buy_queue)
-            latest_price = combined_df[combined_df["token_name"] == token].sort_values(by="timestamp", ascending=False).head(1)["genesis_usdc_price"].values[0]
-            unrealized = remaining * latest_price
-
-            results.append({
-                "Wallet Address": maker,
-                "Net PnL ($)": round(realized, 4),
-                "Unrealized PnL ($)": round(unrealized, 4),
-                "Remaining Tokens": float(f"{remaining:.4f}"),
-                "Txn Count\n(BUY)": buy_txn_count,
-                "Txn Count\n(SELL)": sell_txn_count,
-                "First Buy Time": first_buy_time,
-                "Last Sell Time": last_sell_time,
-                "Average Buy Price ($)": round(avg_buy_price, 4),
-                "Average Sell Price ($)": round(avg_sell_price, 4),
-                "Total Tax Paid": round(total_tax_paid, 4),
-                "Total Tx Fees Paid (ETH)": round(total_tx_fees, 4)
-            })
-        print("Returning results with rows:", len(results))
-        print("Result keys:", results[0].keys() if results else "No results")
+    def format_pnl(pnl, count_sep):
+        return pd.DataFrame({
+            "Wallet Address": pnl["maker"],
+            "Net PnL ($)": pnl["realized_pnl"].round(4),
+            "Unrealized PnL ($)": pnl["unrealized_pnl"].round(4),
+            "Remaining Tokens": pnl["remaining_tokens"].round(4),
+            f"Txn Count{count_sep}(BUY)": pnl["buy_count"],
+            f"Txn Count{count_sep}(SELL)": pnl["sell_count"],
+            "First Buy Time": pnl["first_buy_time"],
+            "Last Sell Time": pnl["last_sell_time"],
+            "Average Buy Price ($)": pnl["avg_buy_price"].round(4),
+            "Average Sell Price ($)": pnl["avg_sell_price"].round(4),
+            "Total Tax Paid": pnl["total_tax"].round(4),
+            "Total Tx Fees Paid (ETH)": pnl["total_fee"].round(4)
+        })
 
-        return pd.DataFrame(results)
+    def calculate_pnl(potential_sniper_df, combined_df, prices=None):
+        swaps = strip_token_prefix(combined_df, token_upper)
+        pairs = potential_sniper_df[["maker", "token_name"]]
+        if not STATS_PUSHDOWN:
+            return parallel_fifo_pnl(swaps, pairs, prices=prices)
+        return with_wallet_stats(db, parallel_fifo_pnl(swaps, pairs, prices=prices, stats=False))
+
+    def calculate_pnl_all(df, prices=None):
+        swaps = strip_token_prefix(df, token_upper)
+        if not STATS_PUSHDOWN:
+            return parallel_fifo_pnl(swaps, prices=prices)
+        return with_wallet_stats(db, parallel_fifo_pnl(swaps, prices=prices, stats=False))
     #st.write("PnL DF Columns:", pnl_df.columns.tolist())
 
+    # ───── Precomputed Results ─────
+    @st.cache_data(ttl=60)
+    def load_stored_results(token):
+        """(summary, PnL of every wallet) from the batch job, or None when it has not seen the token's swaps"""
+        cache_miss()
+        stored = stored_results(db, "token", [token])
+        if stored is None or stored[0][token]["watermark"] is None:
+            return None
+        summary = stored[0][token]
+        return {**summary, "blocks_behind": blocks_behind(db, summary)}, stored[1]
 
     # ───── Load and Process ─────
-    with st.spinner("Loading data..."):
-        combined_df = load_swap_data(token)
-        if combined_df is None:
-            st.error("No data found for this token.")
-            st.stop()
-        token_launch_blocks = load_launch_blocks()
-        potential_sniper_df, combined_df = process_sniper_data(combined_df, token_launch_blocks)
-        
-    pnl_df = calculate_pnl(potential_sniper_df, combined_df)
+    stored = None
+    if RESULTS_SOURCE == "stored":
+        with stage("stored_results", cached=True) as record:
+            stored = load_stored_results(token_upper)
+            record["rows"] = None if stored is None else len(stored[1])
+    live_pnl = None
+    if RESULTS_SOURCE == "watch":
+        feed = get_live_feed(token)
+        with st.spinner("Loading swaps for live updates..."):
+            live = feed.wait_live(LIVE_WAIT)
+        if live:
+            with stage("live_table") as record:
+                live_pnl = feed.table()
+                record["rows"] = len(live_pnl)
+            if feed.updated_at is not None:
+                block = feed.watermarks.get(collection_name)
+                st.caption(f"Live at block {block:,}, last swap applied {time_module.time() - feed.updated_at:.0f}s ago"
+                           if block is not None else "Live")
+        else:
+            st.warning(f"Live updates unavailable ({feed.error or 'still loading swaps'}), recomputing instead")
+    if live_pnl is not None:
+        sniper_pnl = live_pnl[live_pnl["sniper"]].reset_index(drop=True)
+        sniper_wallets = set(sniper_pnl["maker"])
+        load_pnl_all = lambda: live_pnl
+    elif stored is not None:
+        summary, stored_pnl = stored
+        note = f"Precomputed at block {summary['watermark']:,} on {summary['computed_at']:%Y-%m-%d %H:%M} UTC"
+        if summary["blocks_behind"]:
+            note += f", {summary['blocks_behind']:,} blocks behind the latest swap"
+        st.caption(note)
+        sniper_pnl = stored_pnl[stored_pnl["sniper"]].reset_index(drop=True)
+        sniper_wallets = set(sniper_pnl["maker"])
+        load_pnl_all = lambda: stored_pnl
+    else:
+        with st.spinner("Loading data..."):
+            with stage("load_swaps") as record:
+                combined_df = load_swap_data(token)
+                record["rows"] = 0 if combined_df is None else len(combined_df)
+            if combined_df is None:
+                st.error("No data found for this token.")
+                return
+            with stage("launch_blocks", cached=True):
+                token_launch_blocks = load_launch_blocks()
+            # Sniper rows and PnL are only recomputed for wallets with new swaps
+            sync = get_swap_sync(token)
+            launch_params = token_launch_blocks.get(token_upper)
+            with stage("snipers", cached=True) as record:
+                potential_sniper_df = sync.pair_table(
+                    "snipers",
+                    lambda df: process_sniper_data(df, token_launch_blocks)[0],
+                    params=launch_params
+                )
+                record["rows"] = len(potential_sniper_df)
+
+        with stage("pnl", cached=True) as record:
+            sniper_pnl = sync.pair_table(
+                "pnl",
+                lambda df: calculate_pnl(potential_sniper_df, df, prices=sync.prices),
+                params=launch_params,
+                finalize=lambda pnl: revalue(pnl, sync.prices)
+            )
+            record["rows"] = len(sniper_pnl)
+        sniper_wallets = set(potential_sniper_df["maker"].unique())
+        load_pnl_all = lambda: sync.pair_table(
+            "pnl_all",
+            lambda df: calculate_pnl_all(df, prices=sync.prices),
+            finalize=lambda pnl: revalue(pnl, sync.prices)
+        )
+
+    # ───── Point in Time ─────
+    # An as-of block replays only the swaps since the nearest checkpoint
+    if not sniper_pnl.empty and st.toggle("Time travel", key="time_travel",
+                                          help="Show PnL as it stood at an earlier block"):
+        with st.spinner("Building ledger checkpoints..."), stage("ledger_history", cached=True) as record:
+            get_swap_sync(token).refresh()
+            history = get_ledger_history(token)
+            record["rows"] = len(history)
+        if len(history):
+            as_of = st.slider("As of block", history.first_block, history.last_block, history.last_block,
+                              key="as_of_block")
+            note = f"PnL as of block {as_of:,}"
+            as_of_time = history.time_at(as_of)
+            if not pd.isna(as_of_time):
+                note += f" ({as_of_time:%Y-%m-%d %H:%M:%S} UTC)"
+            launch = pd.to_numeric(load_launch_blocks().get(token_upper), errors="coerce")
+            if not pd.isna(launch):
+                note += f", {as_of - int(launch):,} blocks after launch"
+            price = history.price_index.as_of(token_upper, block=as_of)
+            if not pd.isna(price):
+                note += f", price ${price:,.6f}"
+            if not pd.isna(as_of_time):
+                vwap = history.price_index.vwap(token_upper, end=as_of_time)
+                if not pd.isna(vwap):
+                    note += f", VWAP to date ${vwap:,.6f}"
+            st.caption(note)
+            with stage("pnl_as_of") as record:
+                sniper_pnl = history.as_of(as_of, sniper_pnl[PAIR_KEYS])
+                record["rows"] = len(sniper_pnl)
+            load_pnl_all = lambda: history.as_of(as_of)
+
+    pnl_df = format_pnl(sniper_pnl, "\n")
     if pnl_df.empty:
         st.markdown("### ❌ No Snipers Detected")
-        st.stop()
+        return
     #-----------------------------------------------------------------------------------------------------------------------------
     # Streamlit UI
     st.title(f"Potential Snipers – PnL Overview for {token_upper}")
@@ -785,14 +804,15 @@ with tab2:
     if missing_cols:
         st.error(f"Missing columns: {missing_cols}")
     else:
-        html_table_sniper = (
-            filtered_df[ordered_cols]
-            .rename(columns={
-                "Wallet Display": "Wallet Address",
-                "Net PnL ($)_styled": "Net PnL ($)"
-            })
-            .to_html(escape=False, index=False, float_format="%.4f")
-        )
+        with stage("sniper_to_html", rows=len(filtered_df)):
+            html_table_sniper = (
+                filtered_df[ordered_cols]
+                .rename(columns={
+                    "Wallet Display": "Wallet Address",
+                    "Net PnL ($)_styled": "Net PnL ($)"
+                })
+                .to_html(escape=False, index=False, float_format="%.4f")
+            )
         st.markdown(f"<div class='scrollable'>{html_table_sniper}</div>", unsafe_allow_html=True)
 
     # KPIs
@@ -899,102 +919,27 @@ with tab2:
                     width=600,
                     height=225
                 )
-                st.altair_chart(bar_chart, use_container_width=True)
+                with stage("chart:bar_chart", rows=len(bar_chart.data)):
+                    st.altair_chart(bar_chart, use_container_width=True)
     # --- Top 50 Traders by Net PnL ---
     # ───── PnL for All Participants ─────
-    def calculate_pnl_all(df):
-        results = []
-        wallet_pairs = df[["maker", "token_name"]].drop_duplicates()
-        for _, row in wallet_pairs.iterrows():
-            maker = row["maker"]
-            token = row["token_name"]
-            user_df = df[(df["maker"] == maker) & (df["token_name"] == token)].sort_values(by="timestamp")
-            trades = defaultdict(list)
-
-            # Dynamic fields
-            out_before_tax = f"{token}_OUT_BeforeTax"
-            out_after_tax = f"{token}_OUT_AfterTax"
-            in_before_tax = f"{token}_IN_BeforeTax"
-            in_after_tax = f"{token}_IN_AfterTax"
-
-            buy_txn_count = (user_df["swapType"] == "buy").sum()
-            sell_txn_count = (user_df["swapType"] == "sell").sum()
-            first_buy_time = user_df.loc[user_df["swapType"] == "buy", "timestampReadable"].min()
-            last_sell_time = user_df.loc[user_df["swapType"] == "sell", "timestampReadable"].max()
-            avg_buy_price = user_df.loc[user_df["swapType"] == "buy", "genesis_usdc_price"].mean()
-            avg_sell_price = user_df.loc[user_df["swapType"] == "sell", "genesis_usdc_price"].mean()
-            total_tax_paid = user_df["Tax_1pct"].sum()
-            total_tx_fees = user_df["transactionFee"].sum()
-
-            for _, tx in user_df.iterrows():
-                prefix = tx["token_name"]
-                if tx["swapType"] == "buy":
-                    trades[maker].append({
-                        "type": "buy",
-                        "amount": tx.get(f"{prefix}_OUT_AfterTax", 0),
-                        "cost": tx.get(f"{prefix}_OUT_BeforeTax", 0),
-                        "price": tx["genesis_usdc_price"]
-                    })
-                elif tx["swapType"] == "sell":
-                    trades[maker].append({
-                        "type": "sell",
-                        "amount": tx.get(f"{prefix}_IN_AfterTax", 0),
-                        "from_wallet": tx.get(f"{prefix}_IN_BeforeTax", 0),
-                        "price": tx["genesis_usdc_price"]
-                    })
-
-            buy_queue = deque()
-            realized = 0.0
-            for tx in trades[maker]:
-                if tx["type"] == "buy":
-                    buy_queue.append(tx)
-                elif tx["type"] == "sell":
-                    to_match = tx["from_wallet"]
-                    proceeds = tx["amount"] * tx["price"]
-                    while to_match > 0 and buy_queue:
-                        buy = buy_queue.popleft()
-                        match_amt = min(to_match, buy["amount"])
-                        match_cost = buy["cost"] * (match_amt / buy["amount"])
-                        realized += proceeds * (match_amt / tx["from_wallet"]) - match_cost * buy["price"]
-                        to_match -= match_amt
-                        leftover = buy["amount"] - match_amt
-                        if leftover > 0:
-                            buy_queue.appendleft({
-                                "amount": leftover,
-                                "cost": buy["cost"] * (leftover / buy["amount"]),
-                                "price": buy["price"]
-                            })
-
-            remaining = sum(b["amount"] for b in buy_queue)
-            latest_price = df[df["token_name"] == token].sort_values(by="timestamp", ascending=False).head(1)["genesis_usdc_price"].values[0]
-            unrealized = remaining * latest_price
-
-            results.append({
-                "Wallet Address": maker,
-                "Net PnL ($)": round(realized, 4),
-                "Unrealized PnL ($)": round(unrealized, 4),
-                "Remaining Tokens": float(f"{remaining:.4f}"),
-                "Txn Count (BUY)": buy_txn_count,
-                "Txn Count (SELL)": sell_txn_count,
-                "First Buy Time": first_buy_time,
-                "Last Sell Time": last_sell_time,
-                "Average Buy Price ($)": round(avg_buy_price, 4),
-                "Average Sell Price ($)": round(avg_sell_price, 4),
-                "Total Tax Paid": round(total_tax_paid, 4),
-                "Total Tx Fees Paid (ETH)": round(total_tx_fees, 4)
-            })
-
-        return pd.DataFrame(results)
+    def format_pnl_all(pnl):
+        pnl_all = format_pnl(pnl, " ")
+        pnl_all["Total Buys (USD)"] = pnl["buy_usd"]
+        pnl_all["Total Sells (USD)"] = pnl["sell_usd"]
+        return pnl_all
     # --- Top 50 Traders by Net PnL (All Participants) ---
     st.subheader("📊 Top 50 Traders by Net PnL (All Participants)")
 
     # Calculate full PnL
-    pnl_all_df = calculate_pnl_all(combined_df)
+    with stage("pnl_all") as record:
+        pnl_all_df = format_pnl_all(load_pnl_all())
+        record["rows"] = len(pnl_all_df)
     pnl_all_df = pnl_all_df.sort_values(by="Net PnL ($)", ascending=False).reset_index(drop=True)
     pnl_all_df["Rank"] = pnl_all_df.index + 1
+    pnl_all_df = pnl_all_df.head(50).copy()
 
     # Add "Is Sniper" column
-    sniper_wallets = set(potential_sniper_df["maker"].unique())
     pnl_all_df["Is Sniper"] = pnl_all_df["Wallet Address"].apply(
         lambda addr: f"<span style='color:red;font-weight:bold'>Yes</span>" if addr in sniper_wallets else f"<span style='color:#74fe64;font-weight:bold'>No</span>"
     )
@@ -1009,27 +954,6 @@ with tab2:
         lambda x: f"<span style='color:{'#74fe64' if x >= 0 else 'red'}; font-weight:bold'>${x:.2f}</span>"
     )
 
-    # Total Buys and Sells in USD
-    def get_total_usd(tx_df, maker, token, tx_type):
-        subset = tx_df[
-            (tx_df["maker"] == maker) & 
-            (tx_df["token_name"] == token) & 
-            (tx_df["swapType"] == tx_type)
-        ]
-        try:
-            field = f"{token}_OUT_AfterTax" if tx_type == "buy" else f"{token}_IN_AfterTax"
-            return (subset["genesis_usdc_price"] * subset[field]).sum()
-        except KeyError:
-            return 0.0
-
-    pnl_all_df["Total Buys (USD)"] = pnl_all_df.apply(
-        lambda row: get_total_usd(combined_df, row["Wallet Address"], token_upper, "buy"), axis=1
-    )
-    pnl_all_df["Total Sells (USD)"] = pnl_all_df.apply(
-        lambda row: get_total_usd(combined_df, row["Wallet Address"], token_upper, "sell"), axis=1
-    )
-
-
     # Number of Trades
     pnl_all_df["Number of Trades"] = pnl_all_df["Txn Count (BUY)"] + pnl_all_df["Txn Count (SELL)"]
 
@@ -1037,19 +961,29 @@ with tab2:
     display_cols = [
         "Rank", "Wallet Address", "Is Sniper", "Net PnL ($)_styled", "Number of Trades", "Total Buys (USD)", "Total Sells (USD)"
     ]
-    pnl_all_df = pnl_all_df.sort_values(by="Net PnL ($)", ascending=False).head(50)
     # Render table
-    html_all_pnl = (
-        pnl_all_df[display_cols]
-        .rename(columns={
-            "Wallet Display": "Wallet Address",
-            "Net PnL ($)_styled": "Net PnL"
-        })
-        .to_html(escape=False, index=False, float_format="%.4f")
-    )
+    with stage("pnl_all_to_html", rows=len(pnl_all_df)):
+        html_all_pnl = (
+            pnl_all_df[display_cols]
+            .rename(columns={
+                "Wallet Display": "Wallet Address",
+                "Net PnL ($)_styled": "Net PnL"
+            })
+            .to_html(escape=False, index=False, float_format="%.4f")
+        )
 
 
     st.markdown(f"<div class='scrollable'>{html_all_pnl}</div>", unsafe_allow_html=True)
 
-with tab3:
-        st.header("MORE INSIGHTS INCOMING, STAY TUNED!")
\ No newline at end of file
+def render_other():
+        st.header("MORE INSIGHTS INCOMING, STAY TUNED!")
+
+{
+    "TRANSCTIONS": render_transactions,
+    "SNIPER INSIGHTS": render_sniper_insights,
+    "OTHER": render_other,
+}[view]()
+
+# Fragment reruns only update the panel on the next full run
+if DEBUG_METRICS:
+    debug_panel()
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from bench.synthetic import LAUNCH_BLOCK, swap_frame
+from core.pnl import strip_token_prefix
+from core.schema import coerce_swaps, concat_frames
+
+TOKENS = {"AAA": 0, "BBB": 1}
+LAUNCH_BLOCKS = {token: LAUNCH_BLOCK for token in TOKENS}
+
+
+def decoded(token, rows, seed, **kwargs):
+    """Synthetic swaps of one token in the pages' decoded layout"""
+    frame = strip_token_prefix(swap_frame(token, rows, seed=seed, **kwargs), token)
+    frame["token_name"] = token
+    return coerce_swaps(frame)
+
+
+@pytest.fixture(scope="session")
+def swaps():
+    return concat_frames([decoded(token, 4000, seed) for token, seed in TOKENS.items()])
+
+
+@pytest.fixture(scope="session")
+def plain_swaps(swaps):
+    """The same swaps with object and float64 columns, as the original page code saw them"""
+    frame = swaps.copy()
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(object)
+    frame["Tax_1pct"] = frame["Tax_1pct"].astype("float64")
+    return frame
+
+
+@pytest.fixture(scope="session")
+def launch_blocks():
+    return dict(LAUNCH_BLOCKS)
@@ -0,0 +1,113 @@
+"""The original row-by-row sniper and FIFO PnL code of the global page,
+kept as the reference the vectorized versions are checked against."""
+from collections import deque
+
+import pandas as pd
+
+
+def process_sniper_data(combined_df, token_launch_blocks):
+    """Original sniper rows; the `Index` column holds each row's label in `combined_df`"""
+    buy_df = combined_df[combined_df['swapType'] == 'buy'].copy()
+    buy_df = buy_df.sort_values(by=['maker', 'token_name', 'timestampReadable'], kind='stable')
+    chunked_buys = []
+    time_threshold = pd.Timedelta(minutes=10)
+
+    for (maker, token), group in buy_df.groupby(['maker', 'token_name']):
+        current_chunk = []
+        current_sum = 0
+        chunk_start_time = None
+        for row in group.itertuples():
+            if not current_chunk:
+                chunk_start_time = row.timestampReadable
+                current_chunk = [row]
+                current_sum = row.OUT_BeforeTax
+            else:
+                if row.timestampReadable - chunk_start_time <= time_threshold:
+                    current_chunk.append(row)
+                    current_sum += row.OUT_BeforeTax
+                else:
+                    if current_sum > 100000:
+                        chunked_buys.extend(current_chunk)
+                    chunk_start_time = row.timestampReadable
+                    current_chunk = [row]
+                    current_sum = row.OUT_BeforeTax
+        if current_sum > 100000:
+            chunked_buys.extend(current_chunk)
+
+    df_chunked_large_buys = pd.DataFrame(chunked_buys).drop_duplicates()
+    df_high_gas = df_chunked_large_buys[df_chunked_large_buys['transactionFee'] > 0.000002]
+
+    def is_sniper_buy(row):
+        launch_block = token_launch_blocks.get(row['token_name'])
+        return launch_block is not None and row['blockNumber'] <= launch_block + 100
+
+    df_sniper_buys = df_high_gas[df_high_gas.apply(is_sniper_buy, axis=1)]
+
+    sells = combined_df[combined_df['swapType'] == 'sell'][['maker', 'timestampReadable', 'token_name']]
+    merged = pd.merge(
+        df_sniper_buys[['maker', 'timestampReadable', 'token_name']],
+        sells,
+        on=['maker', 'token_name'],
+        suffixes=('_buy', '_sell')
+    )
+    merged['time_diff'] = (merged['timestampReadable_sell'] - merged['timestampReadable_buy']).dt.total_seconds()
+    quick_sells = merged[merged['time_diff'].between(0, 20 * 60)]
+    quick_sells_pairs = set(zip(quick_sells['maker'], quick_sells['token_name']))
+    return df_sniper_buys[
+        df_sniper_buys.apply(lambda row: (row['maker'], row['token_name']) in quick_sells_pairs, axis=1)
+    ].copy()
+
+
+def fifo_pair(df, latest_price):
+    """Original deque FIFO of one (maker, token) pair: (realized, unrealized, remaining tokens)"""
+    df = df.sort_values(by='timestamp', kind='stable')
+    trades = []
+    for _, doc in df.iterrows():
+        price = float(doc.get("genesis_usdc_price", 0) or 0)
+        if price <= 0:
+            continue
+        if doc["swapType"] == "buy":
+            before_tax = float(doc.get("OUT_BeforeTax", 0) or 0)
+            if before_tax <= 0:
+                continue
+            trades.append(('buy', before_tax, float(doc.get("OUT_AfterTax", 0) or 0), price))
+        elif doc["swapType"] == "sell":
+            sold_net = float(doc.get("IN_AfterTax", 0) or 0)
+            if sold_net <= 0:
+                continue
+            trades.append(('sell', float(doc.get("IN_BeforeTax", 0) or 0), sold_net, price))
+
+    realized = 0.0
+    buy_queue = deque()
+    for kind, first, second, price in trades:
+        if kind == 'buy':
+            buy_queue.append({'amount': second, 'amount_paid_for': first, 'price': price})
+            continue
+        from_wallet, sold_net = first, second
+        remaining_to_match = from_wallet
+        while remaining_to_match > 0 and buy_queue:
+            buy = buy_queue.popleft()
+            matched = min(remaining_to_match, buy['amount'])
+            matched_paid = buy['amount_paid_for'] * matched / buy['amount']
+            realized += sold_net * price * matched / from_wallet - matched_paid * buy['price']
+            remaining_to_match -= matched
+            remaining_buy = buy['amount'] - matched
+            if remaining_buy > 0:
+                buy_queue.appendleft({
+                    'amount': remaining_buy,
+                    'amount_paid_for': buy['amount_paid_for'] * remaining_buy / buy['amount'],
+                    'price': buy['price'],
+                })
+    remaining = sum(b['amount'] for b in buy_queue)
+    return realized, remaining * latest_price, remaining
+
+
+def fifo_pnl(swaps, pairs, prices):
+    """Reference ledger columns for `pairs`, one row each"""
+    rows = []
+    for maker, token in pairs[["maker", "token_name"]].drop_duplicates().itertuples(index=False):
+        df = swaps[(swaps["maker"] == maker) & (swaps["token_name"] == token)]
+        realized, unrealized, remaining = fifo_pair(df, prices.get(token, 0.0))
+        rows.append({"maker": maker, "token_name": token, "realized_pnl": realized,
+                     "unrealized_pnl": unrealized, "remaining_tokens": remaining})
+    return pd.DataFrame(rows)
@@ -0,0 +1,54 @@
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench.synthetic import swap_frame, swap_documents
+from core import aggregates
+from core.aggregates import STAT_COLUMNS, with_wallet_stats
+from core.pnl import PAIR_KEYS, fifo_pnl, strip_token_prefix
+from core.schema import coerce_swaps
+
+REQUIRE = ("transactionFee", "genesis_usdc_price")
+
+
+@pytest.fixture(scope="module")
+def stored():
+    """A mongomock `aaa_swap` collection with some null and missing required fields, and its frame"""
+    frame = swap_frame("AAA", 3000, seed=5)
+    docs = [doc for chunk in swap_documents(frame) for doc in chunk]
+    for doc in docs[::37]:
+        doc["transactionFee"] = None
+    for doc in docs[5::41]:
+        del doc["genesis_usdc_price"]
+    db = mongomock.MongoClient().db
+    db["aaa_swap"].insert_many(docs)
+    swaps = strip_token_prefix(pd.DataFrame(docs).drop(columns="_id"), "AAA")
+    swaps["token_name"] = "AAA"
+    return db, coerce_swaps(swaps).dropna(subset=list(REQUIRE))
+
+
+def _by_pair(table):
+    return table.astype({key: object for key in PAIR_KEYS}).sort_values(PAIR_KEYS).reset_index(drop=True)
+
+
+def assert_stats_match(actual, expected):
+    actual, expected = _by_pair(actual), _by_pair(expected)
+    assert list(actual["maker"]) == list(expected["maker"])
+    for col in STAT_COLUMNS:
+        if col.endswith("_time"):
+            pd.testing.assert_series_equal(actual[col], expected[col], check_dtype=False)
+        else:
+            np.testing.assert_allclose(actual[col].astype(float), expected[col].astype(float), rtol=1e-6)
+
+
+@pytest.mark.parametrize("max_makers", [aggregates.MAX_MAKER_FILTER, 10])
+def test_wallet_stats_match_fifo_pnl(stored, monkeypatch, max_makers):
+    # 10 makers per token forces the whole-collection aggregation with a local filter
+    monkeypatch.setattr(aggregates, "MAX_MAKER_FILTER", max_makers)
+    db, swaps = stored
+    pairs = swaps[PAIR_KEYS].astype(object).drop_duplicates().sample(40, random_state=1)
+    ledger = fifo_pnl(swaps, pairs, stats=False)
+    actual = with_wallet_stats(db, ledger, require_fields=REQUIRE)
+    assert len(actual) == len(pairs)
+    assert_stats_match(actual, fifo_pnl(swaps, pairs))
@@ -0,0 +1,47 @@
+import numpy as np
+
+from core.cache import result_cache
+from core.history import LedgerHistory, synced_history
+from core.pnl import PAIR_KEYS, fifo_pnl
+from core.prices import PriceIndex
+from core.sync import SwapSync
+from tests.conftest import LAUNCH_BLOCKS, decoded
+from tests.test_pnl import assert_ledgers_match
+
+
+def test_as_of_matches_fifo_on_truncated_swaps(swaps, launch_blocks):
+    history = LedgerHistory(swaps, launch_blocks, every=997)
+    for block in np.linspace(history.first_block, history.last_block, 5).astype(int):
+        prices = history.price_index.prices_as_of(block=block)
+        expected = fifo_pnl(swaps[swaps["blockNumber"] <= block], prices=prices)
+        expected = expected.astype({key: object for key in PAIR_KEYS})
+        assert_ledgers_match(history.as_of(block), expected)
+
+
+def test_as_of_for_pairs_keeps_pair_order(swaps, launch_blocks):
+    history = LedgerHistory(swaps, launch_blocks, every=997)
+    pairs = swaps[PAIR_KEYS].astype(object).drop_duplicates().iloc[::-7]
+    table = history.as_of(history.last_block, pairs)
+    assert list(table["maker"]) == list(pairs["maker"])
+
+
+def test_extend_matches_full_build(swaps, launch_blocks):
+    order = swaps.sort_values(["blockNumber", "timestamp"], kind="stable").index
+    head, tail = swaps.loc[order[:5000]], swaps.loc[order[5000:]]
+    history = LedgerHistory(head, launch_blocks, every=997)
+    assert history.extend(tail, PriceIndex(swaps))
+    full = LedgerHistory(swaps, launch_blocks, every=997)
+    for block in np.linspace(history.first_block, history.last_block, 4).astype(int):
+        assert_ledgers_match(history.as_of(block), full.as_of(block).astype({key: object for key in PAIR_KEYS}))
+    assert not history.extend(head.iloc[:10], PriceIndex(swaps))
+
+
+def test_synced_history_replays_only_new_rows(launch_blocks):
+    sync = SwapSync(None, [], lambda name: None, None)
+    sync.append(decoded("AAA", 2000, seed=3))
+    history = synced_history(sync, launch_blocks)
+    sync.append(decoded("AAA", 300, seed=4, launch_block=LAUNCH_BLOCKS["AAA"] + 5000))
+    assert synced_history(sync, launch_blocks) is history
+    assert history.rows == len(sync.frame)
+    assert result_cache.peek(("ledger_history", sync.cache_id)) is history
+    assert result_cache.stats()["bytes"] >= history.nbytes > len(history) * 8
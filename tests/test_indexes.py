@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("dotenv")
+from core.indexes import blocking_sorts  # noqa: E402
+
+
+def _scan(*keys):
+    return {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "keyPattern": dict.fromkeys(keys, 1)}}
+
+
+def _explain(plan):
+    return {"queryPlanner": {"winningPlan": plan, "rejectedPlans": [{"stage": "SORT"}]}}
+
+
+@pytest.mark.parametrize("plan, blocking", [
+    ({"stage": "SORT", "sortPattern": {"blockNumber": 1, "_id": 1}, "inputStage": {"stage": "COLLSCAN"}}, True),
+    # An index on the sort field that lacks _id cannot give the page order
+    ({"stage": "SORT", "sortPattern": {"blockNumber": 1, "_id": 1}, "inputStage": _scan("blockNumber")}, True),
+    ({"stage": "SORT", "sortPattern": {"timestamp": 1}, "inputStage": _scan("maker")}, False),
+    ({"stage": "LIMIT", "inputStage": _scan("blockNumber", "_id")}, False),
+])
+def test_blocking_sorts(plan, blocking):
+    assert any(blocking_sorts(_explain(plan))) == blocking
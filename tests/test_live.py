@@ -0,0 +1,174 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from bench.synthetic import swap_frame
+from core import live
+from core.live import LiveFeed, LiveLedger, swap_from_doc
+from core.pnl import PAIR_KEYS, fifo_pnl, latest_prices, strip_token_prefix
+from core.schema import coerce_swaps
+from core.snipers import detect_snipers
+from tests.conftest import TOKENS
+from tests.test_pnl import assert_ledgers_match
+
+
+def test_live_ledger_matches_fifo_pnl_and_detect_snipers(swaps, launch_blocks):
+    ledger = LiveLedger(launch_blocks)
+    for token, seed in TOKENS.items():
+        docs = swap_frame(token, 4000, seed=seed).sort_values("timestamp", kind="stable").to_dict("records")
+        for doc in docs:
+            ledger.apply(swap_from_doc(f"{token.lower()}_swap", doc))
+    prices = latest_prices(swaps)
+    table = ledger.table(prices=prices)
+
+    expected = fifo_pnl(swaps, prices=prices)
+    assert_ledgers_match(table, expected)
+    merged = expected.astype({key: object for key in PAIR_KEYS}).merge(table, on=PAIR_KEYS)
+    for col in ("buy_count", "sell_count", "total_fee", "buy_usd", "sell_usd", "avg_buy_price"):
+        np.testing.assert_allclose(merged[f"{col}_y"].astype(float), merged[f"{col}_x"].astype(float), rtol=1e-9)
+
+    snipers = detect_snipers(swaps, launch_blocks)[PAIR_KEYS].astype(object).drop_duplicates()
+    assert len(snipers) > 0
+    assert set(table.loc[table["sniper"], PAIR_KEYS].itertuples(index=False)) == set(snipers.itertuples(index=False))
+
+
+def test_live_ledger_sell_before_burst_completes(launch_blocks):
+    # The first buy only becomes a sniper buy once the second one makes the
+    # burst large, after the quick sell has already been seen
+    launch = launch_blocks["AAA"]
+    rows = [("buy", 0, 60_000.0), ("sell", 60, 50_000.0), ("buy", 120, 60_000.0), ("sell", 3000, 10_000.0)]
+    frame = pd.DataFrame([{
+        "maker": "0xabc", "swapType": side, "blockNumber": launch + offset // 2, "timestamp": 1_700_000_000 + offset,
+        "genesis_usdc_price": 1.0, "transactionFee": 1e-5,
+        "AAA_OUT_BeforeTax": amount if side == "buy" else 0.0, "AAA_OUT_AfterTax": amount if side == "buy" else 0.0,
+        "AAA_IN_BeforeTax": amount if side == "sell" else 0.0, "AAA_IN_AfterTax": amount if side == "sell" else 0.0,
+    } for side, offset, amount in rows])
+    ledger = LiveLedger(launch_blocks)
+    for doc in frame.to_dict("records"):
+        ledger.apply(swap_from_doc("aaa_swap", doc))
+
+    swaps = strip_token_prefix(frame, "AAA").assign(token_name="AAA")
+    assert len(detect_snipers(coerce_swaps(swaps), launch_blocks)) == 2
+    assert ledger.table()["sniper"].tolist() == [True]
+
+
+# ───── LiveFeed on a fake change stream ─────
+
+def _doc(block):
+    return {"_id": ObjectId(), "maker": "0xabc", "swapType": "buy", "blockNumber": block, "timestamp": block * 2,
+            "genesis_usdc_price": 1.0, "AAA_OUT_BeforeTax": 1.0, "AAA_OUT_AfterTax": 1.0, "transactionFee": 0.0}
+
+
+def _change(doc):
+    return {"ns": {"coll": "aaa_swap"}, "fullDocument": doc}
+
+
+class _Cursor(list):
+    def sort(self, keys):
+        return _Cursor(sorted(self, key=lambda doc: (doc["timestamp"], doc["_id"])))
+
+
+class _Collection:
+    def __init__(self, db, docs):
+        self.db, self.docs = db, docs
+
+    def find(self, query):
+        self.db.finds.append(query)
+        low = query.get("blockNumber", {}).get("$gte")
+        return _Cursor(doc for doc in self.docs if low is None or doc["blockNumber"] >= low)
+
+
+class _Stream:
+    """Returns `events` in order, then raises `error` (or idles)"""
+
+    def __init__(self, events, error=None):
+        self.events, self.error, self.resume_token = list(events), error, None
+        self.drained = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if self.events:
+            self.resume_token = ObjectId()
+            return self.events.pop(0)
+        if self.error is not None:
+            raise self.error
+        if self.drained is not None:
+            self.drained.set()
+        time.sleep(0.005)
+        return None
+
+
+class _Database:
+    def __init__(self, docs, streams, on_open=None):
+        self.collection = _Collection(self, docs)
+        self.streams, self.on_open = list(streams), on_open
+        self.opened, self.finds = [], []
+        self.idle = threading.Event()
+
+    def __getitem__(self, name):
+        return self.collection
+
+    def watch(self, pipeline, resume_after=None, max_await_time_ms=None):
+        self.opened.append(resume_after)
+        if self.on_open is not None:
+            self.on_open(resume_after)
+        stream = self.streams.pop(0) if self.streams else _Stream([])
+        if not self.streams:
+            stream.drained = self.idle
+        return stream
+
+
+def _follow(db):
+    feed = LiveFeed(db, ["aaa_swap"]).start()
+    assert db.idle.wait(5), feed.error
+    time.sleep(0.05)
+    feed.stop()
+    return feed
+
+
+@pytest.fixture(autouse=True)
+def _fast_retry(monkeypatch):
+    monkeypatch.setattr(live, "RETRY_SECONDS", 0.01)
+
+
+def test_live_feed_drops_swaps_it_already_holds():
+    loaded = [_doc(10), _doc(11), _doc(11)]
+    gap, new = _doc(12), _doc(13)
+    # Swap inserted after the load but before the stream opened
+    db = _Database(loaded, [], on_open=lambda token: token is None and gap not in loaded and loaded.append(gap))
+    db.streams = [_Stream([_change(loaded[0]), _change(loaded[2]), _change(gap), _change(new)])]
+    feed = _follow(db)
+    assert feed.table()["buy_count"].sum() == 5
+    assert feed.watermarks == {"aaa_swap": 13}
+    assert db.finds == [{}, {"blockNumber": {"$gte": 11}}]
+
+
+def test_live_feed_resumes_after_last_event():
+    first, second = _doc(11), _doc(12)
+    stream = _Stream([_change(first)], AutoReconnect("connection reset"))
+    db = _Database([_doc(10)], [stream, _Stream([_change(second)])])
+    feed = _follow(db)
+    assert db.opened[:2] == [None, stream.resume_token]
+    # Resuming needs no catch-up query and applies each swap once
+    assert len(db.finds) == 2
+    assert feed.table()["buy_count"].sum() == 3
+
+
+def test_live_feed_reloads_when_resume_fails():
+    docs = [_doc(10)]
+    stream = _Stream([_change(_doc(9))], OperationFailure("resume point no longer in oplog"))
+    db = _Database(docs, [stream])
+    feed = _follow(db)
+    assert db.opened[:2] == [None, None]
+    assert db.finds.count({}) == 2
+    assert feed.table()["buy_count"].sum() == 1
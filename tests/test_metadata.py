@@ -0,0 +1,44 @@
+import mongomock
+import pytest
+
+pytest.importorskip("dotenv")
+
+from core.metadata import METADATA_COLLECTION, refresh_token_metadata, token_metadata  # noqa: E402
+
+
+def _swaps(blocks):
+    return [{"blockNumber": block, "genesis_token_symbol": "AAA", "timestamp": block * 2} for block in blocks]
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    db["swap_progress"].insert_one({"token_symbol": "AAA", "genesis_block": 10})
+    db["aaa_swap"].insert_many(_swaps([10, 11, 11]))
+    return db
+
+
+def test_page_read_does_not_write(db):
+    assert token_metadata(db, "aaa")["swap_count"] == 3
+    assert db[METADATA_COLLECTION].count_documents({}) == 0
+
+    refresh_token_metadata(db, "AAA")
+    db["aaa_swap"].insert_many(_swaps([11, 12]))
+    doc = token_metadata(db, "AAA")
+    assert (doc["swap_count"], doc["watermark"], doc["edge_count"]) == (5, 12, 1)
+    assert db[METADATA_COLLECTION].find_one({"_id": "AAA"})["swap_count"] == 3
+
+
+def test_refresh_counts_new_swaps_once(db, monkeypatch):
+    refresh_token_metadata(db, "AAA")
+    store = db[METADATA_COLLECTION]
+    stale = store.find_one({"_id": "AAA"})
+    db["aaa_swap"].insert_many(_swaps([11, 12, 12]))
+    assert refresh_token_metadata(db, "AAA")["swap_count"] == 6
+
+    # A second refresh that read the document before the first one wrote is dropped
+    monkeypatch.setattr(store, "find_one", lambda *args, **kwargs: dict(stale))
+    refresh_token_metadata(db, "AAA")
+    monkeypatch.undo()
+    assert store.find_one({"_id": "AAA"})["swap_count"] == 6
+    assert token_metadata(db, "AAA")["swap_count"] == 6
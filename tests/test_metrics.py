@@ -0,0 +1,51 @@
+import threading
+import tracemalloc
+
+import pytest
+
+from core import metrics
+from core.metrics import stage
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    monkeypatch.setattr(metrics, "TRACE_MEMORY", True)
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    yield
+    if started:
+        tracemalloc.stop()
+
+
+def test_stage_peak_is_its_own_allocation(traced):
+    with stage("big") as big:
+        block = bytearray(8_000_000)
+        del block
+    with stage("small") as small:
+        block = bytearray(100_000)
+        del block
+    assert 8 <= big["peak_mb"] < 9
+    assert small["peak_mb"] < 1
+
+
+def test_overlapping_stages_report_no_peak(traced):
+    entered, release = threading.Event(), threading.Event()
+
+    def other():
+        with stage("other"):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    entered.wait(5)
+    with stage("overlapped") as overlapped:
+        with stage("nested") as nested:
+            pass
+        release.set()
+    thread.join()
+    with stage("alone") as alone:
+        pass
+    assert overlapped["peak_mb"] is None and nested["peak_mb"] is None
+    assert alone["peak_mb"] is not None
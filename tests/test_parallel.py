@@ -0,0 +1,10 @@
+import pandas as pd
+
+from core.parallel import parallel_fifo_pnl
+from core.pnl import fifo_pnl, latest_prices
+
+
+def test_parallel_fifo_pnl_matches_serial(swaps):
+    prices = latest_prices(swaps)
+    serial = fifo_pnl(swaps, prices=prices)
+    pd.testing.assert_frame_equal(parallel_fifo_pnl(swaps, prices=prices), serial)
@@ -0,0 +1,33 @@
+import numpy as np
+
+from core.pnl import PAIR_KEYS, fifo_pnl, latest_prices
+from tests import reference
+
+LEDGER = ["realized_pnl", "unrealized_pnl", "remaining_tokens"]
+
+
+def assert_ledgers_match(actual, expected):
+    actual = actual.astype({key: object for key in PAIR_KEYS})
+    merged = expected.merge(actual, on=PAIR_KEYS, how="outer", suffixes=("_expected", "_actual"), indicator=True)
+    assert (merged["_merge"] == "both").all()
+    for col in LEDGER:
+        np.testing.assert_allclose(merged[f"{col}_actual"], merged[f"{col}_expected"], rtol=1e-9, atol=1e-6)
+
+
+def test_fifo_pnl_matches_deque_loop(plain_swaps):
+    prices = latest_prices(plain_swaps)
+    pairs = plain_swaps[PAIR_KEYS].drop_duplicates().sample(300, random_state=0)
+    expected = reference.fifo_pnl(plain_swaps, pairs, prices)
+    assert_ledgers_match(fifo_pnl(plain_swaps, pairs, prices=prices), expected)
+
+
+def test_fifo_pnl_on_coerced_frame_matches_plain(swaps, plain_swaps):
+    prices = latest_prices(plain_swaps)
+    assert_ledgers_match(fifo_pnl(swaps, prices=prices), fifo_pnl(plain_swaps, prices=prices)[PAIR_KEYS + LEDGER])
+
+
+def test_fifo_pnl_without_optional_columns(plain_swaps):
+    swaps = plain_swaps.drop(columns=["Tax_1pct", "transactionFee"])
+    pnl = fifo_pnl(swaps)
+    assert (pnl["total_tax"] == 0).all() and (pnl["total_fee"] == 0).all()
+
@@ -0,0 +1,16 @@
+import numpy as np
+
+from core.prices import PriceIndex
+
+
+def test_vwap_matches_weighted_mean(swaps):
+    index = PriceIndex(swaps)
+    token = swaps["token_name"].iloc[0]
+    rows = swaps[swaps["token_name"] == token]
+    start, end = np.percentile(rows["timestamp"], [25, 75])
+    window = rows[(rows["timestamp"] >= start) & (rows["timestamp"] <= end)]
+    qty = np.where(window["swapType"] == "buy", window["OUT_AfterTax"],
+                   np.where(window["swapType"] == "sell", window["IN_AfterTax"], 0.0))
+    qty = np.where(window["genesis_usdc_price"].isna(), 0.0, np.nan_to_num(qty))
+    expected = (np.nan_to_num(window["genesis_usdc_price"]) * qty).sum() / qty.sum()
+    assert np.isclose(index.vwap(token, start, end), expected)
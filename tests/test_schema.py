@@ -0,0 +1,17 @@
+import pandas as pd
+
+from core.schema import coerce_swaps
+
+
+def test_coerce_swaps_keeps_stored_readable_time():
+    frame = pd.DataFrame({
+        "timestamp": [1_700_000_000, 1_700_000_060, 1_700_000_120],
+        # Stored in UTC+2, one row missing and one unparseable
+        "timestampReadable": ["2023-11-15 00:13:20", None, "not a time"],
+    })
+    times = coerce_swaps(frame)["timestampReadable"]
+    assert times.tolist() == [
+        pd.Timestamp("2023-11-15 00:13:20"),
+        pd.Timestamp("2023-11-14 22:14:20"),
+        pd.Timestamp("2023-11-14 22:15:20"),
+    ]
@@ -0,0 +1,36 @@
+import threading
+
+import pandas as pd
+
+from bench.memory import MemoryDatabase
+from bench.synthetic import LAUNCH_BLOCK, insert_swaps, swap_frame
+from core.schema import coerce_swaps
+from core.snapshot import SnapshotStore
+from core.sync import SwapSync
+
+
+def decode(col_name, docs):
+    frame = pd.DataFrame(docs).drop(columns=["_id"])
+    frame["token_name"] = col_name.replace("_swap", "").upper()
+    return coerce_swaps(frame)
+
+
+def test_concurrent_loaders_do_not_duplicate_a_tail(tmp_path):
+    db = MemoryDatabase()
+    insert_swaps(db, "AAA", 1000)
+    store = SnapshotStore(str(tmp_path))
+    SwapSync(db, ["aaa_swap"], lambda name: None, decode, snapshots=store).refresh()
+    db["aaa_swap"].insert_many(swap_frame("AAA", 1000, seed=3, launch_block=LAUNCH_BLOCK + 100_000).to_dict("records"))
+
+    # Both loaders read the same snapshot before either appends its tail
+    barrier = threading.Barrier(2)
+    load = store.load
+    store.load = lambda col_name: (load(col_name), barrier.wait())[0]
+    loaders = [threading.Thread(target=SwapSync(db, ["aaa_swap"], lambda name: None, decode, snapshots=store).refresh)
+               for _ in range(2)]
+    for thread in loaders:
+        thread.start()
+    for thread in loaders:
+        thread.join()
+
+    assert len(load("aaa_swap")[0]) == len(db["aaa_swap"].docs)
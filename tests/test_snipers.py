@@ -0,0 +1,13 @@
+from core.snipers import detect_snipers
+from tests import reference
+
+
+def test_detect_snipers_matches_original(swaps, plain_swaps, launch_blocks):
+    expected = reference.process_sniper_data(plain_swaps, launch_blocks)
+    actual = detect_snipers(swaps, launch_blocks)
+    assert len(expected) > 0
+    assert sorted(actual.index) == sorted(expected["Index"])
+
+
+def test_detect_snipers_without_launch_block(swaps, launch_blocks):
+    assert detect_snipers(swaps, {"AAA": launch_blocks["AAA"]})["token_name"].astype(str).eq("AAA").all()
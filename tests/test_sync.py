@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+
+from core.cache import result_cache
+from core.pnl import PAIR_KEYS, fifo_pnl
+from core.sync import SwapSync
+from tests.conftest import LAUNCH_BLOCKS, decoded
+
+
+def _sorted(table):
+    return table.astype({key: object for key in PAIR_KEYS}).sort_values(PAIR_KEYS).reset_index(drop=True)
+
+
+def test_pair_table_incremental_matches_full():
+    sync = SwapSync(None, [], lambda name: None, None)
+    compute = lambda frame: fifo_pnl(frame, prices={})
+    sync.append(decoded("AAA", 3000, seed=0))
+    sync.pair_table("pnl", compute)
+    for i in range(6):
+        start = LAUNCH_BLOCKS["AAA"] + 2000 + 300 * i
+        sync.append(decoded("AAA", 200, seed=10 + i, launch_block=start))
+        if i % 2:
+            table = sync.pair_table("pnl", compute)
+    expected = _sorted(compute(sync.frame))
+    actual = _sorted(table)
+    assert list(actual["maker"]) == list(expected["maker"])
+    for col in ("realized_pnl", "remaining_tokens", "buy_count", "sell_count"):
+        np.testing.assert_allclose(actual[col].astype(float), expected[col].astype(float), rtol=1e-9, atol=1e-6)
+
+
+def test_pair_table_rebuilds_after_eviction():
+    sync = SwapSync(None, [], lambda name: None, None)
+    compute = lambda frame: fifo_pnl(frame, prices={})
+    sync.append(decoded("BBB", 1000, seed=1))
+    sync.pair_table("pnl", compute)
+    result_cache.discard(sync._table_key("pnl"))
+    sync.append(decoded("BBB", 200, seed=2, launch_block=LAUNCH_BLOCKS["BBB"] + 5000))
+    assert not sync._touched
+    assert len(sync.pair_table("pnl", compute)) == len(compute(sync.frame))
+
+
+class _SlowCollection:
+    def __init__(self, docs, started, release):
+        self.docs, self.started, self.release = docs, started, release
+
+    def find(self, query, projection=None):
+        self.started.set()
+        self.release.wait(5)
+        low = query.get("blockNumber", {}).get("$gte", -np.inf)
+        return [doc for doc in self.docs if doc["blockNumber"] >= low]
+
+
+def test_refresh_fetches_outside_the_lock():
+    frame = decoded("AAA", 400, seed=3)
+    docs = [dict(row, _id=i) for i, row in enumerate(frame.to_dict("records"))]
+    started, release = threading.Event(), threading.Event()
+    collection = _SlowCollection(docs[:300], started, release)
+    decode = lambda col_name, rows: frame.iloc[[row["_id"] for row in rows]]
+    sync = SwapSync({"aaa_swap": collection}, ["aaa_swap"], lambda name: None, decode, ttl=0)
+    release.set()
+    sync.refresh()
+    compute = lambda rows: fifo_pnl(rows, prices={})
+    sync.pair_table("pnl", compute)
+
+    collection.docs, started, release = docs, threading.Event(), threading.Event()
+    collection.started, collection.release = started, release
+    worker = threading.Thread(target=sync.refresh)
+    worker.start()
+    started.wait(5)
+    # Readers and a second refresh do not wait for the fetch in flight
+    assert len(sync.refresh()) == 300
+    assert len(sync.pair_table("pnl", compute)) == len(compute(sync.frame))
+    release.set()
+    worker.join()
+    assert len(sync.frame) == 400
+    assert len(_sorted(sync.pair_table("pnl", compute))) == len(compute(sync.frame))